@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del formato de la base del cache: JSON (indent=2, el formato
+anterior) vs binario (core/codec.py) sin compresión, con zlib y con lzma.
+Mide tiempo de guardar (serializar + escribir), de cargar (leer + parsear)
+y bytes en disco sobre un cache sintético de varios años.
+
+Uso:
+    python benchmark_cache.py [años ...]      (default: 1 3 10)
+
+El formato se elige en config.py (CACHE_FORMATO / CACHE_COMPRESION).
+"""
+
+import sys
+import json
+import time
+import logging
+import tempfile
+from pathlib import Path
+
+REPETICIONES = 3
+
+
+def _formatos():
+    from core import codec
+
+    return {
+        "json": (
+            lambda datos: json.dumps(datos, ensure_ascii=False, indent=2).encode("utf-8"),
+            lambda crudo: json.loads(crudo.decode("utf-8")),
+        ),
+        "binario": (lambda datos: codec.codificar(datos, None), codec.decodificar),
+        "binario+zlib": (lambda datos: codec.codificar(datos, "zlib"), codec.decodificar),
+        "binario+lzma": (lambda datos: codec.codificar(datos, "lzma"), codec.decodificar),
+    }
+
+
+def _medir(datos, codificar, decodificar, ruta):
+    """Mejor tiempo de REPETICIONES guardados y cargas; bytes del archivo"""
+    guardar = []
+    cargar = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        ruta.write_bytes(codificar(datos))
+        guardar.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        copia = decodificar(ruta.read_bytes())
+        cargar.append(time.perf_counter() - inicio)
+
+    if copia != datos:
+        raise AssertionError(f"{ruta.name}: el cache releído no coincide")
+    return min(guardar), min(cargar), ruta.stat().st_size
+
+
+def main():
+    logging.getLogger("monitor_salud").setLevel(logging.ERROR)
+
+    from utils.datos_sinteticos import generar_cache_sintetico
+    from core.tiempo import normalizar_seccion
+
+    anios = [float(a) for a in sys.argv[1:]] or [1, 3, 10]
+    formatos = _formatos()
+
+    print("=" * 78)
+    print("BENCHMARK CACHE - formato de la base (guardar / cargar / disco)")
+    print("=" * 78)
+    print(f"{'Años':>5} {'Registros':>10} {'Formato':<14} {'Guardar (s)':>12} {'Cargar (s)':>11} {'MB':>8} {'vs JSON':>8}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in anios:
+            cache = generar_cache_sintetico(n)
+            # Como queda después de cargar_cache(): con columnas de tiempo y sin claves privadas
+            datos = {k: v for k, v in cache.items() if not k.startswith("_")}
+            for clave, valor in datos.items():
+                if isinstance(valor, list) and clave != "archivos_procesados":
+                    normalizar_seccion(valor)
+            registros = sum(len(v) for v in datos.values() if isinstance(v, list))
+
+            base = None
+            for nombre, (codificar, decodificar) in formatos.items():
+                guardar, cargar, tamano = _medir(datos, codificar, decodificar, Path(tmp) / nombre)
+                base = base or tamano
+                print(f"{n:>5g} {registros:>10} {nombre:<14} {guardar:>12.3f} {cargar:>11.3f} "
+                      f"{tamano / 1e6:>8.2f} {tamano / base:>7.0%}")
+            print("-" * 78)
+
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
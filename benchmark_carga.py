@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del modelo de carga (metricas/carga.py): EWMA de hrTSS con
+CARGA_CONSTANTES_DIAS + Banister sobre el historial completo, con cada
+motor disponible (scipy / numpy / python) contra el loop de calcular_tsb.
+
+Mide el armado de la carga diaria (agrupar los entrenamientos por día) y el
+modelo sobre esa carga, y verifica que el TSB del modelo sea el de
+calcular_tsb (y cuánto difieren CTL/ATL de la serie del loop).
+
+Uso:
+    python benchmark_carga.py [años ...]      (default: 1 3 10)
+"""
+
+import sys
+import time
+import logging
+
+REPETICIONES = 5
+
+
+def _mejor(funcion):
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+def main():
+    logging.getLogger("monitor_salud").setLevel(logging.ERROR)
+
+    from utils.datos_sinteticos import generar_cache_sintetico
+    from core.tiempo import normalizar_seccion
+    from config import TSB_CTL_DIAS, TSB_ATL_DIAS
+    from metricas import carga
+    from metricas.fitness import calcular_tsb, serie_tsb
+
+    anios = [float(a) for a in sys.argv[1:]] or [1, 3, 10]
+    motores = [m for m, disponible in (
+        ("scipy", carga.lfilter is not None and carga.np is not None),
+        ("numpy", carga.np is not None),
+        ("python", True),
+    ) if disponible]
+
+    print("=" * 78)
+    print(f"BENCHMARK MODELO DE CARGA - constantes {carga.CARGA_CONSTANTES_DIAS} + Banister")
+    print("=" * 78)
+    print(f"{'Años':>5} {'Días':>6} {'Motor':<8} {'Carga (ms)':>11} {'Modelo (ms)':>12} "
+          f"{'Loop TSB (ms)':>14} {'Dif. máx.':>10} {'TSB':>4}")
+    print("-" * 78)
+
+    original = carga.MOTOR
+    try:
+        for n in anios:
+            cache = generar_cache_sintetico(n)
+            ejercicios = cache["ejercicio"]
+            normalizar_seccion(ejercicios)
+
+            t_loop, esperado = _mejor(lambda: calcular_tsb(ejercicios))
+            serie = serie_tsb(ejercicios)
+            t_carga, (_, cargas) = _mejor(lambda: carga.carga_diaria(ejercicios))
+
+            for motor in motores:
+                carga.MOTOR = motor
+                t_modelo, modelo = _mejor(lambda: carga.modelo_carga(ejercicios))
+                # El modelo sobre la carga ya armada (sin agrupar los entrenamientos)
+                t_filtro, _ = _mejor(lambda: (carga.ewma(cargas), carga.banister(cargas)))
+                diferencia = max(
+                    max(abs(a - b) for a, b in zip(modelo["ewma"][TSB_CTL_DIAS], serie["ctl"])),
+                    max(abs(a - b) for a, b in zip(modelo["ewma"][TSB_ATL_DIAS], serie["atl"])),
+                )
+                igual = carga.tsb_actual(modelo) == esperado
+                print(f"{n:>5g} {len(cargas):>6} {motor:<8} {t_carga * 1000:>11.2f} {t_filtro * 1000:>12.2f} "
+                      f"{t_loop * 1000:>14.2f} {diferencia:>10.1e} {'✅' if igual else '❌':>4}")
+                if not igual:
+                    raise AssertionError(f"{motor}: {carga.tsb_actual(modelo)} != {esperado}")
+            print("-" * 78)
+    finally:
+        carga.MOTOR = original
+
+    print("Modelo (ms): EWMA de todas las constantes + Banister sobre la carga diaria")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del dashboard: tiempo de generar_dashboard() sobre un cache sintético
+de varios años de historia.
+
+Uso:
+    python benchmark_dashboard.py [años ...]      (default: 1 3 5)
+
+Modos:
+- sin_columnas: registros tal como los dejaba la versión anterior (solo strings ISO);
+  las columnas de tiempo se calculan al vuelo la primera vez que se usan
+- normalizado: cache con epoch_local/dia_local, como queda después de cargar_cache()
+"""
+
+import io
+import sys
+import copy
+import time
+import logging
+import tempfile
+import contextlib
+from pathlib import Path
+
+REPETICIONES = 3
+
+
+def _medir(cache):
+    """Mejor tiempo de REPETICIONES corridas de generar_dashboard (cada una con su copia del cache)"""
+    import outputs.dashboard as dashboard
+
+    tiempos = []
+    with tempfile.TemporaryDirectory() as tmp:
+        dashboard.OUTPUT_HTML = Path(tmp) / "dashboard.html"
+        for _ in range(REPETICIONES):
+            copia = copy.deepcopy(cache)
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                dashboard.generar_dashboard(copia)
+            tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    logging.getLogger("monitor_salud").setLevel(logging.ERROR)
+
+    from utils.datos_sinteticos import generar_cache_sintetico
+
+    try:
+        from core.tiempo import normalizar_seccion
+    except ImportError:
+        normalizar_seccion = None
+
+    anios = [float(a) for a in sys.argv[1:]] or [1, 3, 5]
+
+    print("=" * 60)
+    print("BENCHMARK DASHBOARD - generar_dashboard()")
+    print("=" * 60)
+    print(f"{'Años':>5} {'Registros':>10} {'Sin columnas (s)':>17} {'Normalizado (s)':>16}")
+    print("-" * 60)
+
+    for n in anios:
+        cache = generar_cache_sintetico(n)
+        registros = sum(len(v) for v in cache.values() if isinstance(v, list))
+
+        sin_columnas = _medir(cache)
+
+        normalizado = None
+        if normalizar_seccion is not None:
+            for clave, valor in cache.items():
+                if isinstance(valor, list) and clave != "archivos_procesados":
+                    normalizar_seccion(valor)
+            normalizado = _medir(cache)
+
+        columna = f"{normalizado:>16.3f}" if normalizado is not None else f"{'-':>16}"
+        print(f"{n:>5g} {registros:>10} {sin_columnas:>17.3f} {columna}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de ingesta: json.load completo vs lectura streaming por sección
+Mide tiempo total y pico de RSS procesando los exports de ejemplo.
+
+Uso:
+    python benchmark_ingesta.py [carpeta_exports]
+
+Cada modo corre en un subproceso separado para que el pico de RSS
+de uno no contamine la medición del otro.
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import resource
+import tracemalloc
+import subprocess
+from pathlib import Path
+
+CARPETA_EJEMPLOS = Path(__file__).resolve().parent / "~"
+MODOS = ["completo", "streaming"]
+
+
+def _rss_mb():
+    """Pico de RSS del proceso actual en MB (Linux reporta KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir(modo, archivos):
+    """Procesa los archivos en este proceso y retorna las métricas"""
+    logging.getLogger("monitor_salud").setLevel(logging.ERROR)
+
+    from core.cache import inicializar_cache
+    from core.procesador import procesar_archivo
+
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+
+    for ruta in archivos:
+        # Cache vacío por archivo: se mide el costo de leer/extraer, no el crecimiento del cache
+        procesar_archivo(ruta, inicializar_cache(), streaming=(modo == "streaming"))
+
+    segundos = time.perf_counter() - inicio
+    rss_pico = _rss_mb()
+
+    # Segunda pasada con tracemalloc (más preciso que RSS, pero agrega overhead al tiempo)
+    heap_pico = 0
+    for ruta in archivos:
+        tracemalloc.start()
+        procesar_archivo(ruta, inicializar_cache(), streaming=(modo == "streaming"))
+        heap_pico = max(heap_pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "modo": modo,
+        "archivos": len(archivos),
+        "segundos": round(segundos, 3),
+        "rss_pico_mb": round(rss_pico, 1),
+        "rss_extra_mb": round(rss_pico - rss_inicial, 1),
+        "heap_pico_mb": round(heap_pico / 1024 / 1024, 1),
+    }
+
+
+def _correr_hijo(modo, archivos):
+    resultado = subprocess.run(
+        [sys.executable, __file__, "--hijo", modo] + archivos,
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parent
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def _imprimir(grupo, r):
+    print(f"{grupo:<6} {r['modo']:<10} {r['archivos']:>8} {r['segundos']:>11.3f} "
+          f"{r['rss_pico_mb']:>14.1f} {r['rss_extra_mb']:>15.1f} {r['heap_pico_mb']:>15.1f}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--hijo":
+        print(json.dumps(_medir(sys.argv[2], sys.argv[3:])))
+        return
+
+    carpeta = Path(sys.argv[1]) if len(sys.argv) > 1 else CARPETA_EJEMPLOS
+    todos = sorted(glob.glob(str(carpeta / "health_data_*.json")))
+    grupos = {
+        "FULL": [f for f in todos if "FULL" in os.path.basename(f).upper()],
+        "DIFF": [f for f in todos if "DIFF" in os.path.basename(f).upper()],
+    }
+
+    if not todos:
+        print(f"No hay exports en {carpeta}")
+        sys.exit(1)
+
+    print("=" * 86)
+    print(f"BENCHMARK INGESTA - {carpeta}")
+    print("=" * 86)
+    print(f"{'Grupo':<6} {'Modo':<10} {'Archivos':>8} {'Tiempo (s)':>11} {'RSS pico (MB)':>14} "
+          f"{'RSS extra (MB)':>15} {'Heap pico (MB)':>15}")
+    print("-" * 86)
+
+    for grupo, archivos in grupos.items():
+        if not archivos:
+            continue
+        for modo in MODOS:
+            r = _correr_hijo(modo, archivos)
+            _imprimir(grupo, r)
+
+    # El archivo más grande aparte: es el que define el pico de memoria
+    mayor = max(todos, key=os.path.getsize)
+    print("-" * 86)
+    print(f"Archivo más grande: {os.path.basename(mayor)} ({os.path.getsize(mayor) / 1024 / 1024:.1f} MB)")
+    for modo in MODOS:
+        r = _correr_hijo(modo, [mayor])
+        _imprimir("MAYOR", r)
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
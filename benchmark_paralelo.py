@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de ingesta paralela: throughput procesando todos los exports de ejemplo
+sobre un mismo cache, secuencial vs ProcessPoolExecutor con N workers.
+
+Uso:
+    python benchmark_paralelo.py [carpeta_exports] [workers ...]   (default: 1 2 4 cpu_count)
+
+También verifica que el cache resultante de cada corrida paralela sea
+idéntico al secuencial.
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+from pathlib import Path
+
+CARPETA_EJEMPLOS = Path(__file__).resolve().parent / "~"
+
+
+def _correr(archivos, workers):
+    """Procesa todos los archivos en orden y retorna (segundos, cache)"""
+    from core.cache import inicializar_cache
+    from core.indice import compactar, CLAVE_INDICE
+    from core.procesador import procesar_archivo, procesar_archivos_paralelo
+
+    cache = inicializar_cache()
+    inicio = time.perf_counter()
+
+    if workers > 1:
+        for _ in procesar_archivos_paralelo(archivos, cache, workers):
+            pass
+    else:
+        for ruta in archivos:
+            procesar_archivo(ruta, cache)
+
+    segundos = time.perf_counter() - inicio
+    compactar(cache)
+    cache.pop(CLAVE_INDICE, None)
+    return segundos, cache
+
+
+def main():
+    logging.getLogger("monitor_salud").setLevel(logging.ERROR)
+
+    args = sys.argv[1:]
+    carpeta = Path(args.pop(0)) if args and not args[0].isdigit() else CARPETA_EJEMPLOS
+    workers = [int(w) for w in args] or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    # Mismo orden que obtener_archivos_pendientes (nombre = timestamp)
+    archivos = sorted(glob.glob(str(carpeta / "health_data_*.json")))
+    if not archivos:
+        print(f"No hay exports en {carpeta}")
+        sys.exit(1)
+
+    mb = sum(os.path.getsize(f) for f in archivos) / 1024 / 1024
+
+    print("=" * 70)
+    print(f"BENCHMARK INGESTA PARALELA - {len(archivos)} archivos, {mb:.1f} MB, {os.cpu_count()} CPUs")
+    print("=" * 70)
+    print(f"{'Workers':>7} {'Tiempo (s)':>11} {'Archivos/s':>11} {'MB/s':>8} {'Speedup':>8} {'Cache':>8}")
+    print("-" * 70)
+
+    referencia = None
+    for n in workers:
+        segundos, cache = _correr(archivos, n)
+        if referencia is None:
+            referencia = (segundos, cache)
+        igual = "igual" if cache == referencia[1] else "DISTINTO"
+        print(f"{n:>7} {segundos:>11.3f} {len(archivos) / segundos:>11.1f} {mb / segundos:>8.1f} "
+              f"{referencia[0] / segundos:>7.2f}x {igual:>8}")
+
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
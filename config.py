@@ -5,6 +5,22 @@ INPUT_DIR = BASE_DIR
 PROCESADOS_DIR = INPUT_DIR / "procesados"
 
 CACHE_JSON = BASE_DIR / "cache_datos.json"
+CACHE_BIN = BASE_DIR / "cache_datos.bin"  # Base binaria del backend json (core/codec.py)
+CACHE_FORMATO = "binario"  # "binario" | "json" (el JSON se sigue leyendo para migrar; ver benchmark_cache.py)
+CACHE_COMPRESION = "zlib"  # None | "zlib" | "lzma"
+CACHE_FC = BASE_DIR / "cache_fc.bin"  # Serie compacta de FC por minuto (core/serie_fc.py)
+CACHE_SQLITE = BASE_DIR / "cache_datos.sqlite"  # Backend SQLite (core/almacen.py)
+CACHE_DIR = BASE_DIR / "cache"  # Backend por secciones: un archivo por sección + manifest
+CACHE_BACKEND = "json"  # "json" | "sqlite" | "secciones" (migrar con: python migrar_cache.py)
+CACHE_JOURNAL = BASE_DIR / "cache_datos.journal"  # Deltas por ciclo sobre CACHE_JSON
+CACHE_JOURNAL_ACTIVO = True
+CACHE_JOURNAL_MAX_BYTES = 512 * 1024  # Al pasarlo se compacta en la base
+CACHE_JOURNAL_MAX_ENTRADAS = 200
+CACHE_REGISTROS_COMPACTOS = True  # Registros con __slots__ en memoria (core/registros.py)
+CACHE_DIAS_RECIENTES = 90  # Backend por secciones: el dashboard lee solo los meses que cubren estos días
+CACHE_COLUMNAS = BASE_DIR / "columnas"  # Pasos/distancia/calorías en columnas mmap (core/columnas.py)
+RECONSTRUCCION_DIR = BASE_DIR / "reconstruccion"  # Checkpoint de reconstruir_cache.py (se borra al terminar)
+RECONSTRUCCION_CHECKPOINT_ARCHIVOS = 25  # Exports entre checkpoints
 OUTPUT_HTML = BASE_DIR / "index.html"
 GIT_REPO = BASE_DIR
 
@@ -25,6 +41,11 @@ TSB_CTL_DIAS = 42
 TSB_ATL_DIAS = 7
 TSB_OPTIMO_MIN = -10
 TSB_OPTIMO_MAX = 10
+CARGA_CONSTANTES_DIAS = (7, 28, 42, 90)  # EWMA de hrTSS del modelo de carga (metricas/carga.py)
+BANISTER_TAU_FITNESS = 42  # Modelo fitness-fatiga de Banister (días)
+BANISTER_TAU_FATIGA = 7
+BANISTER_K_FITNESS = 1.0
+BANISTER_K_FATIGA = 2.0
 SUENO_OBJETIVO_HORAS = 7
 SUENO_MINIMO_HORAS = 6
 
@@ -40,6 +61,12 @@ ARCHIVO_PREFIX = "health_data"
 ARCHIVO_EXTENSION = ".json"
 LIMPIEZA_AGRESIVA_FULL = True
 LIMPIEZA_DIFF = False
+INGESTA_STREAMING = False
+INGESTA_WORKERS = 1
+DIFF_SNAPSHOT_FULL = True
+FULL_MAX_REGISTROS = 1000  # Tope de registros por sección de un AUTO_FULL (corta los más nuevos)
+COALESCER_DIFF = True
+SALTAR_DIFF_VACIOS = True
 
 GRAFICOS_DIAS_HISTORICO = 30
 COLOR_EXCELENTE = "#3fb950"
@@ -0,0 +1,1130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacenamiento del cache (backends intercambiables)
+El resto del código sigue trabajando con el dict de listas de cargar_cache();
+el almacén solo decide cómo se lee y se escribe:
+
+- AlmacenJSON: la base completa (CACHE_BIN binaria, core/codec.py, o el JSON
+  de siempre en CACHE_JSON, según CACHE_FORMATO) + la serie FC binaria
+  (CACHE_FC), con un journal de deltas (CACHE_JOURNAL) para no reescribir
+  todo cada ciclo
+- AlmacenSQLite: un archivo SQLite (CACHE_SQLITE) con una tabla por sección
+- AlmacenSecciones: un archivo por mes de cada sección en CACHE_DIR + manifest,
+  con carga lazy, lectura de solo los meses recientes y escritura solo de
+  los meses que cambiaron
+
+En SQLite cada registro es una fila con su clave de upsert como PRIMARY KEY,
+columnas indexadas record_id / timestamp / epoch_local / dia_local y el
+registro completo como JSON. Al guardar, en una sola transacción, se
+insertan/reemplazan solo los registros nuevos o modificados y se borran
+los que ya no están (tombstones compactados, días re-procesados de un FULL).
+La columna "orden" conserva el orden de las listas del cache.
+
+Los consumidores pueden pedir una ventana de tiempo sin cargar todo:
+
+    obtener_almacen().ventana("pasos", desde_epoch, hasta_epoch)
+
+Backend en config.CACHE_BACKEND ("json" | "sqlite" | "secciones"). Para pasar
+un cache JSON existente a otro almacén: python migrar_cache.py json <destino>
+"""
+
+import os
+import json
+import zlib
+import base64
+import sqlite3
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+from collections import defaultdict
+from config import (
+    CACHE_JSON, CACHE_BIN, CACHE_FORMATO, CACHE_COMPRESION,
+    CACHE_FC, CACHE_SQLITE, CACHE_DIR, CACHE_BACKEND,
+    CACHE_JOURNAL, CACHE_JOURNAL_ACTIVO, CACHE_JOURNAL_MAX_BYTES, CACHE_JOURNAL_MAX_ENTRADAS
+)
+from utils.logger import logger
+from core.tiempo import EPOCH, CAMPO_EPOCH, CAMPO_DIA, CAMPOS_FECHA, epoch, dia
+from core.indice import CLAVE_SUCIAS, clave_registro
+from core import codec
+from core.registros import a_json
+from core.serie_fc import CLAVE_SERIE_FC, COLUMNAS, SerieFC, obtener_serie_fc, cargar_serie_fc
+
+# Estado de lo que hay en disco (solo SQLite): clave privada, no se guarda
+CLAVE_ALMACEN = "_almacen"
+
+# Claves de lista del cache que no son secciones de registros
+NO_SECCIONES = ("archivos_procesados",)
+
+PREFIJO_TABLA = "seccion_"
+
+# Archivo por mes del almacén por secciones para registros sin fecha válida
+SIN_FECHA = "sin_fecha"
+
+_ORDINAL_EPOCH = EPOCH.toordinal()
+
+
+def _es_seccion(clave, valor):
+    return isinstance(valor, list) and clave not in NO_SECCIONES and not clave.startswith("_")
+
+
+def _en_ventana(registro, desde, hasta):
+    e = epoch(registro)
+    return e is not None and e >= desde and (hasta is None or e < hasta)
+
+
+@lru_cache(maxsize=None)
+def _mes_de_dia(d):
+    """Ordinal del día -> AAAA-MM"""
+    return date.fromordinal(d).strftime("%Y-%m")
+
+
+def _mes(registro):
+    d = dia(registro)
+    return SIN_FECHA if d is None else _mes_de_dia(d)
+
+
+def _clave(seccion, registro):
+    """Clave de upsert como texto (PRIMARY KEY en SQLite, clave en el journal)"""
+    return repr(clave_registro(seccion, registro))
+
+
+def _estado_previo(cache, ruta):
+    """Copia del estado de disco que dejó el último leer/escribir de esa ruta (None si no hay)"""
+    guardado = cache.get(CLAVE_ALMACEN)
+    if guardado is None or guardado[0] != str(ruta):
+        return None
+    # Copia: si la escritura falla, el estado anterior sigue valiendo
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in guardado[1].items()}
+
+
+def _diferenciar(seccion, registros, previas):
+    """
+    Compara una sección contra lo que hay en disco.
+
+    Args:
+        previas (dict): {clave: huella} de lo guardado
+
+    Al releer, los registros sin cambios quedan en su orden de disco y los
+    re-escritos van al final. Para que la lista quede igual a la de memoria,
+    se re-escribe todo lo que sigue al prefijo común (ej: un registro
+    re-ingestado idéntico pasó al final de la lista por el upsert).
+
+    Returns:
+        tuple: ({clave: huella} actual, [(clave, registro)] a escribir,
+               [clave] que ya no están)
+    """
+    actuales = {}
+    entradas = []
+    for registro in registros:
+        clave = _clave(seccion, registro)
+        # repr del dict: mismo orden de claves que el JSON, mucho más rápido que json.dumps
+        huella = hash(repr(registro))
+        # Clave repetida en la lista: gana la última (igual que el upsert)
+        actuales.pop(clave, None)
+        actuales[clave] = huella
+        entradas.append((clave, registro))
+
+    sin_cambios = [clave for clave, huella in previas.items() if actuales.get(clave) == huella]
+    prefijo = 0
+    for (clave, _), anterior in zip(entradas, sin_cambios):
+        if clave != anterior:
+            break
+        prefijo += 1
+
+    eliminadas = [clave for clave in previas if clave not in actuales]
+    return actuales, entradas[prefijo:], eliminadas
+
+
+def _huellas_fc(serie):
+    """{dia_local: huella de sus buckets}"""
+    return {
+        d: hash(b"".join(getattr(bloque, nombre).tobytes() for nombre, _ in COLUMNAS))
+        for d, bloque in serie.dias.items()
+    }
+
+
+def _huella_meta(valor):
+    """Huella de un metadato para el journal: los dicts por clave, las listas por elemento"""
+    if isinstance(valor, dict):
+        return {clave: _huella_meta(v) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [hash(repr(v)) for v in valor]
+    return hash(repr(valor))
+
+
+def _parche_meta(valor, previa):
+    """
+    Cambio de un metadato respecto de la huella de lo que hay en disco.
+
+    Las tablas guardadas como metadato (diario_<seccion>, tsb_diario) cambian
+    en pocos días por ciclo: de un dict se escriben solo las claves que
+    cambiaron y de una lista solo la cola desde el primer elemento distinto.
+
+    Returns:
+        tuple: (huella actual, cambio o None si es igual). cambio es
+               {"valor": v}, {"desde": i, "cola": lista[i:]} o
+               {"claves": {clave: cambio}, "quitar": [clave]}
+    """
+    if isinstance(valor, dict) and isinstance(previa, dict):
+        huella = {}
+        claves = {}
+        for clave, v in valor.items():
+            huella[clave], cambio = _parche_meta(v, previa.get(clave))
+            if cambio is not None:
+                claves[clave] = cambio
+        quitar = [clave for clave in previa if clave not in huella]
+        if not claves and not quitar:
+            return huella, None
+        return huella, {"claves": claves, "quitar": quitar}
+
+    huella = _huella_meta(valor)
+    if huella == previa:
+        return huella, None
+    if isinstance(valor, list) and isinstance(previa, list):
+        desde = next((i for i, (a, b) in enumerate(zip(huella, previa)) if a != b), min(len(huella), len(previa)))
+        if desde:
+            return huella, {"desde": desde, "cola": valor[desde:]}
+    return huella, {"valor": valor}
+
+
+def _aplicar_parche(contenedor, clave, cambio):
+    """Aplica un cambio de _parche_meta (o un "extender" de journals anteriores)"""
+    if "valor" in cambio:
+        contenedor[clave] = cambio["valor"]
+    elif "extender" in cambio:
+        contenedor.setdefault(clave, []).extend(cambio["extender"])
+    elif "cola" in cambio:
+        lista = contenedor[clave]
+        del lista[cambio["desde"]:]
+        lista.extend(cambio["cola"])
+    else:
+        valor = contenedor[clave]
+        # Primero las claves quitadas: en el JSON una clave entera vuelve como texto
+        for quitada in cambio["quitar"]:
+            valor.pop(quitada, None)
+        for sub, cambio_sub in cambio["claves"].items():
+            _aplicar_parche(valor, sub, cambio_sub)
+
+
+class AlmacenJSON:
+    """
+    Base completa + serie FC binaria + journal de deltas.
+
+    La base se escribe en el formato de CACHE_FORMATO: "binario" (CACHE_BIN,
+    core/codec.py, con CACHE_COMPRESION) o "json" (CACHE_JSON, indent=2). Se
+    lee la que exista, así un cache JSON anterior se carga igual y pasa al
+    formato configurado en la próxima compactación.
+
+    guardar agrega al journal (CACHE_JOURNAL, una línea JSON por ciclo, con
+    fsync) solo lo que cambió desde lo que hay en disco: registros nuevos o
+    modificados y claves borradas por sección, lo que cambió de cada
+    metadato (claves de un dict, cola de una lista) y días de la serie
+    FC. Cuando el journal pasa CACHE_JOURNAL_MAX_BYTES o
+    CACHE_JOURNAL_MAX_ENTRADAS se compacta: se reescribe la base y se vacía.
+    leer carga la base y re-aplica el journal en orden.
+    """
+
+    nombre = "json"
+
+    def __init__(self, ruta=CACHE_JSON, ruta_fc=CACHE_FC, ruta_journal=CACHE_JOURNAL,
+                 ruta_bin=CACHE_BIN, formato=CACHE_FORMATO, compresion=CACHE_COMPRESION):
+        self.ruta = ruta
+        self.ruta_fc = ruta_fc
+        self.ruta_journal = ruta_journal
+        self.ruta_bin = ruta_bin
+        self.formato = formato
+        self.compresion = compresion
+
+    def existe(self):
+        return self.ruta.exists() or self.ruta_bin.exists()
+
+    def _leer_base(self):
+        """Base binaria o JSON: primero la del formato configurado"""
+        if self.ruta_bin.exists() and (self.formato == "binario" or not self.ruta.exists()):
+            return codec.decodificar(self.ruta_bin.read_bytes())
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _escribir_base(self, datos):
+        """Escribe la base en el formato configurado y borra la del otro formato"""
+        if self.formato == "binario":
+            _escribir_atomico(self.ruta_bin, codec.codificar(datos, self.compresion))
+            self.ruta.unlink(missing_ok=True)
+        else:
+            _escribir_atomico(self.ruta, json.dumps(datos, ensure_ascii=False, indent=2, default=a_json).encode("utf-8"))
+            self.ruta_bin.unlink(missing_ok=True)
+
+    def leer(self):
+        """Cache tal como está en disco: base + journal (la serie FC queda en "_serie_fc")"""
+        cache = self._leer_base()
+        cargar_serie_fc(cache, self.ruta_fc)
+
+        entradas = self._reproducir_journal(cache)
+        if entradas:
+            logger.info(f"📒 Journal: {entradas} deltas aplicados sobre la base")
+
+        if CACHE_JOURNAL_ACTIVO:
+            cache[CLAVE_ALMACEN] = (str(self.ruta), self._estado(cache, entradas))
+        return cache
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Journal
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _reproducir_journal(self, cache):
+        """
+        Aplica las entradas del journal sobre la base. Retorna cuántas.
+
+        Una escritura cortada (ej: corte de luz) deja la última línea
+        ilegible: el journal se trunca en la última entrada buena antes de
+        volver a escribir, si no los deltas siguientes quedarían detrás de
+        esa línea y no se leerían nunca.
+        """
+        if not self.ruta_journal.exists():
+            return 0
+
+        entradas = 0
+        validos = 0         # bytes hasta el final de la última entrada legible
+        sin_salto = False   # la última entrada legible no terminó de escribir el "\n"
+        secciones = {}      # seccion -> {clave: registro} de las secciones tocadas
+        with open(self.ruta_journal, 'rb') as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    logger.warning(f"Journal: entrada {entradas + 1} ilegible, se descarta desde ahí")
+                    break
+                self._aplicar_entrada(cache, entrada, secciones)
+                entradas += 1
+                validos += len(linea)
+                sin_salto = not linea.endswith(b"\n")
+            tamano = f.seek(0, os.SEEK_END)
+
+        if validos < tamano or sin_salto:
+            self._reparar_journal(validos, sin_salto, tamano)
+
+        for seccion, por_clave in secciones.items():
+            if por_clave is None:
+                cache.pop(seccion, None)
+            else:
+                cache[seccion] = list(por_clave.values())
+        return entradas
+
+    def _reparar_journal(self, validos, sin_salto, tamano):
+        """Trunca el journal en la última entrada legible (y le completa el salto de línea)"""
+        with open(self.ruta_journal, 'r+b') as f:
+            f.truncate(validos)
+            if sin_salto:
+                f.seek(validos)
+                f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if validos < tamano:
+            logger.warning(f"Journal: {tamano - validos} bytes ilegibles descartados del final")
+
+    @staticmethod
+    def _aplicar_entrada(cache, entrada, secciones):
+        for seccion, cambios in entrada.get("secciones", {}).items():
+            if cambios.get("quitar"):
+                secciones[seccion] = None
+                continue
+            por_clave = secciones.get(seccion)
+            if por_clave is None:
+                por_clave = {_clave(seccion, r): r for r in cache.get(seccion, [])}
+                secciones[seccion] = por_clave
+            for clave in cambios.get("borrar", ()):
+                por_clave.pop(clave, None)
+            for clave, registro in cambios.get("upsert", ()):
+                # Reemplazado o nuevo: va al final, igual que en la lista del cache
+                por_clave.pop(clave, None)
+                por_clave[clave] = registro
+
+        for clave, cambio in entrada.get("meta", {}).items():
+            _aplicar_parche(cache, clave, cambio)
+
+        fc = entrada.get("fc")
+        if fc:
+            serie = obtener_serie_fc(cache)
+            parcial = SerieFC.desde_bytes(base64.b64decode(fc["dias"]))
+            serie.borrar_dias(list(fc["borrar"]) + list(parcial.dias))
+            serie.fusionar(parcial)
+
+    def _estado(self, cache, entradas=0):
+        """Huellas de lo que hay en disco (para que escribir arme solo el delta)"""
+        estado = {"secciones": {}, "meta": {}, "fc": _huellas_fc(obtener_serie_fc(cache)), "entradas": entradas}
+        for clave, valor in cache.items():
+            if clave.startswith("_"):
+                continue
+            if _es_seccion(clave, valor):
+                estado["secciones"][clave] = _diferenciar(clave, valor, {})[0]
+            else:
+                estado["meta"][clave] = _huella_meta(valor)
+        return estado
+
+    def _delta(self, cache, estado):
+        """Entrada de journal con lo que cambió respecto del estado (None si nada)"""
+        entrada = {}
+
+        secciones = {}
+        for seccion, registros in cache.items():
+            if not _es_seccion(seccion, registros):
+                continue
+            nueva = seccion not in estado["secciones"]
+            actuales, cambiados, eliminadas = _diferenciar(seccion, registros, estado["secciones"].get(seccion, {}))
+            estado["secciones"][seccion] = actuales
+            if cambiados or eliminadas or nueva:
+                secciones[seccion] = {
+                    "upsert": [[clave, registro] for clave, registro in cambiados],
+                    "borrar": eliminadas,
+                }
+        # Secciones que ya no están en el cache (ej: fc_reposo migrado a la serie FC)
+        for seccion in [s for s in estado["secciones"] if not _es_seccion(s, cache.get(s))]:
+            secciones[seccion] = {"quitar": True}
+            del estado["secciones"][seccion]
+        if secciones:
+            entrada["secciones"] = secciones
+
+        meta = {}
+        for clave, valor in cache.items():
+            if clave.startswith("_") or _es_seccion(clave, valor):
+                continue
+            # Lista que solo creció (ej: archivos_procesados) o tabla con
+            # algunos días nuevos: se guarda solo lo que cambió
+            huella, cambio = _parche_meta(valor, estado["meta"].get(clave))
+            estado["meta"][clave] = huella
+            if cambio is not None:
+                meta[clave] = cambio
+        if meta:
+            entrada["meta"] = meta
+
+        serie = obtener_serie_fc(cache)
+        huellas = _huellas_fc(serie)
+        cambiados = [d for d, h in huellas.items() if estado["fc"].get(d) != h]
+        borrados = [d for d in estado["fc"] if d not in huellas]
+        estado["fc"] = huellas
+        if cambiados or borrados:
+            entrada["fc"] = {
+                "dias": base64.b64encode(serie.a_bytes(cambiados)).decode("ascii"),
+                "borrar": borrados,
+            }
+
+        return entrada or None
+
+    def compactar_journal(self, cache):
+        """Reescribe la base completa (archivo temporal + rename) y vacía el journal"""
+        _escribir_atomico(self.ruta_fc, obtener_serie_fc(cache).a_bytes())
+        self._escribir_base({k: v for k, v in cache.items() if not k.startswith("_")})
+        logger.info(f"Serie FC guardada: {self.ruta_fc} ({len(obtener_serie_fc(cache))} buckets)")
+
+        if self.ruta_journal.exists():
+            self.ruta_journal.unlink()
+        if CACHE_JOURNAL_ACTIVO:
+            cache[CLAVE_ALMACEN] = (str(self.ruta), self._estado(cache))
+
+    def escribir(self, cache):
+        estado = _estado_previo(cache, self.ruta) if CACHE_JOURNAL_ACTIVO else None
+        if estado is None or not self.existe():
+            self.compactar_journal(cache)
+            return
+
+        entrada = self._delta(cache, estado)
+        if entrada is not None:
+            texto = json.dumps(entrada, ensure_ascii=False, separators=(",", ":"), default=a_json) + "\n"
+            with open(self.ruta_journal, 'a', encoding='utf-8') as f:
+                f.write(texto)
+                f.flush()
+                os.fsync(f.fileno())
+            estado["entradas"] += 1
+            logger.info(f"📒 Journal: delta de {len(texto.encode('utf-8'))} bytes ({estado['entradas']} entradas)")
+        cache[CLAVE_ALMACEN] = (str(self.ruta), estado)
+
+        tamano = self.ruta_journal.stat().st_size if self.ruta_journal.exists() else 0
+        if tamano > CACHE_JOURNAL_MAX_BYTES or estado["entradas"] >= CACHE_JOURNAL_MAX_ENTRADAS:
+            logger.info(f"📒 Journal: {estado['entradas']} entradas / {tamano} bytes, compactando en la base")
+            self.compactar_journal(cache)
+
+    def ventana(self, seccion, desde, hasta=None):
+        """Registros de la sección con epoch_local en [desde, hasta) (lee base + journal)"""
+        if not self.existe():
+            return []
+        registros = self.leer().get(seccion, [])
+        return sorted((r for r in registros if _en_ventana(r, desde, hasta)), key=epoch)
+
+    def __str__(self):
+        return str(self.ruta_bin if self.formato == "binario" else self.ruta)
+
+
+def _escribir_atomico(ruta, datos):
+    """Escribe en un temporal, fsync y rename: la base nunca queda a medio escribir"""
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+class AlmacenSQLite:
+    """Una tabla por sección, escritura incremental y transaccional"""
+
+    nombre = "sqlite"
+
+    def __init__(self, ruta=CACHE_SQLITE):
+        self.ruta = ruta
+
+    def _conectar(self):
+        conexion = sqlite3.connect(str(self.ruta))
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+        conexion.execute("CREATE TABLE IF NOT EXISTS blobs (nombre TEXT PRIMARY KEY, datos BLOB NOT NULL)")
+        return conexion
+
+    @staticmethod
+    def _tabla(seccion):
+        return '"' + PREFIJO_TABLA + seccion.replace('"', '""') + '"'
+
+    def _crear_tabla(self, conexion, seccion):
+        tabla = self._tabla(seccion)
+        conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} ("
+            "clave TEXT PRIMARY KEY, orden INTEGER NOT NULL, record_id TEXT, "
+            "timestamp TEXT, epoch_local REAL, dia_local INTEGER, datos TEXT NOT NULL)"
+        )
+        for columna in ("orden", "record_id", "timestamp", "epoch_local", "dia_local"):
+            indice = '"ix_' + PREFIJO_TABLA + seccion.replace('"', '""') + '_' + columna + '"'
+            conexion.execute(f"CREATE INDEX IF NOT EXISTS {indice} ON {tabla} ({columna})")
+
+    def _secciones(self, conexion):
+        filas = conexion.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+            (PREFIJO_TABLA + "*",)
+        )
+        return [nombre[len(PREFIJO_TABLA):] for (nombre,) in filas]
+
+    def existe(self):
+        if not self.ruta.exists():
+            return False
+        conexion = sqlite3.connect(str(self.ruta))
+        try:
+            return conexion.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'"
+            ).fetchone() is not None
+        finally:
+            conexion.close()
+
+    def leer(self):
+        """
+        Arma el dict del cache desde las tablas y deja en "_almacen" el
+        estado leído (para que escribir() solo toque lo que cambió).
+        """
+        cache = {}
+        estado = {"secciones": {}, "meta": {}, "blobs": {}, "orden": 0}
+        conexion = self._conectar()
+        try:
+            for seccion in self._secciones(conexion):
+                registros = []
+                filas = {}
+                for clave, orden, datos in conexion.execute(
+                    f"SELECT clave, orden, datos FROM {self._tabla(seccion)} ORDER BY orden"
+                ):
+                    registro = json.loads(datos)
+                    registros.append(registro)
+                    filas[clave] = hash(repr(registro))
+                    estado["orden"] = max(estado["orden"], orden)
+                cache[seccion] = registros
+                estado["secciones"][seccion] = filas
+
+            for clave, valor in conexion.execute("SELECT clave, valor FROM meta"):
+                cache[clave] = json.loads(valor)
+                estado["meta"][clave] = hash(valor)
+
+            for nombre, datos in conexion.execute("SELECT nombre, datos FROM blobs"):
+                estado["blobs"][nombre] = hash(bytes(datos))
+                if nombre == CLAVE_SERIE_FC:
+                    try:
+                        cache[CLAVE_SERIE_FC] = SerieFC.desde_bytes(bytes(datos))
+                    except ValueError as e:
+                        logger.warning(f"Serie FC ilegible ({e}), se empieza vacía")
+        finally:
+            conexion.close()
+
+        cache[CLAVE_ALMACEN] = (str(self.ruta), estado)
+        return cache
+
+    def _estado(self, cache, conexion):
+        """Estado de lo que hay en disco: el de leer() o, si el cache vino de otro lado, consultado"""
+        previo = _estado_previo(cache, self.ruta)
+        if previo is not None:
+            return previo
+
+        estado = {"secciones": {}, "meta": {}, "blobs": {}, "orden": 0}
+        for seccion in self._secciones(conexion):
+            filas = {}
+            for clave, orden, datos in conexion.execute(
+                f"SELECT clave, orden, datos FROM {self._tabla(seccion)} ORDER BY orden"
+            ):
+                filas[clave] = hash(repr(json.loads(datos)))
+                estado["orden"] = max(estado["orden"], orden)
+            estado["secciones"][seccion] = filas
+        for clave, valor in conexion.execute("SELECT clave, valor FROM meta"):
+            estado["meta"][clave] = hash(valor)
+        for nombre, datos in conexion.execute("SELECT nombre, datos FROM blobs"):
+            estado["blobs"][nombre] = hash(bytes(datos))
+        return estado
+
+    def escribir(self, cache):
+        """
+        Upserts y deletes de todas las secciones en una sola transacción.
+
+        Returns:
+            tuple: (filas escritas, filas borradas)
+        """
+        escritas = borradas = 0
+        conexion = self._conectar()
+        try:
+            estado = self._estado(cache, conexion)
+            orden = estado["orden"]
+            with conexion:
+                for seccion, registros in cache.items():
+                    if not _es_seccion(seccion, registros):
+                        continue
+                    self._crear_tabla(conexion, seccion)
+                    tabla = self._tabla(seccion)
+                    previas = estado["secciones"].get(seccion, {})
+
+                    actuales, cambiados, eliminadas = _diferenciar(seccion, registros, previas)
+                    filas = []
+                    for clave, registro in cambiados:
+                        orden += 1
+                        datos = json.dumps(registro, ensure_ascii=False, default=a_json)
+                        filas.append((
+                            clave, orden, registro.get("record_id") or registro.get("session_id"),
+                            next((registro[c] for c in CAMPOS_FECHA if registro.get(c)), None),
+                            registro.get(CAMPO_EPOCH), registro.get(CAMPO_DIA), datos
+                        ))
+
+                    if filas:
+                        conexion.executemany(
+                            f"INSERT OR REPLACE INTO {tabla} "
+                            "(clave, orden, record_id, timestamp, epoch_local, dia_local, datos) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            filas
+                        )
+                    if eliminadas:
+                        conexion.executemany(f"DELETE FROM {tabla} WHERE clave = ?", [(c,) for c in eliminadas])
+
+                    escritas += len(filas)
+                    borradas += len(eliminadas)
+                    estado["secciones"][seccion] = actuales
+
+                # Secciones que ya no están en el cache (ej: fc_reposo migrado a la serie FC)
+                for seccion in [s for s in estado["secciones"] if not _es_seccion(s, cache.get(s))]:
+                    borradas += conexion.execute(f"DELETE FROM {self._tabla(seccion)}").rowcount
+                    del estado["secciones"][seccion]
+
+                for clave, valor in cache.items():
+                    if clave.startswith("_") or _es_seccion(clave, valor):
+                        continue
+                    texto = json.dumps(valor, ensure_ascii=False)
+                    if estado["meta"].get(clave) != hash(texto):
+                        conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, texto))
+                        estado["meta"][clave] = hash(texto)
+
+                serie = obtener_serie_fc(cache).a_bytes()
+                if estado["blobs"].get(CLAVE_SERIE_FC) != hash(serie):
+                    conexion.execute(
+                        "INSERT OR REPLACE INTO blobs (nombre, datos) VALUES (?, ?)",
+                        (CLAVE_SERIE_FC, serie)
+                    )
+                    estado["blobs"][CLAVE_SERIE_FC] = hash(serie)
+        finally:
+            conexion.close()
+
+        estado["orden"] = orden
+        cache[CLAVE_ALMACEN] = (str(self.ruta), estado)
+        logger.info(f"🗄️  SQLite: {escritas} filas escritas, {borradas} borradas")
+        return escritas, borradas
+
+    def ventana(self, seccion, desde, hasta=None):
+        """Registros de la sección con epoch_local en [desde, hasta), por índice"""
+        if not self.ruta.exists():
+            return []
+        conexion = self._conectar()
+        try:
+            if seccion not in self._secciones(conexion):
+                return []
+            consulta = f"SELECT datos FROM {self._tabla(seccion)} WHERE epoch_local >= ?"
+            parametros = [desde]
+            if hasta is not None:
+                consulta += " AND epoch_local < ?"
+                parametros.append(hasta)
+            consulta += " ORDER BY epoch_local, orden"
+            return [json.loads(datos) for (datos,) in conexion.execute(consulta, parametros)]
+        finally:
+            conexion.close()
+
+    def __str__(self):
+        return str(self.ruta)
+
+
+class CacheParticionado(dict):
+    """
+    dict del cache con carga lazy (almacén por secciones).
+
+    Las particiones que todavía no se leyeron no están en el dict: se leen
+    la primera vez que se accede a la clave (cache["pasos"], get, setdefault,
+    pop). Recorrer items()/values() lee todas. cargadas() dice cuáles ya están
+    en memoria sin leer nada.
+    """
+
+    def __init__(self, almacen, pendientes):
+        super().__init__()
+        self._almacen = almacen
+        self._pendientes = set(pendientes)
+        self._recientes = {}
+        self.al_cargar = None   # al_cargar(cache, clave, valor): migraciones al leer
+
+    @property
+    def almacen(self):
+        return self._almacen
+
+    def _cargar(self, clave):
+        self._pendientes.discard(clave)
+        self._recientes.pop(clave, None)
+        valor = self._almacen.leer_particion(clave)
+        dict.__setitem__(self, clave, valor)
+        if self.al_cargar is not None:
+            self.al_cargar(self, clave, valor)
+        return valor
+
+    def cargadas(self):
+        return list(dict.keys(self))
+
+    def pendiente(self, clave):
+        """La partición existe en disco y todavía no se leyó"""
+        return clave in self._pendientes
+
+    def reciente(self, clave, desde_dia):
+        """
+        Historial reciente de una sección sin leerla entera (ver
+        AlmacenSecciones.leer_reciente). Si ya está en memoria, la lista completa.
+        """
+        if not self.pendiente(clave):
+            return self.get(clave, [])
+        guardado = self._recientes.get(clave)
+        if guardado is None or guardado[0] != desde_dia:
+            guardado = (desde_dia, self._almacen.leer_reciente(clave, desde_dia))
+            self._recientes[clave] = guardado
+        return guardado[1]
+
+    def cargar_todo(self):
+        for clave in sorted(self._pendientes):
+            self._cargar(clave)
+
+    def __missing__(self, clave):
+        if clave in self._pendientes:
+            return self._cargar(clave)
+        raise KeyError(clave)
+
+    def __contains__(self, clave):
+        return dict.__contains__(self, clave) or clave in self._pendientes
+
+    def __iter__(self):
+        yield from list(dict.keys(self)) + sorted(self._pendientes)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._pendientes)
+
+    def __setitem__(self, clave, valor):
+        self._pendientes.discard(clave)
+        dict.__setitem__(self, clave, valor)
+
+    def __delitem__(self, clave):
+        if clave in self._pendientes:
+            self._pendientes.discard(clave)
+        else:
+            dict.__delitem__(self, clave)
+
+    def get(self, clave, defecto=None):
+        if dict.__contains__(self, clave):
+            return dict.__getitem__(self, clave)
+        if clave in self._pendientes:
+            return self._cargar(clave)
+        return defecto
+
+    def setdefault(self, clave, defecto=None):
+        if clave not in self:
+            self[clave] = defecto
+        return self[clave]
+
+    def pop(self, clave, *defecto):
+        if clave in self._pendientes:
+            self._cargar(clave)
+        return dict.pop(self, clave, *defecto)
+
+    def update(self, *args, **kwargs):
+        for clave, valor in dict(*args, **kwargs).items():
+            self[clave] = valor
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        self.cargar_todo()
+        return dict.items(self)
+
+    def values(self):
+        self.cargar_todo()
+        return dict.values(self)
+
+
+class AlmacenSecciones:
+    """
+    Una partición por clave del cache en CACHE_DIR + manifest.json.
+
+    - Secciones de registros: un JSON por mes (<seccion>/<AAAA-MM>.json, los
+      registros sin fecha en <seccion>/sin_fecha.json). El manifest guarda por
+      mes registros / bytes / crc / días distintos, y "orden": los tramos
+      [mes, n] en el orden de la lista, para rearmarla idéntica al leerla.
+    - Metadatos grandes (archivos_procesados, snapshot_full, tsb_diario): un
+      JSON por clave. La serie FC: fc.bin. Los valores sueltos (ultima_actualizacion)
+      van en el manifest.
+    - leer() solo lee el manifest: cada partición se lee cuando se pide
+      (ver CacheParticionado). leer_reciente() lee solo los meses recientes
+      de una sección.
+    - escribir() reescribe solo las particiones sucias: las que marcaron los
+      extractores, aplicar_delta, compactar, etc. (ver marcar_sucias), más las
+      que cambiaron de tamaño o la serie FC si su CRC cambió. De una sección
+      sucia solo se escriben los meses cuyo contenido cambió. Las que no se
+      leyeron no se tocan. Cada archivo se escribe atómico y el manifest al final.
+    - checkpoints.json: estados calculados sobre el historial viejo (ej: el
+      EWMA del TSB), ver core.cache.historial_con_checkpoint.
+    """
+
+    nombre = "secciones"
+
+    def __init__(self, directorio=CACHE_DIR):
+        self.directorio = directorio
+        self.ruta_manifest = directorio / "manifest.json"
+        self.ruta_checkpoints = directorio / "checkpoints.json"
+
+    def existe(self):
+        return self.ruta_manifest.exists()
+
+    def _manifest(self):
+        with open(self.ruta_manifest, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _archivo(clave):
+        return "fc.bin" if clave == CLAVE_SERIE_FC else f"{clave}.json"
+
+    def _leer_json(self, archivo):
+        with open(self.directorio / archivo, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def leer_particion(self, clave):
+        if clave == CLAVE_SERIE_FC:
+            return SerieFC.desde_bytes((self.directorio / self._archivo(clave)).read_bytes())
+        particion = self._manifest().get("particiones", {}).get(clave, {})
+        if "meses" not in particion:
+            return self._leer_json(self._archivo(clave))
+        return self._rearmar(particion, particion["orden"])
+
+    def _rearmar(self, particion, tramos):
+        """
+        Lista en el orden original a partir de los tramos [mes, n]. De cada
+        mes se leen solo los últimos registros que usan los tramos (en un
+        sufijo de la lista, los de un mes son siempre los últimos de su archivo).
+        """
+        usados = defaultdict(int)
+        for mes, n in tramos:
+            usados[mes] += n
+        colas = {}
+        for mes, n in usados.items():
+            registros = self._leer_json(particion["meses"][mes]["archivo"])
+            colas[mes] = iter(registros[len(registros) - n:])
+
+        lista = []
+        for mes, n in tramos:
+            lista.extend(islice(colas[mes], n))
+        return lista
+
+    def leer(self):
+        """Cache lazy: valores del manifest cargados, particiones pendientes"""
+        manifest = self._manifest()
+        cache = CacheParticionado(self, manifest.get("particiones", {}))
+        for clave, valor in manifest.get("valores", {}).items():
+            cache[clave] = valor
+        cache[CLAVE_ALMACEN] = (str(self.directorio), {})
+        return cache
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Historial reciente / viejo de una sección
+    # ─────────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _inicio_sufijo(particion, mes_desde, minimo):
+        """
+        Primer tramo del sufijo más corto de la lista que:
+        - tiene completos todos los meses >= mes_desde
+        - incluye algún registro de un mes anterior (si existe): así una
+          búsqueda hacia atrás de "el último registro antes de X" termina
+          dentro del sufijo
+        - tiene al menos `minimo` registros y `minimo` días distintos en los
+          meses completos más recientes (los consumidores miran los últimos
+          7 registros / 7 días con datos)
+        Cualquier cálculo que solo mire eso da lo mismo con el sufijo que
+        con la lista completa.
+        """
+        tramos = particion["orden"]
+        meses = particion["meses"]
+        fechados = sorted((m for m in meses if m != SIN_FECHA), reverse=True)
+        calientes = {m for m in fechados if m >= mes_desde}
+        hay_viejos = len(calientes) < len(fechados)
+
+        incluidos = defaultdict(int)
+        faltan = len(calientes)
+        con_viejo = False
+        cantidad = 0
+        i = len(tramos)
+        while i > 0:
+            if faltan == 0 and (con_viejo or not hay_viejos) and cantidad >= minimo:
+                dias = 0
+                for m in fechados:
+                    if incluidos[m] < meses[m]["registros"]:
+                        break
+                    dias += meses[m]["dias"]
+                    if dias >= minimo:
+                        break
+                if dias >= minimo:
+                    break
+            i -= 1
+            mes, n = tramos[i]
+            incluidos[mes] += n
+            cantidad += n
+            if mes in calientes and incluidos[mes] == meses[mes]["registros"]:
+                faltan -= 1
+            elif mes != SIN_FECHA and mes < mes_desde:
+                con_viejo = True
+        return i
+
+    def leer_reciente(self, clave, desde_dia, minimo=7):
+        """
+        Sufijo de la lista de una sección que cubre desde el mes de
+        desde_dia (ver _inicio_sufijo). Lee solo los meses que aparecen en él.
+        """
+        particion = self._manifest().get("particiones", {}).get(clave)
+        if particion is None:
+            return []
+        if "meses" not in particion:
+            return self.leer_particion(clave)
+        inicio = self._inicio_sufijo(particion, _mes_de_dia(desde_dia), minimo)
+        return self._rearmar(particion, particion["orden"][inicio:])
+
+    def registros(self, clave):
+        """Cantidad de registros de una partición según el manifest (sin leerla)"""
+        return self._manifest().get("particiones", {}).get(clave, {}).get("registros", 0)
+
+    def huella_anterior(self, clave, desde_dia):
+        """Huella de los meses anteriores al de desde_dia (None si la sección no está por meses)"""
+        particion = self._manifest().get("particiones", {}).get(clave, {})
+        if "meses" not in particion:
+            return None
+        mes_desde = _mes_de_dia(desde_dia)
+        viejos = sorted(
+            (mes, info["crc"], info["registros"]) for mes, info in particion["meses"].items()
+            if mes != SIN_FECHA and mes < mes_desde
+        )
+        return zlib.crc32(repr(viejos).encode("utf-8"))
+
+    def leer_anterior(self, clave, desde_dia):
+        """Registros de los meses anteriores al de desde_dia, por mes (dentro del mes, en orden de lista)"""
+        particion = self._manifest().get("particiones", {}).get(clave, {})
+        mes_desde = _mes_de_dia(desde_dia)
+        registros = []
+        for mes in sorted(particion.get("meses", {})):
+            if mes != SIN_FECHA and mes < mes_desde:
+                registros.extend(self._leer_json(particion["meses"][mes]["archivo"]))
+        return registros
+
+    def leer_checkpoint(self, nombre):
+        if not self.ruta_checkpoints.exists():
+            return None
+        with open(self.ruta_checkpoints, 'r', encoding='utf-8') as f:
+            return json.load(f).get(nombre)
+
+    def guardar_checkpoint(self, nombre, valor):
+        checkpoints = {}
+        if self.ruta_checkpoints.exists():
+            with open(self.ruta_checkpoints, 'r', encoding='utf-8') as f:
+                checkpoints = json.load(f)
+        checkpoints[nombre] = valor
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        _escribir_atomico(self.ruta_checkpoints, json.dumps(checkpoints, indent=2).encode("utf-8"))
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Escritura
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _escribir_meses(self, clave, registros, previa):
+        """
+        Escribe los meses de una sección cuyo contenido cambió.
+
+        Returns:
+            tuple: (entrada del manifest, meses escritos)
+        """
+        grupos = {}
+        tramos = []
+        for registro in registros:
+            mes = _mes(registro)
+            grupos.setdefault(mes, []).append(registro)
+            if tramos and tramos[-1][0] == mes:
+                tramos[-1][1] += 1
+            else:
+                tramos.append([mes, 1])
+
+        anteriores = (previa or {}).get("meses", {})
+        (self.directorio / clave).mkdir(exist_ok=True)
+        meses = {}
+        escritos = 0
+        for mes, lista in grupos.items():
+            datos = json.dumps(lista, ensure_ascii=False, default=a_json).encode("utf-8")
+            info = {
+                "archivo": f"{clave}/{mes}.json",
+                "registros": len(lista),
+                "bytes": len(datos),
+                "crc": zlib.crc32(datos),
+                "dias": len({dia(r) for r in lista}),
+            }
+            anterior = anteriores.get(mes)
+            if anterior is None or anterior["crc"] != info["crc"] or anterior["bytes"] != info["bytes"]:
+                _escribir_atomico(self.directorio / info["archivo"], datos)
+                escritos += 1
+            meses[mes] = info
+
+        # Meses que quedaron vacíos / archivo único de la versión anterior
+        for mes, anterior in anteriores.items():
+            if mes not in meses:
+                (self.directorio / anterior["archivo"]).unlink(missing_ok=True)
+        if previa is not None and "meses" not in previa:
+            (self.directorio / previa["archivo"]).unlink(missing_ok=True)
+
+        entrada = {
+            "archivo": f"{clave}/",
+            "registros": len(registros),
+            "meses": meses,
+            "orden": tramos,
+        }
+        return entrada, escritos
+
+    def escribir(self, cache):
+        """
+        Returns:
+            list: Particiones escritas
+        """
+        completo = _estado_previo(cache, self.directorio) is None
+        manifest = self._manifest() if self.existe() else {}
+        anteriores = manifest.get("particiones", {})
+        sucias = cache.get(CLAVE_SUCIAS) or set()
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        particiones = {}
+        valores = {}
+        escritas = []
+        meses_escritos = 0
+        for clave in list(dict.keys(cache)):
+            valor = dict.__getitem__(cache, clave)
+            if clave.startswith("_") and clave != CLAVE_SERIE_FC:
+                continue
+            if clave != CLAVE_SERIE_FC and not isinstance(valor, (list, dict)):
+                valores[clave] = valor
+                continue
+
+            previa = anteriores.get(clave)
+            datos = valor.a_bytes() if clave == CLAVE_SERIE_FC else None
+            cambio = (
+                completo or previa is None or clave in sucias
+                or (isinstance(valor, list) and len(valor) != previa.get("registros"))
+                or (datos is not None and zlib.crc32(datos) != previa.get("crc"))
+            )
+            if not cambio:
+                particiones[clave] = previa
+                continue
+
+            if _es_seccion(clave, valor):
+                particiones[clave], escritos = self._escribir_meses(clave, valor, previa)
+                meses_escritos += escritos
+                escritas.append(clave)
+                continue
+
+            if datos is None:
+                datos = json.dumps(valor, ensure_ascii=False).encode("utf-8")
+            _escribir_atomico(self.directorio / self._archivo(clave), datos)
+            particiones[clave] = {
+                "archivo": self._archivo(clave),
+                "registros": len(valor),
+                "bytes": len(datos),
+                "crc": zlib.crc32(datos),
+            }
+            escritas.append(clave)
+
+        # Particiones que no se leyeron siguen igual; las que ya no están se borran
+        for clave, previa in anteriores.items():
+            if clave in particiones:
+                continue
+            if not completo and clave in cache:
+                particiones[clave] = previa
+            elif "meses" in previa:
+                for info in previa["meses"].values():
+                    (self.directorio / info["archivo"]).unlink(missing_ok=True)
+            else:
+                (self.directorio / previa["archivo"]).unlink(missing_ok=True)
+
+        manifest = {"version": 2, "valores": valores, "particiones": particiones}
+        _escribir_atomico(self.ruta_manifest, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+        cache[CLAVE_ALMACEN] = (str(self.directorio), {})
+        logger.info(
+            f"🗂️  Secciones escritas: {', '.join(escritas) if escritas else 'ninguna'} "
+            f"({meses_escritos} meses, {len(particiones)} en el manifest)"
+        )
+        return escritas
+
+    def ventana(self, seccion, desde, hasta=None):
+        """Registros de la sección con epoch_local en [desde, hasta) (lee solo los meses que tocan la ventana)"""
+        if not self.existe():
+            return []
+        particion = self._manifest().get("particiones", {}).get(seccion)
+        if particion is None:
+            return []
+        if "meses" not in particion:
+            registros = self.leer_particion(seccion)
+        else:
+            mes_desde = _mes_de_dia(int(desde // 86400) + _ORDINAL_EPOCH)
+            mes_hasta = None if hasta is None else _mes_de_dia(int(hasta // 86400) + _ORDINAL_EPOCH)
+            registros = []
+            for mes, info in particion["meses"].items():
+                if mes != SIN_FECHA and mes >= mes_desde and (mes_hasta is None or mes <= mes_hasta):
+                    registros.extend(self._leer_json(info["archivo"]))
+        return sorted((r for r in registros if _en_ventana(r, desde, hasta)), key=epoch)
+
+    def __str__(self):
+        return str(self.directorio)
+
+
+ALMACENES = {
+    AlmacenJSON.nombre: AlmacenJSON,
+    AlmacenSQLite.nombre: AlmacenSQLite,
+    AlmacenSecciones.nombre: AlmacenSecciones,
+}
+
+
+def obtener_almacen(nombre=None):
+    """Almacén configurado (config.CACHE_BACKEND) o el pedido por nombre"""
+    nombre = nombre or CACHE_BACKEND
+    if nombre not in ALMACENES:
+        raise ValueError(f"Backend de cache desconocido: {nombre} (opciones: {', '.join(ALMACENES)})")
+    return ALMACENES[nombre]()
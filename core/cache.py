@@ -8,8 +8,21 @@ Estructura JSON que almacena todos los datos procesados
 
 import json
 from pathlib import Path
-from config import CACHE_JSON
+from datetime import date, datetime, timedelta
+from config import CACHE_DIAS_RECIENTES, CACHE_REGISTROS_COMPACTOS, INPUT_DIR
 from utils.logger import logger
+from core.tiempo import normalizar_seccion, dia_iso, epoch_de, ordenados
+from core.indice import CLAVE_SUCIAS, compactar, cargar_secciones, marcar_sucias, ventana
+from core.fases_sueno import migrar_stages
+from core.serie_fc import CLAVE_SERIE_FC, obtener_serie_fc, vista_fc_reposo, vista_frecuencia_cardiaca
+from core.almacen import CacheParticionado, obtener_almacen
+from core.columnas import CLAVE_COLUMNAS, guardar_columnas
+from core.manifiesto import obtener_manifiesto
+from core.registros import compactar_seccion
+from core.diario import actualizar_diarios
+
+# Cache vacío por un almacén que no se pudo leer: guardar_cache no lo escribe
+CLAVE_CARGA_FALLIDA = "_carga_fallida"
 
 
 def inicializar_cache():
@@ -24,7 +37,7 @@ def inicializar_cache():
         
         # Métricas agregadas anteriormente
         "grasa_corporal": [],
-        "fc_reposo": [],
+        # fc_reposo / frecuencia_cardiaca: vistas de la serie FC compacta (core/serie_fc.py)
         "vo2max": [],
         "masa_muscular": [],
         "spo2": [],
@@ -34,7 +47,6 @@ def inicializar_cache():
         # ⭐ NUEVAS MÉTRICAS AGREGADAS
         "distancia": [],
         "calorias_totales": [],
-        "frecuencia_cardiaca": [],
         "glucosa": [],
         "tasa_metabolica": [],
         "masa_agua": [],
@@ -43,19 +55,52 @@ def inicializar_cache():
         
         # Metadata
         "archivos_procesados": [],
+        "snapshot_full": {},  # ✅ Digests por sección del último FULL (ver core/snapshot.py)
         "ultima_actualizacion": None
     }
 
 
-def cargar_cache():
+def _migrar_seccion(cache, key, valor):
+    """Migraciones de caches anteriores para una sección (al cargarla)"""
+    if not isinstance(valor, list) or key == "archivos_procesados":
+        return
+    
+    # Columnas de tiempo (epoch + día local) para caches anteriores
+    normalizados = normalizar_seccion(valor)
+    if normalizados:
+        logger.info(f"🕒 {key}: {normalizados} registros con tiempo normalizado")
+        marcar_sucias(cache, key)
+    
+    # ⚡ Fases de sueño por tramos para caches anteriores
+    if key == "sueno":
+        migradas = migrar_stages(valor)
+        if migradas:
+            logger.info(f"😴 sueno: {migradas} sesiones con fases codificadas por tramos")
+            marcar_sucias(cache, key)
+    
+    # 🗜️ Registros con __slots__ y strings compartidos (misma interfaz de dict)
+    if CACHE_REGISTROS_COMPACTOS:
+        compactar_seccion(valor)
+
+
+def cargar_cache(almacen=None, secciones=None):
     """
-    Carga el cache desde archivo JSON.
-    Si no existe o está corrupto, inicializa uno nuevo.
+    Carga el cache desde el almacén configurado (JSON, SQLite o por secciones,
+    ver core/almacen.py). Si no existe, inicializa uno nuevo.
+    
+    Si existe pero no se puede leer (base o journal corruptos, migración que
+    falla) devuelve uno nuevo marcado con CLAVE_CARGA_FALLIDA: guardar_cache
+    se niega a escribirlo, para no pisar el almacén (ni borrar su journal)
+    con un cache vacío.
+    
+    Args:
+        secciones (list): Almacén por secciones: las que se leen ahora (el
+            resto se lee recién cuando alguien la pide)
     """
+    almacen = almacen or obtener_almacen()
     try:
-        if CACHE_JSON.exists():
-            with open(CACHE_JSON, 'r', encoding='utf-8') as f:
-                cache = json.load(f)
+        if almacen.existe():
+            cache = almacen.leer()
             
             # Asegurar que todas las claves existan (migración automática)
             cache_nuevo = inicializar_cache()
@@ -64,52 +109,178 @@ def cargar_cache():
                     cache[key] = cache_nuevo[key]
                     logger.info(f"➕ Métrica nueva agregada al cache: {key}")
             
-            logger.info(f"Cache cargado: {CACHE_JSON}")
+            # Migraciones por sección (en el cache lazy, cuando se lee cada una)
+            if isinstance(cache, CacheParticionado):
+                cache.al_cargar = _migrar_seccion
+                cargar_secciones(cache, secciones or ())
+            else:
+                for key, valor in list(cache.items()):
+                    _migrar_seccion(cache, key, valor)
+            
+            # Store por clave: los duplicados de caches anteriores se eliminan una vez
+            if compactar(cache):
+                logger.info("♻️  Duplicados del cache anterior eliminados")
+            
+            # ⚡ Serie FC compacta (binario aparte); migra fc_reposo de caches anteriores
+            if CLAVE_SERIE_FC not in cache:
+                obtener_serie_fc(cache)
+            
+            # 📊 Pasos/distancia/calorías en columnas mmap (se abren a pedido)
+            cache[CLAVE_COLUMNAS] = {}
+            
+            logger.info(f"Cache cargado: {almacen}")
             return cache
         else:
             logger.info("No existe cache previo. Creando nuevo...")
             return inicializar_cache()
     
-    except json.JSONDecodeError:
-        logger.warning("Cache corrupto. Creando nuevo...")
-        return inicializar_cache()
+    except json.JSONDecodeError as e:
+        logger.error(f"Cache corrupto ({e}): no se guardará hasta repararlo")
+        return _cache_no_cargado(e)
     
     except Exception as e:
         logger.error(f"Error cargando cache: {e}")
-        return inicializar_cache()
+        return _cache_no_cargado(e)
 
 
-def guardar_cache(cache):
-    """
-    Guarda el cache en archivo JSON.
+def _cache_no_cargado(error):
+    """Cache nuevo para seguir funcionando, marcado para no guardarse"""
+    cache = inicializar_cache()
+    cache[CLAVE_CARGA_FALLIDA] = str(error)
+    return cache
+
+
+def guardar_cache(cache, almacen=None, columnas=True):
     """
-    from datetime import datetime
+    Guarda el cache en el almacén configurado (JSON o SQLite) y las
+    series columnares modificadas (core/columnas.py).
+    Antes actualiza las tablas diarias (core/diario.py), elimina los
+    registros borrados (tombstones) y no guarda las claves privadas de
+    runtime ("_indice", ...).
     
+    Args:
+        columnas (bool): False para un cache que no es el del dashboard
+            (ej: el checkpoint de reconstruir_cache.py)
+    """
+    almacen = almacen or obtener_almacen()
+    if CLAVE_CARGA_FALLIDA in cache:
+        logger.error(f"Cache no guardado: el almacén no se pudo leer ({cache[CLAVE_CARGA_FALLIDA]})")
+        return
     try:
+        # 📅 Tablas diarias: solo los días con registros nuevos o borrados
+        actualizar_diarios(cache)
+        compactar(cache)
         cache["ultima_actualizacion"] = datetime.now().isoformat()
         
-        with open(CACHE_JSON, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
+        almacen.escribir(cache)
+        if columnas:
+            guardar_columnas(cache)
+        cache.pop(CLAVE_SUCIAS, None)
         
-        logger.info(f"Cache guardado: {CACHE_JSON}")
+        logger.info(f"Cache guardado: {almacen}")
         
     except Exception as e:
         logger.error(f"Error guardando cache: {e}")
 
 
+def consultar_ventana(seccion, desde, hasta=None, almacen=None):
+    """
+    Registros de una sección con epoch_local en [desde, hasta), leídos
+    directo del almacén (en SQLite usa el índice, sin cargar el cache).
+    
+    Args:
+        seccion (str): Sección del cache (ej: "pasos")
+        desde (float): Epoch local inicial (ver core.tiempo.epoch_limite)
+        hasta (float): Epoch local final (excluido), None = sin límite
+    """
+    almacen = almacen or obtener_almacen()
+    return almacen.ventana(seccion, desde, hasta)
+
+
+def _primer_dia_reciente(dias):
+    """Primer día del mes de (hoy - dias): los meses se leen enteros"""
+    return (date.today() - timedelta(days=dias)).replace(day=1).toordinal()
+
+
+def historial_reciente(cache, seccion, dias=CACHE_DIAS_RECIENTES):
+    """
+    Registros de una sección para cálculos que miran solo los últimos `dias`
+    días, los últimos 7 registros o los últimos 7 días con datos (gráficos,
+    métricas del dashboard).
+    
+    Con el cache lazy (almacén por secciones) lee solo los meses recientes
+    (ver AlmacenSecciones.leer_reciente). Si la sección ya está en memoria,
+    es una ventana del índice ordenado por epoch (bisect, sin recorrerla)
+    desde el mismo mes y con al menos los últimos 7 registros.
+    
+    Returns:
+        SerieOrdenada: Los registros en orden de tiempo (ver core.tiempo), no
+        en el de la lista: el último es la medición más reciente aunque se
+        haya ingestado antes que otras más viejas (ej: "Peso Actual")
+    """
+    primer_dia = _primer_dia_reciente(dias)
+    if isinstance(cache, CacheParticionado) and cache.pendiente(seccion):
+        return ordenados(cache.reciente(seccion, primer_dia))
+    return ventana(cache, seccion, epoch_de(datetime.fromordinal(primer_dia)), minimo=7)
+
+
+def historial_con_checkpoint(cache, seccion, nombre, calcular, dias=CACHE_DIAS_RECIENTES):
+    """
+    Para cálculos sobre toda la historia (ej: EWMA del TSB): estado guardado
+    hasta el fin del último mes viejo + los registros recientes.
+    
+    Args:
+        calcular: calcular(registros_viejos, hasta_dia) -> estado (JSON). Se
+            llama solo cuando cambia el mes de corte o cambiaron los meses
+            viejos de la sección; el resultado queda en checkpoints.json.
+    
+    Returns:
+        tuple: (estado, registros). Sin cache lazy, con la sección ya en
+               memoria o guardada en un solo archivo: (None, lista completa)
+    """
+    if not isinstance(cache, CacheParticionado) or not cache.pendiente(seccion):
+        return None, cache.get(seccion, [])
+    
+    almacen = cache.almacen
+    desde = _primer_dia_reciente(dias)
+    huella = almacen.huella_anterior(seccion, desde)
+    if huella is None:
+        return None, cache.get(seccion, [])
+    
+    guardado = almacen.leer_checkpoint(nombre)
+    if guardado is None or guardado.get("hasta") != desde - 1 or guardado.get("huella") != huella:
+        estado = calcular(almacen.leer_anterior(seccion, desde), desde - 1)
+        guardado = {"seccion": seccion, "hasta": desde - 1, "huella": huella, "estado": estado}
+        almacen.guardar_checkpoint(nombre, guardado)
+        logger.info(f"📌 Checkpoint {nombre} recalculado hasta {dia_iso(desde - 1)}")
+    
+    return guardado["estado"], cache.reciente(seccion, desde)
+
+
+def cantidad_registros(cache, seccion):
+    """Registros de una sección (con el cache lazy, del manifest sin leerla)"""
+    if isinstance(cache, CacheParticionado) and cache.pendiente(seccion):
+        return cache.almacen.registros(seccion)
+    return len(cache.get(seccion, []))
+
+
 def obtener_archivos_procesados(cache):
     """
-    Obtiene lista de archivos ya procesados.
+    Obtiene el manifest de archivos ya procesados (por nombre y contenido,
+    ver core/manifiesto.py).
     """
-    return cache.get("archivos_procesados", [])
+    return obtener_manifiesto(cache)
 
 
-def marcar_archivo_procesado(cache, nombre_archivo):
+def marcar_archivo_procesado(cache, nombre_archivo, ruta=None):
     """
-    Marca un archivo como procesado.
+    Marca un archivo como procesado (con tamaño, mtime y huella mientras
+    sigue en ruta, por defecto INPUT_DIR / nombre_archivo).
     """
-    if nombre_archivo not in cache["archivos_procesados"]:
-        cache["archivos_procesados"].append(nombre_archivo)
+    entrada = obtener_manifiesto(cache).agregar(nombre_archivo, ruta or INPUT_DIR / nombre_archivo)
+    if entrada is not None:
+        cache["archivos_procesados"].append(entrada)
+        marcar_sucias(cache, "archivos_procesados")
 
 
 def obtener_estadisticas_cache(cache):
@@ -121,7 +292,7 @@ def obtener_estadisticas_cache(cache):
         "peso": len(cache.get("peso", [])),
         "sueno": len(cache.get("sueno", [])),
         "grasa_corporal": len(cache.get("grasa_corporal", [])),
-        "fc_reposo": len(cache.get("fc_reposo", [])),
+        "fc_reposo": len(vista_fc_reposo(cache)),
         "vo2max": len(cache.get("vo2max", [])),
         "masa_muscular": len(cache.get("masa_muscular", [])),
         "spo2": len(cache.get("spo2", [])),
@@ -129,7 +300,7 @@ def obtener_estadisticas_cache(cache):
         "presion_arterial": len(cache.get("presion_arterial", [])),
         "distancia": len(cache.get("distancia", [])),
         "calorias_totales": len(cache.get("calorias_totales", [])),
-        "frecuencia_cardiaca": len(cache.get("frecuencia_cardiaca", [])),
+        "frecuencia_cardiaca": len(vista_frecuencia_cardiaca(cache)),
         "glucosa": len(cache.get("glucosa", [])),
         "tasa_metabolica": len(cache.get("tasa_metabolica", [])),
         "masa_agua": len(cache.get("masa_agua", [])),
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coalescedor de AUTO_DIFF
+El teléfono deja un DIFF cada ~30 minutos y muchos traen un solo cambio de
+pasos o nada. Cuando se acumulan varios, en vez de aplicarlos uno por uno
+se combinan en un único delta (uno por tramo, ver abajo) y se aplica una
+sola vez:
+
+- Un registro insertado en un DIFF y borrado en un DIFF posterior se
+  cancela (no llega al cache), salvo el peso.
+- Si un registro llega en varios DIFF (misma clave de upsert), queda la
+  última versión.
+- Las deletions se aplican antes de las inserciones (igual que en
+  aplicar_delta), pero nunca antes de las inserciones de un DIFF anterior:
+  un DIFF con deletions después de DIFF con inserciones empieza un tramo
+  nuevo, y los tramos se aplican en orden. Así un registro borrado y
+  vuelto a insertar en la racha queda, y el peso (gana el primero del día)
+  se decide contra el mismo cache que en el procesamiento uno por uno.
+- Los buckets de FC se combinan en una sola serie (gana el DIFF más
+  nuevo para cada registro; los demás del mismo minuto se conservan).
+
+Los FULL no se combinan: cada uno se procesa en su turno (ver core/snapshot.py).
+"""
+
+from utils.logger import logger
+from core.indice import clave_registro
+from core.tiempo import dia
+from core.serie_fc import SerieFC
+
+
+def coalescer_deltas(deltas):
+    """
+    Combina los deltas de varios archivos DIFF consecutivos (ver extraer_delta).
+
+    Args:
+        deltas (list): Deltas en orden de archivo
+
+    Returns:
+        list: Deltas combinados, uno por tramo, con la misma forma que
+              extraer_delta más "archivos" (nombres combinados); se aplican
+              en orden
+    """
+    pendientes = {}     # campo -> {clave de upsert: (tramo, registro)} (orden de llegada)
+    por_id = {}         # record_id / session_id -> {(campo, clave)}
+    dias_peso = {}      # dia_local -> clave del peso pendiente de ese día (en el tramo)
+    tramos = []         # {"archivos", "campos", "deletions": {record_id: None}}
+    serie_fc = SerieFC()
+    canceladas = reemplazadas = 0
+    con_inserciones = False
+
+    for delta in deltas:
+        # Deletions después de inserciones: tramo nuevo (no se adelantan a ellas)
+        if not tramos or (delta["deletions"] and con_inserciones):
+            tramos.append({"archivos": [], "campos": [], "deletions": {}})
+            con_inserciones = False
+            # Los pesos de tramos anteriores se deciden contra el cache al aplicarlos
+            dias_peso = {}
+        tramo = tramos[-1]
+        tramo["archivos"].append(delta["archivo"])
+
+        # Deletions del archivo: cancelan lo insertado por archivos anteriores. El
+        # peso no: ocupó su día en el medio (se inserta y esta deletion lo borra)
+        for rid in delta["deletions"]:
+            tramo["deletions"][rid] = None
+            for campo, clave in por_id.pop(rid, ()):
+                if campo != "peso" and pendientes[campo].pop(clave, None) is not None:
+                    canceladas += 1
+
+        if delta.get("serie_fc") is not None:
+            serie_fc.fusionar(delta["serie_fc"])
+
+        for campo in delta["campos"]:
+            if campo not in tramo["campos"]:
+                tramo["campos"].append(campo)
+
+        for campo, registros in delta["inserciones"].items():
+            destino = pendientes.setdefault(campo, {})
+            for registro in registros:
+                clave = clave_registro(campo, registro)
+
+                if campo == "peso":
+                    # Peso: 1 registro por día, gana el primero (igual que el extractor).
+                    # Entre tramos no se reemplaza: cada uno se filtra contra el cache al aplicarlo
+                    clave = (len(tramos) - 1, clave)
+                    d = dia(registro)
+                    if d in dias_peso:
+                        continue
+                    dias_peso[d] = clave
+
+                # La versión más nueva va al final, como si se hubiera agregado última
+                if destino.pop(clave, None) is not None:
+                    reemplazadas += 1
+                destino[clave] = (len(tramos) - 1, registro)
+                con_inserciones = True
+
+                for rid in {registro.get("record_id"), registro.get("session_id")} - {None}:
+                    por_id.setdefault(rid, set()).add((campo, clave))
+
+    inserciones = [{} for _ in tramos]
+    for campo, registros in pendientes.items():
+        for n, registro in registros.values():
+            inserciones[n].setdefault(campo, []).append(registro)
+    total = sum(len(registros) for registros in pendientes.values())
+    borradas = sum(len(tramo["deletions"]) for tramo in tramos)
+
+    logger.info(
+        f"🧩 {len(deltas)} DIFF combinados en {len(tramos)} tramos: {total} inserciones, {canceladas} canceladas "
+        f"(insert+delete), {reemplazadas} reemplazadas, {borradas} deletions"
+    )
+
+    return [
+        {
+            "archivo": tramo["archivos"][-1],
+            "archivos": tramo["archivos"],
+            "campos": tramo["campos"],
+            "inserciones": inserciones[n],
+            "deletions": list(tramo["deletions"]),
+            # La serie FC no tiene deletions: va entera con el último tramo
+            "serie_fc": serie_fc if serie_fc.dias and n == len(tramos) - 1 else None,
+        }
+        for n, tramo in enumerate(tramos)
+    ]
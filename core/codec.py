@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formato binario del cache (alternativa a cache_datos.json)
+Solo stdlib (struct + array), versionado y con compresión opcional.
+
+    cabecera   "HDCB", versión (H), compresión (B: 0 ninguna, 1 zlib, 2 lzma), reservado (B)
+    cuerpo     (comprimido según la cabecera) una entrada por clave del cache:
+                   clave (str), tipo (B), largo (I), datos
+
+Tipos de entrada:
+- "t" tabla: lista de dicts o Registro (las secciones). Los registros se agrupan por
+  esquema (tupla de claves en su orden); cada esquema guarda una columna por
+  clave. Las columnas homogéneas van como arrays ("q" int64, "d" float64,
+  "s" strings unidos por \\0); el resto con el codificador genérico. Un array
+  de índices de esquema conserva el orden de la lista.
+- "s" lista de strings (archivos_procesados)
+- "g" genérico: valor JSON con tags (N, T, F, i, f, s, l, d)
+
+Al decodificar, las columnas se leen con array.frombytes / str.split y los
+dicts se arman con dict(zip(claves, fila)): casi todo el trabajo queda en C.
+Los registros salen idénticos a los del JSON (mismos tipos, mismo orden de
+claves y de lista).
+"""
+
+import sys
+import lzma
+import zlib
+import struct
+from array import array
+from core.registros import Registro
+
+MAGIA = b"HDCB"
+VERSION = 1
+CABECERA = struct.Struct("<4sHBB")
+
+COMPRESIONES = {None: 0, "zlib": 1, "lzma": 2}
+
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+_SEPARADOR = "\x00"
+
+
+def es_binario(datos):
+    return datos[:len(MAGIA)] == MAGIA
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Codificador genérico (metadatos, columnas mixtas)
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _str(partes, texto):
+    datos = texto.encode("utf-8")
+    partes += _U32.pack(len(datos))
+    partes += datos
+
+
+def _generico(partes, valor):
+    if valor is None:
+        partes += b"N"
+    elif valor is True:
+        partes += b"T"
+    elif valor is False:
+        partes += b"F"
+    elif isinstance(valor, int):
+        if -2**63 <= valor < 2**63:
+            partes += b"i"
+            partes += _I64.pack(valor)
+        else:
+            partes += b"I"
+            _str(partes, str(valor))
+    elif isinstance(valor, float):
+        partes += b"f"
+        partes += _F64.pack(valor)
+    elif isinstance(valor, str):
+        partes += b"s"
+        _str(partes, valor)
+    elif isinstance(valor, (list, tuple)):
+        partes += b"l"
+        partes += _U32.pack(len(valor))
+        for v in valor:
+            _generico(partes, v)
+    elif isinstance(valor, (dict, Registro)):
+        partes += b"d"
+        partes += _U32.pack(len(valor))
+        for k, v in valor.items():
+            _str(partes, str(k))
+            _generico(partes, v)
+    else:
+        raise TypeError(f"Tipo no serializable en el cache: {type(valor).__name__}")
+
+
+def _leer_str(datos, pos):
+    largo, = _U32.unpack_from(datos, pos)
+    pos += 4
+    return bytes(datos[pos:pos + largo]).decode("utf-8"), pos + largo
+
+
+def _leer_generico(datos, pos):
+    tag = bytes(datos[pos:pos + 1])
+    pos += 1
+    if tag == b"N":
+        return None, pos
+    if tag == b"T":
+        return True, pos
+    if tag == b"F":
+        return False, pos
+    if tag == b"i":
+        return _I64.unpack_from(datos, pos)[0], pos + 8
+    if tag == b"I":
+        texto, pos = _leer_str(datos, pos)
+        return int(texto), pos
+    if tag == b"f":
+        return _F64.unpack_from(datos, pos)[0], pos + 8
+    if tag == b"s":
+        return _leer_str(datos, pos)
+    if tag == b"l":
+        n, = _U32.unpack_from(datos, pos)
+        pos += 4
+        lista = []
+        for _ in range(n):
+            valor, pos = _leer_generico(datos, pos)
+            lista.append(valor)
+        return lista, pos
+    if tag == b"d":
+        n, = _U32.unpack_from(datos, pos)
+        pos += 4
+        dic = {}
+        for _ in range(n):
+            clave, pos = _leer_str(datos, pos)
+            dic[clave], pos = _leer_generico(datos, pos)
+        return dic, pos
+    raise ValueError(f"Tag desconocido en el cache binario: {tag!r}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Columnas
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _array_bytes(columna):
+    if sys.byteorder == "big":
+        columna.byteswap()
+    return columna.tobytes()
+
+
+def _array_de(typecode, datos):
+    columna = array(typecode)
+    columna.frombytes(datos)
+    if sys.byteorder == "big":
+        columna.byteswap()
+    return columna
+
+
+def _columna(partes, valores):
+    """tag (B) + largo (I) + datos"""
+    tipos = set(map(type, valores))
+    tag, datos = b"g", None
+    if tipos == {int}:
+        try:
+            tag, datos = b"q", _array_bytes(array("q", valores))
+        except OverflowError:
+            pass
+    elif tipos == {float}:
+        tag, datos = b"d", _array_bytes(array("d", valores))
+    elif tipos == {str}:
+        texto = _SEPARADOR.join(valores)
+        if texto.count(_SEPARADOR) == len(valores) - 1:
+            tag, datos = b"s", texto.encode("utf-8")
+    if datos is None:
+        tag, generico = b"g", bytearray()
+        _generico(generico, valores)
+        datos = bytes(generico)
+    partes += tag
+    partes += _U32.pack(len(datos))
+    partes += datos
+
+
+def _leer_columna(datos, pos, n):
+    tag = bytes(datos[pos:pos + 1])
+    largo, = _U32.unpack_from(datos, pos + 1)
+    pos += 5
+    bloque = datos[pos:pos + largo]
+    if tag == b"q":
+        valores = _array_de("q", bloque).tolist()
+    elif tag == b"d":
+        valores = _array_de("d", bloque).tolist()
+    elif tag == b"s":
+        valores = bytes(bloque).decode("utf-8").split(_SEPARADOR) if n else []
+    else:
+        valores, _ = _leer_generico(datos, pos)
+    return valores, pos + largo
+
+
+def _tabla(partes, registros):
+    """Lista de dicts agrupada por esquema (ver docstring del módulo)"""
+    esquemas = {}
+    filas = []
+    indices = array("H")
+    for registro in registros:
+        claves = tuple(registro)
+        i = esquemas.get(claves)
+        if i is None:
+            i = esquemas[claves] = len(esquemas)
+            filas.append([])
+        filas[i].append(registro)
+        indices.append(i)
+
+    partes += _U32.pack(len(registros))
+    partes += _U32.pack(len(esquemas))
+    if len(esquemas) > 1:
+        datos = _array_bytes(indices)
+        partes += _U32.pack(len(datos))
+        partes += datos
+    for claves, grupo in zip(esquemas, filas):
+        partes += _U32.pack(len(grupo))
+        partes += _U32.pack(len(claves))
+        for clave in claves:
+            _str(partes, clave)
+            _columna(partes, [r[clave] for r in grupo])
+
+
+def _leer_tabla(datos, pos):
+    n, cantidad_esquemas = struct.unpack_from("<II", datos, pos)
+    pos += 8
+    indices = None
+    if cantidad_esquemas > 1:
+        largo, = _U32.unpack_from(datos, pos)
+        indices = _array_de("H", datos[pos + 4:pos + 4 + largo])
+        pos += 4 + largo
+
+    grupos = []
+    for _ in range(cantidad_esquemas):
+        filas, cantidad_claves = struct.unpack_from("<II", datos, pos)
+        pos += 8
+        claves = []
+        columnas = []
+        for _ in range(cantidad_claves):
+            clave, pos = _leer_str(datos, pos)
+            valores, pos = _leer_columna(datos, pos, filas)
+            claves.append(clave)
+            columnas.append(valores)
+        if claves:
+            grupos.append([dict(zip(claves, fila)) for fila in zip(*columnas)])
+        else:
+            grupos.append([{} for _ in range(filas)])
+
+    if indices is None:
+        return (grupos[0] if grupos else []), pos
+    # Intercalar los grupos en el orden original de la lista
+    iteradores = [iter(g) for g in grupos]
+    return list(map(next, map(iteradores.__getitem__, indices))), pos
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# API
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _tipo_entrada(valor):
+    if isinstance(valor, list) and valor:
+        if all(type(v) is dict or isinstance(v, Registro) for v in valor):
+            # Los índices de esquema son uint16
+            if len({tuple(v) for v in valor}) <= 0xFFFF:
+                return b"t"
+        elif all(type(v) is str for v in valor):
+            texto = _SEPARADOR.join(valor)
+            if texto.count(_SEPARADOR) == len(valor) - 1:
+                return b"s"
+    return b"g"
+
+
+def codificar(cache, compresion="zlib"):
+    """
+    dict del cache (sin claves privadas) -> bytes
+
+    Args:
+        compresion (str): None, "zlib" o "lzma"
+    """
+    if compresion not in COMPRESIONES:
+        raise ValueError(f"Compresión desconocida: {compresion} (opciones: zlib, lzma o None)")
+
+    cuerpo = bytearray()
+    for clave, valor in cache.items():
+        tipo = _tipo_entrada(valor)
+        datos = bytearray()
+        if tipo == b"t":
+            _tabla(datos, valor)
+        elif tipo == b"s":
+            datos += _SEPARADOR.join(valor).encode("utf-8")
+        else:
+            _generico(datos, valor)
+        _str(cuerpo, clave)
+        cuerpo += tipo
+        cuerpo += _U32.pack(len(datos))
+        cuerpo += datos
+
+    if compresion == "zlib":
+        cuerpo = zlib.compress(cuerpo, 6)
+    elif compresion == "lzma":
+        cuerpo = lzma.compress(cuerpo)
+    return CABECERA.pack(MAGIA, VERSION, COMPRESIONES[compresion], 0) + bytes(cuerpo)
+
+
+def decodificar(datos):
+    """bytes -> dict del cache"""
+    magia, version, compresion, _ = CABECERA.unpack_from(datos, 0)
+    if magia != MAGIA:
+        raise ValueError("No es un cache binario")
+    if version != VERSION:
+        raise ValueError(f"Versión de cache binario no soportada: {version}")
+
+    cuerpo = memoryview(datos)[CABECERA.size:]
+    if compresion == COMPRESIONES["zlib"]:
+        cuerpo = zlib.decompress(cuerpo)
+    elif compresion == COMPRESIONES["lzma"]:
+        cuerpo = lzma.decompress(cuerpo)
+    cuerpo = memoryview(cuerpo)
+
+    cache = {}
+    pos = 0
+    while pos < len(cuerpo):
+        clave, pos = _leer_str(cuerpo, pos)
+        tipo = cuerpo[pos:pos + 1].tobytes()
+        largo, = _U32.unpack_from(cuerpo, pos + 1)
+        pos += 5
+        if tipo == b"t":
+            cache[clave], _ = _leer_tabla(cuerpo, pos)
+        elif tipo == b"s":
+            texto = cuerpo[pos:pos + largo].tobytes().decode("utf-8")
+            cache[clave] = texto.split(_SEPARADOR)
+        else:
+            cache[clave], _ = _leer_generico(cuerpo, pos)
+        pos += largo
+    return cache
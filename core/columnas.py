@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Series numéricas en columnas (pasos, distancia, calorías totales)
+Son las secciones de más volumen con un solo valor por registro. Además de
+la lista de dicts del cache, cada una se guarda en CACHE_COLUMNAS como un
+archivo de columnas de ancho fijo, little-endian, ordenadas por epoch:
+
+    cabecera  "COL1", versión (H), reservado (H), n (I), relleno a 16 bytes
+    epoch     float64 × n   epoch_local
+    valor     float64 × n
+    dia       int32   × n   dia_local
+    orden     int32   × n   posición del registro en la lista del cache
+    tipo      uint8   × n   0 = float, 1 = int, 2 = None (para devolver el mismo valor)
+
+El archivo se abre con mmap y las columnas se exponen como arrays de NumPy
+(np.frombuffer, sin copiar) o, si NumPy no está instalado, como memoryview.
+Abrir una serie no depende de su tamaño; una ventana de tiempo es un
+searchsorted (bisect sin NumPy) y un slice.
+
+La FC ya es columnar desde core/serie_fc.py (arrays por día en CACHE_FC).
+
+Los consumidores (gráficos, métricas) usan valores_por_dia(), que acepta
+la lista de dicts o una SerieColumnar y devuelve lo mismo en ambos casos.
+"""
+
+import sys
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from config import CACHE_COLUMNAS
+from utils.logger import logger
+from core import tiempo
+from core.indice import CLAVE_SUCIAS, cargada, vivos
+from core.almacen import _escribir_atomico
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CLAVE_COLUMNAS = "_columnas"
+
+# seccion -> campo de valor
+SERIES_COLUMNARES = {
+    "pasos": "pasos",
+    "distancia": "distancia_km",
+    "calorias_totales": "energia_kcal",
+}
+
+MAGIA = b"COL1"
+VERSION = 1
+CABECERA = struct.Struct("<4sHHI")
+TAM_CABECERA = 16
+
+# (nombre, typecode de array, dtype de NumPy)
+COLUMNAS = (
+    ("epoch", "d", "<f8"),
+    ("valor", "d", "<f8"),
+    ("dia", "i", "<i4"),
+    ("orden", "i", "<i4"),
+    ("tipo", "B", "u1"),
+)
+
+TIPO_FLOAT, TIPO_INT, TIPO_NONE = 0, 1, 2
+
+
+class SerieColumnar:
+    """Columnas de una serie (arrays de NumPy o memoryview), ordenadas por epoch"""
+
+    def __init__(self, columnas, origen=None):
+        for nombre, _, _ in COLUMNAS:
+            setattr(self, nombre, columnas[nombre])
+        self.origen = origen    # mmap (se mantiene abierto mientras viva la serie)
+
+    def __len__(self):
+        return len(self.epoch)
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Construcción
+    # ─────────────────────────────────────────────────────────────────────
+
+    @classmethod
+    def desde_registros(cls, registros, campo):
+        """Serie en memoria a partir de la lista de dicts (se descartan los que no tienen fecha)"""
+        filas = []
+        for orden, registro in enumerate(registros):
+            e = tiempo.epoch(registro)
+            if e is None:
+                continue
+            valor = registro.get(campo, 0)
+            if valor is None:
+                filas.append((e, 0.0, tiempo.dia(registro), orden, TIPO_NONE))
+            else:
+                tipo = TIPO_INT if isinstance(valor, int) else TIPO_FLOAT
+                filas.append((e, float(valor), tiempo.dia(registro), orden, tipo))
+        # Estable: a igual epoch queda el orden de la lista
+        filas.sort(key=lambda fila: fila[0])
+
+        columnas = {}
+        for i, (nombre, typecode, dtype) in enumerate(COLUMNAS):
+            columna = array(typecode, (fila[i] for fila in filas))
+            columnas[nombre] = np.frombuffer(columna, dtype=dtype) if np is not None else memoryview(columna)
+        return cls(columnas)
+
+    def a_bytes(self):
+        n = len(self)
+        partes = [CABECERA.pack(MAGIA, VERSION, 0, n).ljust(TAM_CABECERA, b"\0")]
+        for nombre, typecode, _ in COLUMNAS:
+            columna = array(typecode, getattr(self, nombre))
+            if sys.byteorder == "big":
+                columna.byteswap()
+            partes.append(columna.tobytes())
+        return b"".join(partes)
+
+    @classmethod
+    def abrir(cls, ruta):
+        """Abre el archivo con mmap (O(1): no lee las columnas)"""
+        with open(ruta, "rb") as f:
+            origen = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, version, _, n = CABECERA.unpack_from(origen, 0)
+        if magia != MAGIA or version != VERSION:
+            origen.close()
+            raise ValueError(f"Archivo de columnas inválido: {ruta}")
+
+        columnas = {}
+        pos = TAM_CABECERA
+        for nombre, typecode, dtype in COLUMNAS:
+            tam = array(typecode).itemsize * n
+            if np is not None:
+                columnas[nombre] = np.frombuffer(origen, dtype=dtype, count=n, offset=pos)
+            elif sys.byteorder == "big":
+                columna = array(typecode, bytes(origen[pos:pos + tam]))
+                columna.byteswap()
+                columnas[nombre] = memoryview(columna)
+            else:
+                columnas[nombre] = memoryview(origen)[pos:pos + tam].cast(typecode)
+            pos += tam
+        return cls(columnas, origen)
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Consultas
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _buscar(self, columna, valor):
+        if np is not None:
+            return int(np.searchsorted(columna, valor, side="left"))
+        return bisect_left(columna, valor)
+
+    def rango(self, desde=None, desde_dia=None):
+        """Índices [i, n) de los registros con epoch >= desde y dia >= desde_dia"""
+        i = 0
+        if desde is not None:
+            i = max(i, self._buscar(self.epoch, desde))
+        if desde_dia is not None:
+            i = max(i, self._buscar(self.dia, desde_dia))
+        return i, len(self)
+
+    def primer_dia_de_ultimos(self, n):
+        """dia_local desde el que quedan los últimos n días con datos"""
+        if not len(self):
+            return None
+        d = int(self.dia[-1])
+        for _ in range(n - 1):
+            k = self._buscar(self.dia, d)
+            if k == 0:
+                break
+            d = int(self.dia[k - 1])
+        return d
+
+    def _valor(self, k):
+        tipo = self.tipo[k]
+        if tipo == TIPO_NONE:
+            return None
+        valor = float(self.valor[k])
+        return int(valor) if tipo == TIPO_INT else valor
+
+
+def valores_por_dia(datos, campo, desde=None, desde_dia=None, ultimos=None):
+    """
+    Valores agrupados por día local, en el orden de la lista del cache.
+
+    Args:
+        datos: Lista de dicts del cache o SerieColumnar
+        campo (str): Campo de valor (ej: "pasos"); sin el campo cuenta 0
+        desde (float): Solo registros con epoch_local >= desde
+        desde_dia (int): Solo registros con dia_local >= desde_dia
+        ultimos (int): Solo los últimos N días con datos
+
+    Returns:
+        dict: {dia_local: [valores]}
+    """
+    if isinstance(datos, SerieColumnar):
+        if ultimos is not None:
+            primero = datos.primer_dia_de_ultimos(ultimos)
+            desde_dia = primero if desde_dia is None or primero is None else max(desde_dia, primero)
+        i, j = datos.rango(desde, desde_dia)
+        por_dia = {}
+        orden = datos.orden
+        for k in sorted(range(i, j), key=orden.__getitem__):
+            por_dia.setdefault(int(datos.dia[k]), []).append(datos._valor(k))
+        return por_dia
+
+    por_dia = {}
+    for registro in datos or ():
+        e = tiempo.epoch(registro)
+        if e is None or (desde is not None and e < desde):
+            continue
+        d = tiempo.dia(registro)
+        if desde_dia is not None and d < desde_dia:
+            continue
+        por_dia.setdefault(d, []).append(registro.get(campo, 0))
+
+    if ultimos is not None:
+        conservar = set(sorted(por_dia)[-ultimos:])
+        por_dia = {d: v for d, v in por_dia.items() if d in conservar}
+    return por_dia
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Persistencia junto al cache
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _ruta(seccion, directorio=CACHE_COLUMNAS):
+    return directorio / f"{seccion}.col"
+
+
+def _registros_en_archivo(ruta):
+    """n de la cabecera (None si no existe o no es válido)"""
+    try:
+        with open(ruta, "rb") as f:
+            magia, version, _, n = CABECERA.unpack(f.read(CABECERA.size))
+    except (OSError, struct.error):
+        return None
+    return n if magia == MAGIA and version == VERSION else None
+
+
+def guardar_columnas(cache, directorio=CACHE_COLUMNAS):
+    """
+    Reescribe el archivo de columnas de las series modificadas desde el
+    último guardado (o que todavía no tienen archivo). Las secciones que
+    no se leyeron (cache lazy) no se tocan.
+
+    Returns:
+        list: Series escritas
+    """
+    sucias = cache.get(CLAVE_SUCIAS) or ()
+    escritas = []
+    for seccion, campo in SERIES_COLUMNARES.items():
+        if not cargada(cache, seccion):
+            continue
+        ruta = _ruta(seccion, directorio)
+        if seccion not in sucias and ruta.exists():
+            continue
+        directorio.mkdir(parents=True, exist_ok=True)
+        _escribir_atomico(ruta, SerieColumnar.desde_registros(vivos(cache, seccion), campo).a_bytes())
+        escritas.append(seccion)
+
+    # Las series abiertas quedaron viejas: se vuelven a abrir al pedirlas
+    cache[CLAVE_COLUMNAS] = {}
+    if escritas:
+        logger.info(f"📊 Columnas guardadas: {', '.join(escritas)}")
+    return escritas
+
+
+def obtener_columnas(cache, seccion, directorio=CACHE_COLUMNAS):
+    """
+    Serie columnar de una sección: el archivo mmap si está al día con el
+    cache, si no se arma en memoria desde la lista.
+
+    El archivo se usa solo si el cache se cargó/guardó con cargar_cache /
+    guardar_cache (así un cache armado en memoria nunca lee archivos de otro)
+    y la sección no tiene cambios sin guardar.
+    """
+    abiertas = cache.get(CLAVE_COLUMNAS)
+    sucias = cache.get(CLAVE_SUCIAS) or ()
+    if abiertas is not None and seccion not in sucias:
+        serie = abiertas.get(seccion)
+        if serie is None:
+            ruta = _ruta(seccion, directorio)
+            n = _registros_en_archivo(ruta)
+            # Si la lista ya está en memoria, la cantidad tiene que coincidir
+            if n is not None and (not cargada(cache, seccion) or n == _con_fecha(cache, seccion)):
+                try:
+                    serie = SerieColumnar.abrir(ruta)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Columnas de {seccion} ilegibles ({e}), se arman desde el cache")
+                else:
+                    abiertas[seccion] = serie
+        if serie is not None:
+            return serie
+
+    return SerieColumnar.desde_registros(vivos(cache, seccion), SERIES_COLUMNARES[seccion])
+
+
+def _con_fecha(cache, seccion):
+    return sum(1 for r in vivos(cache, seccion) if tiempo.epoch(r) is not None)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tablas diarias (rollup) con sumas prefijas
+
+Las ventanas de N días (PAI de 7 días, históricos de 30, gráficos de los
+últimos 14 / 30 / 90 días) se calculaban recorriendo todos los registros
+en cada función. Acá cada sección de TABLAS_DIARIAS tiene una fila por día
+con datos y los totales de ese día, guardada en el cache
+(cache["diario_<seccion>"], un dict JSON):
+
+    registros  registros vivos cubiertos (el largo de la lista al guardar)
+    ultimo     crc32 de la clave del último registro cubierto
+    dias       días ordinales con registros, ordenados
+    columnas   {"n": registros por día, <columna>: valor por día, ...}
+
+Cada columna agrega un campo (o una función del registro) en el orden de
+la lista: "suma" (default) o "max". El promedio del día es la suma sobre
+"n".
+
+guardar_cache la actualiza antes de compactar: solo se recalculan los días
+de los registros agregados desde el último guardado (slots desde
+"registros", lo que agregaron los extractores) y de los marcados como
+borrados o reemplazados (tombstones del índice, ej: procesar_deletions),
+con los registros vivos de cada día (índice por día). Si la lista no es la
+que cubría la tabla (otro largo o último registro) se rearma. El journal
+del almacén JSON guarda de la tabla solo las claves que cambiaron y la cola
+de cada lista desde el primer día distinto (core.almacen._parche_meta), no
+la tabla entera.
+
+En memoria (TablaDiaria) las columnas son densas (un valor por día) con su
+suma prefija: la suma de cualquier ventana de días es una resta, O(1), y
+los gráficos recorren solo los días de su ventana. Las funciones de
+métricas y gráficos aceptan la lista de registros o la tabla (tabla_diaria)
+y devuelven lo mismo en ambos casos.
+"""
+
+import zlib
+from bisect import bisect_left
+from itertools import accumulate
+from utils.logger import logger
+from core.tiempo import dia
+from core.indice import (
+    CLAVE_INDICE, CLAVE_SUCIAS, cargada, clave_registro, marcar_sucias, upsert_nuevos, vivos
+)
+
+# meal_type de Samsung Health -> comida (sin tipo o desconocido: snack)
+COMIDAS = {1: "desayuno", 2: "almuerzo", 3: "cena", 4: "snack"}
+
+
+def _por_comida(comida):
+    def kcal(registro):
+        if COMIDAS.get(registro.get("meal_type", 0), "snack") == comida:
+            return registro.get("energy_kcal", 0)
+        return None
+    return kcal
+
+
+def _en_horas(campo):
+    return lambda registro: registro.get(campo, 0) / 60
+
+
+# seccion -> {columna: campo del registro que se suma por día
+#                      | (campo o función del registro, agregación)}
+TABLAS_DIARIAS = {
+    "ejercicio": {"pai": "pai", "hrtss": "hrtss", "minutos": "duracion", "kcal": "calorias"},
+    # Samsung guarda los pasos acumulados del día: el total es el máximo
+    "pasos": {"pasos": ("pasos", "max")},
+    "distancia": {"distancia_km": "distancia_km"},
+    "calorias_totales": {"energia_kcal": "energia_kcal"},
+    "sueno": {fase: (_en_horas(fase), "suma") for fase in ("awake", "light", "deep", "rem")},
+    "nutrition": {
+        "calorias": "energy_kcal",
+        "proteinas": "protein_g",
+        "carbohidratos": "carbs_g",
+        "grasas": "fat_total_g",
+        **{comida: (_por_comida(comida), "suma") for comida in COMIDAS.values()},
+    },
+    "peso": {"peso": "peso"},
+    "grasa_corporal": {"porcentaje": "porcentaje"},
+    "masa_muscular": {"masa_kg": "masa_kg"},
+    "masa_osea": {"masa_kg": "masa_kg"},
+    "masa_agua": {"masa_kg": "masa_kg"},
+    "tasa_metabolica": {"kcal_dia": "kcal_dia"},
+    "presion_arterial": {"sistolica": "sistolica", "diastolica": "diastolica"},
+    "spo2": {"porcentaje": "porcentaje"},
+}
+
+PREFIJO_CLAVE = "diario_"
+
+# Tablas en memoria: seccion -> (id del dict guardado, TablaDiaria)
+CLAVE_TABLAS = "_diarios"
+
+
+def clave_diario(seccion):
+    return PREFIJO_CLAVE + seccion
+
+
+class TablaDiaria:
+    """Totales por día de una sección (columnas densas) con sumas prefijas"""
+
+    def __init__(self, dias, columnas):
+        self.desde = dias[0] if dias else None
+        largo = dias[-1] - dias[0] + 1 if dias else 0
+        self.columnas = {}
+        for nombre, valores in columnas.items():
+            densa = [0] * largo
+            for d, valor in zip(dias, valores):
+                densa[d - self.desde] = valor
+            self.columnas[nombre] = densa
+        self._prefijos = {}
+
+    @classmethod
+    def desde_registros(cls, registros, campos):
+        dias, columnas = _totales(registros, campos)
+        return cls(dias, columnas)
+
+    def __len__(self):
+        return len(self.columnas["n"])
+
+    def _prefijo(self, columna):
+        prefijo = self._prefijos.get(columna)
+        if prefijo is None:
+            prefijo = self._prefijos[columna] = [0, *accumulate(self.columnas[columna])]
+        return prefijo
+
+    def _rango(self, desde_dia, hasta_dia):
+        """Posiciones [i, j) de los días [desde_dia, hasta_dia] dentro de la tabla"""
+        largo = len(self)
+        i = min(max(desde_dia - self.desde, 0), largo)
+        j = min(max(hasta_dia - self.desde + 1, 0), largo)
+        return i, j
+
+    def suma(self, columna, desde_dia, hasta_dia):
+        """Suma de la columna en los días [desde_dia, hasta_dia] (O(1))"""
+        if self.desde is None:
+            return 0
+        i, j = self._rango(desde_dia, hasta_dia)
+        if j <= i:
+            return 0
+        prefijo = self._prefijo(columna)
+        return prefijo[j] - prefijo[i]
+
+    def valor(self, columna, d):
+        """Total de la columna en el día d (0 si no hay datos)"""
+        if self.desde is None or not 0 <= d - self.desde < len(self):
+            return 0
+        return self.columnas[columna][d - self.desde]
+
+    def promedio(self, columna, d):
+        """Promedio de la columna en el día d (suma / registros del día)"""
+        return self.valor(columna, d) / self.valor("n", d)
+
+    def dias(self, desde_dia, hasta_dia=None):
+        """Días de [desde_dia, hasta_dia] con registros (sin hasta_dia: hasta el último)"""
+        if self.desde is None:
+            return []
+        if hasta_dia is None:
+            hasta_dia = self.desde + len(self) - 1
+        i, j = self._rango(desde_dia, hasta_dia)
+        n = self.columnas["n"]
+        return [self.desde + k for k in range(i, j) if n[k]]
+
+
+def _agregar(previo, valor, agregacion):
+    if valor is None:
+        return previo
+    if agregacion == "suma":
+        return previo + valor
+    return valor if previo is None else max(previo, valor)
+
+
+def _totales(registros, campos):
+    """
+    Filas por día de una lista de registros (cada columna agrega en el orden
+    de la lista, igual que un dict de totales recorriéndola).
+
+    Returns:
+        tuple: (días ordenados, {columna: [valor por día]})
+    """
+    nombres = list(campos)
+    fuentes = []
+    for nombre in nombres:
+        fuente, agregacion = campos[nombre] if isinstance(campos[nombre], tuple) else (campos[nombre], "suma")
+        if not callable(fuente):
+            fuente = lambda registro, campo=fuente: registro.get(campo, 0)
+        fuentes.append((fuente, agregacion))
+    iniciales = [0 if agregacion == "suma" else None for _, agregacion in fuentes]
+
+    por_dia = {}
+    for r in registros:
+        d = dia(r)
+        if d is None:
+            continue
+        fila = por_dia.get(d)
+        if fila is None:
+            fila = por_dia[d] = [0, *iniciales]
+        fila[0] += 1
+        for k, (fuente, agregacion) in enumerate(fuentes, 1):
+            fila[k] = _agregar(fila[k], fuente(r), agregacion)
+
+    dias = sorted(por_dia)
+    columnas = {"n": [por_dia[d][0] for d in dias]}
+    for k, nombre in enumerate(nombres, 1):
+        columnas[nombre] = [por_dia[d][k] for d in dias]
+    return dias, columnas
+
+
+def _huella(seccion, registro):
+    return zlib.crc32(repr(clave_registro(seccion, registro)).encode("utf-8"))
+
+
+def _guardado(registros, seccion, dias, columnas, cubiertos):
+    return {
+        "registros": cubiertos,
+        "ultimo": _huella(seccion, registros[-1]) if registros else None,
+        "dias": dias,
+        "columnas": columnas,
+    }
+
+
+def _borrados(cache, seccion):
+    indice = cache.get(CLAVE_INDICE)
+    return indice.tombstones.get(seccion, set()) if indice is not None else set()
+
+
+def cobertura(cache, seccion):
+    """
+    {"registros", "ultimo"} de los registros vivos de la sección: lo que
+    cubre una tabla armada ahora (ver dias_tocados).
+    """
+    registros = cache.get(seccion, [])
+    borrados = _borrados(cache, seccion)
+    ultimo = next((registros[slot] for slot in range(len(registros) - 1, -1, -1) if slot not in borrados), None)
+    return {
+        "registros": len(registros) - len(borrados),
+        "ultimo": _huella(seccion, ultimo) if ultimo is not None else None,
+    }
+
+
+def dias_tocados(cache, seccion, guardada):
+    """
+    Días con registros agregados, borrados o reemplazados desde que se armó
+    una tabla sobre la sección (guardada: con "registros" y "ultimo" de
+    cobertura). Se llama antes de compactar, como _actualizar.
+
+    Returns:
+        set: Días ordinales, o None si la lista no es la que cubría la tabla
+             (otro largo o último registro)
+    """
+    registros = cache.get(seccion, [])
+    upsert_nuevos(cache)
+    cubiertos = guardada.get("registros")
+    if cubiertos is None or cubiertos > len(registros) or (
+            cubiertos and _huella(seccion, registros[cubiertos - 1]) != guardada["ultimo"]):
+        return None
+
+    tocados = {dia(r) for r in registros[cubiertos:]}
+    tocados.update(dia(registros[slot]) for slot in _borrados(cache, seccion))
+    tocados.discard(None)
+    return tocados
+
+
+def registros_del_dia(cache, seccion, d):
+    """Registros vivos de la sección en el día d, en el orden de la lista (índice por día)"""
+    registros = cache.get(seccion, [])
+    borrados = _borrados(cache, seccion)
+    slots = cache[CLAVE_INDICE].por_dia.get(seccion, {}).get(d, ())
+    return [registros[slot] for slot in sorted(slots) if slot not in borrados]
+
+
+def _actualizar(cache, seccion):
+    """
+    Tabla guardada de la sección al día con la lista (antes de compactar).
+
+    Returns:
+        bool: La tabla cambió
+    """
+    campos = TABLAS_DIARIAS[seccion]
+    clave = clave_diario(seccion)
+    guardada = cache.get(clave)
+    tocados = None
+    if guardada is not None and list(guardada["columnas"]) == ["n", *campos]:
+        tocados = dias_tocados(cache, seccion, guardada)
+    if tocados is None:
+        actuales = vivos(cache, seccion)
+        dias, columnas = _totales(actuales, campos)
+        cache[clave] = _guardado(actuales, seccion, dias, columnas, len(actuales))
+        if guardada is not None:
+            logger.info(f"📅 Tabla diaria de {seccion} rearmada ({len(dias)} días)")
+        return True
+
+    actual = cobertura(cache, seccion)
+    if not tocados and actual["registros"] == guardada["registros"] and actual["ultimo"] == guardada["ultimo"]:
+        return False
+
+    # Días a recalcular: los de los registros nuevos y los de los borrados/reemplazados
+    dias = list(guardada["dias"])
+    columnas = {nombre: list(valores) for nombre, valores in guardada["columnas"].items()}
+    for d in sorted(tocados):
+        del_dia = registros_del_dia(cache, seccion, d)
+        _, fila = _totales(del_dia, campos)
+        i = bisect_left(dias, d)
+        existe = i < len(dias) and dias[i] == d
+        if existe and not del_dia:
+            del dias[i]
+            for valores in columnas.values():
+                del valores[i]
+        elif existe:
+            for nombre, valores in columnas.items():
+                valores[i] = fila[nombre][0]
+        elif del_dia:
+            dias.insert(i, d)
+            for nombre, valores in columnas.items():
+                valores.insert(i, fila[nombre][0])
+
+    cache[clave] = {**actual, "dias": dias, "columnas": columnas}
+    return True
+
+
+def actualizar_diarios(cache):
+    """
+    Actualiza las tablas diarias de las secciones leídas (lo llama
+    guardar_cache antes de compactar). Una tabla que todavía no existe se
+    arma desde la sección completa.
+
+    Returns:
+        list: Secciones cuya tabla cambió
+    """
+    cambiadas = []
+    for seccion in TABLAS_DIARIAS:
+        if cache.get(clave_diario(seccion)) is not None and not cargada(cache, seccion):
+            # Cache lazy: la sección no se leyó, no tiene nada nuevo
+            continue
+        if _actualizar(cache, seccion):
+            marcar_sucias(cache, clave_diario(seccion))
+            cambiadas.append(seccion)
+    return cambiadas
+
+
+def obtener_diario(cache, seccion):
+    """
+    Tabla diaria de la sección para las métricas y gráficos: la guardada si
+    está al día; con cambios sin guardar, una armada desde la lista.
+    """
+    if seccion in (cache.get(CLAVE_SUCIAS) or ()):
+        return TablaDiaria.desde_registros(vivos(cache, seccion), TABLAS_DIARIAS[seccion])
+
+    clave = clave_diario(seccion)
+    guardada = cache.get(clave)
+    if guardada is None or (cargada(cache, seccion) and guardada["registros"] != len(cache.get(seccion, []))):
+        if _actualizar(cache, seccion):
+            marcar_sucias(cache, clave)
+        guardada = cache[clave]
+
+    tablas = cache.setdefault(CLAVE_TABLAS, {})
+    en_memoria = tablas.get(seccion)
+    if en_memoria is None or en_memoria[0] != id(guardada):
+        en_memoria = tablas[seccion] = (id(guardada), TablaDiaria(guardada["dias"], guardada["columnas"]))
+    return en_memoria[1]
+
+
+def tabla_diaria(registros, seccion="ejercicio", campos=None):
+    """
+    La tabla si ya es una TablaDiaria; si es una lista de registros, la arma
+    con las columnas de la sección (o las de campos, {columna: campo}).
+    """
+    if isinstance(registros, TablaDiaria):
+        return registros
+    return TablaDiaria.desde_registros(registros or [], campos or TABLAS_DIARIAS[seccion])
@@ -6,24 +6,20 @@ Distancia recorrida y calorías totales quemadas
 ✅ AGREGA record_id a cada registro
 """
 
-from datetime import datetime
 from utils.logger import logger
+from core.extractores.registro import extractor
 from core.utils_procesador import reportar_por_fuente
 
 
-def procesar_distancia(datos, cache, nombre_archivo):
+@extractor("distancia", "distance_records", "distance_changes")
+def procesar_distancia(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de distancia recorrida del JSON.
     Soporta formatos FULL (distance_records) y DIFF (distance_changes).
     Agrupa por día automáticamente.
     ✅ CON RECORD_ID (usa el primero del día)
     """
-    distancia_data = None
-    
-    if "distance_records" in datos and "data" in datos["distance_records"]:
-        distancia_data = datos["distance_records"]["data"]
-    elif "distance_changes" in datos and "data" in datos["distance_changes"]:
-        distancia_data = datos["distance_changes"]["data"]
+    distancia_data = seccion.data
     
     if not distancia_data:
         return False
@@ -33,10 +29,10 @@ def procesar_distancia(datos, cache, nombre_archivo):
     # Agrupar por día para evitar múltiples registros
     por_dia = {}
     
-    for d in distancia_data:
+    for d, dia in zip(distancia_data, seccion.dias("start_time")):
         try:
-            start_time = datetime.fromisoformat(d.get("start_time", "").replace("Z", "+00:00"))
-            dia = start_time.strftime("%Y-%m-%d")
+            if dia is None:
+                raise ValueError(f"start_time inválido: {d.get('start_time')!r}")
             
             if dia not in por_dia:
                 por_dia[dia] = {
@@ -73,19 +69,15 @@ def procesar_distancia(datos, cache, nombre_archivo):
     return False
 
 
-def procesar_calorias_totales(datos, cache, nombre_archivo):
+@extractor("calorias_totales", "total_calories_records", "total_calories_changes")
+def procesar_calorias_totales(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de calorías totales del JSON.
     Soporta formatos FULL (total_calories_records) y DIFF (total_calories_changes).
     Agrupa por día automáticamente.
     ✅ CON RECORD_ID (usa el primero del día)
     """
-    calorias_data = None
-    
-    if "total_calories_records" in datos and "data" in datos["total_calories_records"]:
-        calorias_data = datos["total_calories_records"]["data"]
-    elif "total_calories_changes" in datos and "data" in datos["total_calories_changes"]:
-        calorias_data = datos["total_calories_changes"]["data"]
+    calorias_data = seccion.data
     
     if not calorias_data:
         return False
@@ -95,10 +87,10 @@ def procesar_calorias_totales(datos, cache, nombre_archivo):
     # Agrupar por día para evitar múltiples registros
     por_dia = {}
     
-    for c in calorias_data:
+    for c, dia in zip(calorias_data, seccion.dias("start_time")):
         try:
-            start_time = datetime.fromisoformat(c.get("start_time", "").replace("Z", "+00:00"))
-            dia = start_time.strftime("%Y-%m-%d")
+            if dia is None:
+                raise ValueError(f"start_time inválido: {c.get('start_time')!r}")
             
             if dia not in por_dia:
                 por_dia[dia] = {
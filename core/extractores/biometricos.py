@@ -8,19 +8,18 @@ CON VALIDACIÓN DE PESO (rechaza valores absurdos >200kg o <30kg)
 """
 
 from utils.logger import logger
+from core import tiempo
+from core.indice import vivos
+from core.extractores.registro import extractor
 from core.utils_procesador import reportar_por_fuente
 
 
-def procesar_peso(datos, cache):
+@extractor("peso", "weight_records", "weight_changes")
+def procesar_peso(seccion, cache, nombre_archivo=None):
     """Extrae datos de peso del JSON CON VALIDACIÓN, DEDUPLICACIÓN POR DÍA y RECORD_ID"""
     from datetime import datetime
     
-    peso_data = None
-    
-    if "weight_records" in datos and "data" in datos["weight_records"]:
-        peso_data = datos["weight_records"]["data"]
-    elif "weight_changes" in datos and "data" in datos["weight_changes"]:
-        peso_data = datos["weight_changes"]["data"]
+    peso_data = seccion.data
     
     if not peso_data:
         return False
@@ -32,7 +31,7 @@ def procesar_peso(datos, cache):
     por_dia = {}
     por_fuente = {}
     
-    for p in peso_data:
+    for p, dia in zip(peso_data, seccion.dias("timestamp")):
         peso_kg = p.get("weight_kg", 0)
         timestamp = p.get("timestamp")
         record_id = p.get("record_id")  # ✅ NUEVO
@@ -46,7 +45,8 @@ def procesar_peso(datos, cache):
         
         # Agrupar por día
         try:
-            dia = datetime.fromisoformat(timestamp.replace("Z", "+00:00")).strftime("%Y-%m-%d")
+            if dia is None:
+                raise ValueError(f"timestamp inválido: {timestamp!r}")
             if dia not in por_dia:
                 por_dia[dia] = {
                     "pesos": [], 
@@ -67,9 +67,9 @@ def procesar_peso(datos, cache):
     
     # ✅ DEDUPLICAR con días ya existentes en cache
     dias_existentes = {
-        datetime.fromisoformat(p["timestamp"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        for p in cache["peso"]
-        if "timestamp" in p
+        tiempo.dia_iso(tiempo.dia(p))
+        for p in vivos(cache, "peso")
+        if "timestamp" in p and tiempo.dia(p) is not None
     }
     
     # Agregar solo 1 registro por día (promedio)
@@ -95,14 +95,10 @@ def procesar_peso(datos, cache):
     return agregados > 0
 
 
-def procesar_grasa_corporal(datos, cache, nombre_archivo):
+@extractor("grasa_corporal", "body_fat_records", "body_fat_changes")
+def procesar_grasa_corporal(seccion, cache, nombre_archivo=None):
     """Extrae datos de grasa corporal % del JSON con RECORD_ID"""
-    grasa_data = None
-    
-    if "body_fat_records" in datos and "data" in datos["body_fat_records"]:
-        grasa_data = datos["body_fat_records"]["data"]
-    elif "body_fat_changes" in datos and "data" in datos["body_fat_changes"]:
-        grasa_data = datos["body_fat_changes"]["data"]
+    grasa_data = seccion.data
     
     if not grasa_data:
         return False
@@ -125,14 +121,10 @@ def procesar_grasa_corporal(datos, cache, nombre_archivo):
     return agregados > 0
 
 
-def procesar_masa_muscular(datos, cache, nombre_archivo):
+@extractor("masa_muscular", "lean_body_mass_records", "lean_body_mass_changes")
+def procesar_masa_muscular(seccion, cache, nombre_archivo=None):
     """Extrae datos de masa muscular (lean body mass) del JSON con RECORD_ID"""
-    masa_data = None
-    
-    if "lean_body_mass_records" in datos and "data" in datos["lean_body_mass_records"]:
-        masa_data = datos["lean_body_mass_records"]["data"]
-    elif "lean_body_mass_changes" in datos and "data" in datos["lean_body_mass_changes"]:
-        masa_data = datos["lean_body_mass_changes"]["data"]
+    masa_data = seccion.data
     
     if not masa_data:
         return False
@@ -155,14 +147,10 @@ def procesar_masa_muscular(datos, cache, nombre_archivo):
     return agregados > 0
 
 
-def procesar_masa_agua(datos, cache, nombre_archivo):
+@extractor("masa_agua", "body_water_mass_records", "body_water_mass_changes")
+def procesar_masa_agua(seccion, cache, nombre_archivo=None):
     """Extrae datos de masa de agua corporal del JSON con RECORD_ID"""
-    agua_data = None
-    
-    if "body_water_mass_records" in datos and "data" in datos["body_water_mass_records"]:
-        agua_data = datos["body_water_mass_records"]["data"]
-    elif "body_water_mass_changes" in datos and "data" in datos["body_water_mass_changes"]:
-        agua_data = datos["body_water_mass_changes"]["data"]
+    agua_data = seccion.data
     
     if not agua_data:
         return False
@@ -185,14 +173,10 @@ def procesar_masa_agua(datos, cache, nombre_archivo):
     return agregados > 0
 
 
-def procesar_masa_osea(datos, cache, nombre_archivo):
+@extractor("masa_osea", "bone_mass_records", "bone_mass_changes")
+def procesar_masa_osea(seccion, cache, nombre_archivo=None):
     """Extrae datos de masa ósea del JSON con RECORD_ID"""
-    hueso_data = None
-    
-    if "bone_mass_records" in datos and "data" in datos["bone_mass_records"]:
-        hueso_data = datos["bone_mass_records"]["data"]
-    elif "bone_mass_changes" in datos and "data" in datos["bone_mass_changes"]:
-        hueso_data = datos["bone_mass_changes"]["data"]
+    hueso_data = seccion.data
     
     if not hueso_data:
         return False
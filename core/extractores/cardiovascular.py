@@ -3,71 +3,53 @@
 """
 Extractor de métricas cardiovasculares - VERSIÓN CON RECORD_ID
 FC reposo desde heart_rate_changes (horario nocturno), presión, VO2max, FC continua
+⚡ FC reposo y FC continua van a la serie compacta por minuto (core/serie_fc.py)
 ✅ AGREGA record_id a cada registro
 """
 
-from datetime import datetime
 from utils.logger import logger
+from core.extractores.registro import extractor
 from core.utils_procesador import reportar_por_fuente
+from core.serie_fc import buckets_de_registros, obtener_serie_fc, es_nocturno
 
 
-def procesar_fc_reposo(datos, cache, nombre_archivo):
+def _buckets_fc(seccion):
+    """Buckets por minuto de la sección (compartidos entre FC reposo y FC continua)"""
+    return buckets_de_registros(seccion.data, seccion.fechas("start_time"))
+
+
+def _ingestar_serie_fc(seccion, cache):
+    """Escribe los buckets de la sección en la serie compacta una sola vez por sección"""
+    buckets = seccion.derivado("buckets_fc", _buckets_fc)
+    seccion.derivado("serie_fc_escrita", lambda s: obtener_serie_fc(cache).upsert(buckets))
+    return buckets
+
+
+@extractor("fc_reposo", "heart_rate_changes", "heart_rate_records")
+def procesar_fc_reposo(seccion, cache, nombre_archivo=None):
     """
-    Extrae FC en REPOSO desde heart_rate_changes en horario nocturno (22:00-06:00)
+    FC en REPOSO desde heart_rate_changes en horario nocturno (22:00-06:00)
     Ya NO usa resting_heart_rate_records/changes
-    ✅ CON RECORD_ID
+    ⚡ Se guarda en la serie compacta por minuto (core/serie_fc.py);
+    fc_reposo es una vista: mínimo de cada minuto nocturno
     """
-    fc_data = None
-    
-    # Buscar en heart_rate_changes
-    if "heart_rate_changes" in datos and "data" in datos["heart_rate_changes"]:
-        fc_data = datos["heart_rate_changes"]["data"]
-    elif "heart_rate_records" in datos and "data" in datos["heart_rate_records"]:
-        fc_data = datos["heart_rate_records"]["data"]
-    
-    if not fc_data:
+    if not seccion.data:
         return False
     
-    count_antes = len(cache.get("fc_reposo", []))
-    
-    # ✅ Filtrar solo horario nocturno (22:00 - 06:00) para FC reposo
-    for fc in fc_data:
-        try:
-            start_time = datetime.fromisoformat(fc.get("start_time", "").replace("Z", "+00:00"))
-            hora = start_time.hour
-            
-            # Solo horario nocturno
-            if hora >= 22 or hora < 6:
-                # Usar min_bpm si está disponible, sino avg_bpm
-                bpm_reposo = fc.get("min_bpm", fc.get("avg_bpm", 0))
-                
-                cache["fc_reposo"].append({
-                    "record_id": fc.get("record_id"),        # ✅ NUEVO
-                    "timestamp": fc.get("start_time"),       # ✅ NUEVO
-                    "fecha": fc.get("start_time"),           # mantener por compatibilidad
-                    "bpm": bpm_reposo,
-                    "fuente": fc.get("source", "Desconocido")
-                })
-        except Exception as ex:
-            logger.warning(f"Error procesando FC reposo: {ex}")
+    buckets = _ingestar_serie_fc(seccion, cache)
+    nocturnos = sum(1 for _, minuto, _, _ in buckets if es_nocturno(minuto))
     
-    agregados = len(cache['fc_reposo']) - count_antes
-    if agregados > 0:
-        logger.info(f"  → FC en reposo agregada: {agregados} (desde heart_rate horario nocturno)")
-        reportar_por_fuente(cache['fc_reposo'][-agregados:], "FC Reposo", "bpm")
+    if nocturnos > 0:
+        logger.info(f"  → FC en reposo agregada: {nocturnos} registros (desde heart_rate horario nocturno)")
         return True
     
     return False
 
 
-def procesar_presion_arterial(datos, cache, nombre_archivo):
+@extractor("presion_arterial", "blood_pressure_records", "blood_pressure_changes")
+def procesar_presion_arterial(seccion, cache, nombre_archivo=None):
     """Extrae datos de presión arterial del JSON con RECORD_ID"""
-    presion_data = None
-    
-    if "blood_pressure_records" in datos and "data" in datos["blood_pressure_records"]:
-        presion_data = datos["blood_pressure_records"]["data"]
-    elif "blood_pressure_changes" in datos and "data" in datos["blood_pressure_changes"]:
-        presion_data = datos["blood_pressure_changes"]["data"]
+    presion_data = seccion.data
     
     if not presion_data:
         return False
@@ -91,14 +73,10 @@ def procesar_presion_arterial(datos, cache, nombre_archivo):
     return agregados > 0
 
 
-def procesar_vo2max(datos, cache, nombre_archivo):
+@extractor("vo2max", "vo2_max_records", "vo2max_changes")
+def procesar_vo2max(seccion, cache, nombre_archivo=None):
     """Extrae datos de VO2max medido del JSON con RECORD_ID"""
-    vo2_data = None
-    
-    if "vo2_max_records" in datos and "data" in datos["vo2_max_records"]:
-        vo2_data = datos["vo2_max_records"]["data"]
-    elif "vo2max_changes" in datos and "data" in datos["vo2max_changes"]:
-        vo2_data = datos["vo2max_changes"]["data"]
+    vo2_data = seccion.data
     
     if not vo2_data:
         return False
@@ -122,72 +100,22 @@ def procesar_vo2max(datos, cache, nombre_archivo):
     return agregados > 0
 
 
-def procesar_frecuencia_cardiaca(datos, cache, nombre_archivo):
+@extractor("frecuencia_cardiaca", "heart_rate_records", "heart_rate_changes")
+def procesar_frecuencia_cardiaca(seccion, cache, nombre_archivo=None):
     """
-    Extrae datos de frecuencia cardíaca continua del JSON (agregada por día)
-    Procesa TODOS los registros y los agrupa por día
-    ✅ CON RECORD_ID (usa el primero del día)
+    Extrae datos de frecuencia cardíaca continua del JSON
+    ⚡ Buckets por minuto (min/max/promedio) en la serie compacta;
+    el resumen por día es una vista (vista_frecuencia_cardiaca)
     """
-    fc_data = None
-    
-    if "heart_rate_records" in datos and "data" in datos["heart_rate_records"]:
-        fc_data = datos["heart_rate_records"]["data"]
-    elif "heart_rate_changes" in datos and "data" in datos["heart_rate_changes"]:
-        fc_data = datos["heart_rate_changes"]["data"]
-    
-    if not fc_data:
+    if not seccion.data:
         return False
     
-    count_antes = len(cache.get("frecuencia_cardiaca", []))
-    
-    # Agrupar por día - TODOS los registros
-    por_dia = {}
-    
-    for fc in fc_data:
-        try:
-            start_time = datetime.fromisoformat(fc.get("start_time", "").replace("Z", "+00:00"))
-            dia = start_time.strftime("%Y-%m-%d")
-            
-            if dia not in por_dia:
-                por_dia[dia] = {
-                    "record_id": fc.get("record_id"),        # ✅ NUEVO - primer record_id del día
-                    "timestamp": fc.get("start_time"),       # ✅ NUEVO
-                    "fecha": fc.get("start_time"),
-                    "bpm_min": 999,
-                    "bpm_max": 0,
-                    "bpm_suma": 0,
-                    "count": 0,
-                    "fuente": fc.get("source", "Desconocido")
-                }
-            
-            # Usar avg_bpm, min_bpm, max_bpm si están disponibles
-            bpm_avg = fc.get("avg_bpm", fc.get("bpm", 0))
-            bpm_min = fc.get("min_bpm", bpm_avg)
-            bpm_max = fc.get("max_bpm", bpm_avg)
-            
-            por_dia[dia]["bpm_min"] = min(por_dia[dia]["bpm_min"], bpm_min)
-            por_dia[dia]["bpm_max"] = max(por_dia[dia]["bpm_max"], bpm_max)
-            por_dia[dia]["bpm_suma"] += bpm_avg
-            por_dia[dia]["count"] += 1
-        
-        except Exception as ex:
-            logger.warning(f"Error procesando FC continua: {ex}")
+    buckets = _ingestar_serie_fc(seccion, cache)
     
-    for dia_data in por_dia.values():
-        cache["frecuencia_cardiaca"].append({
-            "record_id": dia_data["record_id"],              # ✅ NUEVO
-            "timestamp": dia_data["timestamp"],              # ✅ NUEVO
-            "fecha": dia_data["fecha"],                      # mantener por compatibilidad
-            "bpm_min": dia_data["bpm_min"],
-            "bpm_max": dia_data["bpm_max"],
-            "bpm_promedio": dia_data["bpm_suma"] / dia_data["count"] if dia_data["count"] > 0 else 0,
-            "fuente": dia_data["fuente"]
-        })
-    
-    agregados = len(cache['frecuencia_cardiaca']) - count_antes
-    if agregados > 0:
-        logger.info(f"  → Frecuencia cardíaca agregada: {agregados} días")
-        reportar_por_fuente(cache['frecuencia_cardiaca'][-agregados:], "Frecuencia Cardíaca")
+    if buckets:
+        dias = {d for d, _, _, _ in buckets}
+        logger.info(f"  → Frecuencia cardíaca agregada: {len(buckets)} registros en {len(dias)} días")
+        reportar_por_fuente([{"fuente": fuente} for _, _, fuente, _ in buckets], "Frecuencia Cardíaca")
         return True
     
-    return False
\ No newline at end of file
+    return False
@@ -7,26 +7,21 @@ Procesa exercise_sessions y exercise_changes
 """
 
 from utils.logger import logger
+from core.extractores.registro import extractor
 from core.utils_procesador import (
     calcular_pai, calcular_hrtss, clasificar_zona_fc, 
     reportar_ejercicios_por_tipo, traducir_tipo_ejercicio
 )
 
 
-def procesar_ejercicios(datos, cache, nombre_archivo):
+@extractor("ejercicio", "exercise_sessions", "exercise_changes")
+def procesar_ejercicios(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de ejercicio del JSON.
     Soporta formatos FULL (exercise_sessions) y DIFF (exercise_changes).
     ✅ CON SESSION_ID, RECORD_ID, START_TIME, END_TIME
     """
-    ejercicios_data = None
-    
-    # Formato FULL
-    if "exercise_sessions" in datos and "data" in datos["exercise_sessions"]:
-        ejercicios_data = datos["exercise_sessions"]["data"]
-    # Formato DIFF
-    elif "exercise_changes" in datos and "data" in datos["exercise_changes"]:
-        ejercicios_data = datos["exercise_changes"]["data"]
+    ejercicios_data = seccion.data
     
     if not ejercicios_data:
         return False
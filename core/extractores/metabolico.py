@@ -8,21 +8,18 @@ Glucosa, tasa metabólica basal, calorías totales, NUTRICIÓN
 """
 
 from utils.logger import logger
+from core.extractores.registro import extractor
 from core.utils_procesador import reportar_por_fuente
 
 
-def procesar_glucosa(datos, cache, nombre_archivo):
+@extractor("glucosa", "blood_glucose_records", "blood_glucose_changes")
+def procesar_glucosa(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de glucosa en sangre del JSON.
     CORREGIDO: Convierte mmol/L a mg/dL
     ✅ CON RECORD_ID
     """
-    glucosa_data = None
-    
-    if "blood_glucose_records" in datos and "data" in datos["blood_glucose_records"]:
-        glucosa_data = datos["blood_glucose_records"]["data"]
-    elif "blood_glucose_changes" in datos and "data" in datos["blood_glucose_changes"]:
-        glucosa_data = datos["blood_glucose_changes"]["data"]
+    glucosa_data = seccion.data
     
     if not glucosa_data:
         return False
@@ -56,18 +53,14 @@ def procesar_glucosa(datos, cache, nombre_archivo):
     return False
 
 
-def procesar_tasa_metabolica_basal(datos, cache, nombre_archivo):
+@extractor("tasa_metabolica", "basal_metabolic_rate_records", "basal_metabolic_rate_changes")
+def procesar_tasa_metabolica_basal(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de tasa metabólica basal (BMR) del JSON.
     CORREGIDO: Campo real es kcal_per_day
     ✅ CON RECORD_ID
     """
-    bmr_data = None
-    
-    if "basal_metabolic_rate_records" in datos and "data" in datos["basal_metabolic_rate_records"]:
-        bmr_data = datos["basal_metabolic_rate_records"]["data"]
-    elif "basal_metabolic_rate_changes" in datos and "data" in datos["basal_metabolic_rate_changes"]:
-        bmr_data = datos["basal_metabolic_rate_changes"]["data"]
+    bmr_data = seccion.data
     
     if not bmr_data:
         return False
@@ -95,7 +88,8 @@ def procesar_tasa_metabolica_basal(datos, cache, nombre_archivo):
     return False
 
 
-def procesar_nutrition(datos, cache, nombre_archivo):
+@extractor("nutrition", "nutrition_records", "nutrition_changes")
+def procesar_nutrition(seccion, cache, nombre_archivo=None):
     """
     ✅ NUEVA FUNCIÓN: Extrae datos de nutrición del JSON.
     Procesa nutrition_records o nutrition_changes.
@@ -107,12 +101,7 @@ def procesar_nutrition(datos, cache, nombre_archivo):
     - fiber_g, sugar_g (opcionales)
     - fuente
     """
-    nutrition_data = None
-    
-    if "nutrition_records" in datos and "data" in datos["nutrition_records"]:
-        nutrition_data = datos["nutrition_records"]["data"]
-    elif "nutrition_changes" in datos and "data" in datos["nutrition_changes"]:
-        nutrition_data = datos["nutrition_changes"]["data"]
+    nutrition_data = seccion.data
     
     if not nutrition_data:
         return False
@@ -128,13 +117,20 @@ def procesar_nutrition(datos, cache, nombre_archivo):
         4: "Snack"
     }
     contador_meal = {}
+    # Un export puede traer alimentos iguales a la misma hora (ej: tres
+    # porciones de pan): la repetición entra en la clave, no se reemplazan
+    vistos = {}
     
     for n in nutrition_data:
         meal_type = n.get("meal_type", 0)
+        identico = repr(n)
+        repeticion = vistos.get(identico, 0)
+        vistos[identico] = repeticion + 1
         
-        cache["nutrition"].append({
+        registro = {
             "record_id": n.get("record_id"),                     # ✅ NUEVO
             "timestamp": n.get("start_time"),                    # ✅ NUEVO (nutrition usa start_time)
+            "end_time": n.get("end_time"),
             "meal_type": meal_type,                              # ✅ NUEVO (0=sin especificar, 1=desayuno, 2=almuerzo, 3=cena, 4=snack)
             "name": n.get("name", "Sin nombre"),                 # ✅ NUEVO
             "energy_kcal": n.get("energy_kcal", 0),              # ✅ NUEVO
@@ -144,7 +140,10 @@ def procesar_nutrition(datos, cache, nombre_archivo):
             "fiber_g": n.get("fiber_g"),                         # ✅ NUEVO (puede ser None)
             "sugar_g": n.get("sugar_g"),                         # ✅ NUEVO (puede ser None)
             "fuente": n.get("source", "Desconocido")
-        })
+        }
+        if repeticion:
+            registro["repeticion"] = repeticion
+        cache["nutrition"].append(registro)
         
         # Contar por tipo de comida
         meal_name = por_meal_type.get(meal_type, "Otro")
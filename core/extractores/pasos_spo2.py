@@ -4,23 +4,19 @@
 Extractor de pasos y saturación de oxígeno
 """
 
-from datetime import datetime
 from utils.logger import logger
+from core.extractores.registro import extractor
 from core.utils_procesador import reportar_por_fuente
 
 
-def procesar_pasos(datos, cache, nombre_archivo):
+@extractor("pasos", "steps_records", "steps_changes")
+def procesar_pasos(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de pasos del JSON.
     Soporta formatos FULL (steps_records) y DIFF (steps_changes).
     Agrupa por día automáticamente.
     """
-    pasos_data = None
-    
-    if "steps_records" in datos and "data" in datos["steps_records"]:
-        pasos_data = datos["steps_records"]["data"]
-    elif "steps_changes" in datos and "data" in datos["steps_changes"]:
-        pasos_data = datos["steps_changes"]["data"]
+    pasos_data = seccion.data
     
     if not pasos_data:
         return False
@@ -30,10 +26,10 @@ def procesar_pasos(datos, cache, nombre_archivo):
     # Agrupar por día + fuente
     por_dia_fuente = {}
     
-    for p in pasos_data:
+    for p, dia in zip(pasos_data, seccion.dias("start_time")):
         try:
-            fecha = datetime.fromisoformat(p.get("start_time", "").replace("Z", "+00:00"))
-            dia = fecha.strftime("%Y-%m-%d")
+            if dia is None:
+                raise ValueError(f"start_time inválido: {p.get('start_time')!r}")
             fuente = p.get("source", "Desconocido")
             
             clave = f"{dia}|{fuente}"
@@ -63,17 +59,13 @@ def procesar_pasos(datos, cache, nombre_archivo):
     return False
 
 
-def procesar_saturacion_oxigeno(datos, cache, nombre_archivo):
+@extractor("spo2", "oxygen_saturation_records", "oxygen_saturation_changes")
+def procesar_saturacion_oxigeno(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de saturación de oxígeno (SpO2) del JSON.
     Soporta formatos FULL (oxygen_saturation_records) y DIFF (oxygen_saturation_changes).
     """
-    spo2_data = None
-    
-    if "oxygen_saturation_records" in datos and "data" in datos["oxygen_saturation_records"]:
-        spo2_data = datos["oxygen_saturation_records"]["data"]
-    elif "oxygen_saturation_changes" in datos and "data" in datos["oxygen_saturation_changes"]:
-        spo2_data = datos["oxygen_saturation_changes"]["data"]
+    spo2_data = seccion.data
     
     if not spo2_data:
         return False
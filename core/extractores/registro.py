@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de extractores
+Cada extractor declara las secciones del export que consume
+(ej: weight_records / weight_changes) y el procesador despacha cada sección
+una sola vez a todos los extractores interesados.
+
+Los valores derivados (fechas parseadas, días) se calculan una vez por
+sección y se comparten entre extractores: heart_rate_records lo consumen
+FC reposo y FC continua, y ambos necesitan parsear start_time.
+"""
+
+from datetime import datetime
+from functools import wraps
+
+# Extractores registrados, en orden de registro (orden de import)
+REGISTRO = []
+
+
+class SeccionExport:
+    """
+    Una sección de primer nivel del export (ej: heart_rate_records)
+    con valores derivados memorizados.
+    """
+
+    def __init__(self, clave, contenido):
+        self.clave = clave
+        self.data = contenido.get("data", []) if isinstance(contenido, dict) else []
+        self._fechas = {}
+        self._dias = {}
+        self._derivados = {}
+
+    @classmethod
+    def desde_datos(cls, datos, claves):
+        """Retorna la primera sección presente en datos entre las claves dadas (o None)"""
+        for clave in claves:
+            if clave in datos and "data" in datos[clave]:
+                return cls(clave, datos[clave])
+        return None
+
+    def fechas(self, campo="start_time"):
+        """
+        Lista paralela a data con el datetime de cada registro (None si no parsea).
+        Se parsea una sola vez por sección, sin importar cuántos extractores la usen.
+        """
+        if campo not in self._fechas:
+            fechas = []
+            for registro in self.data:
+                try:
+                    fechas.append(datetime.fromisoformat(registro.get(campo, "").replace("Z", "+00:00")))
+                except (AttributeError, TypeError, ValueError):
+                    fechas.append(None)
+            self._fechas[campo] = fechas
+        return self._fechas[campo]
+
+    def derivado(self, nombre, calcular):
+        """Valor derivado cualquiera, calculado una sola vez: calcular(seccion)"""
+        if nombre not in self._derivados:
+            self._derivados[nombre] = calcular(self)
+        return self._derivados[nombre]
+
+    def dias(self, campo="start_time"):
+        """Lista paralela a data con el día "YYYY-MM-DD" de cada registro (None si no parsea)"""
+        if campo not in self._dias:
+            self._dias[campo] = [
+                f.strftime("%Y-%m-%d") if f is not None else None
+                for f in self.fechas(campo)
+            ]
+        return self._dias[campo]
+
+
+def extractor(campo, *claves):
+    """
+    Decorador: registra un extractor para las claves de sección dadas.
+
+    La función decorada recibe (seccion, cache, nombre_archivo) con una SeccionExport.
+    La función pública resultante mantiene la firma original (datos, cache, nombre_archivo)
+    y busca la sección en datos, así puede seguir llamándose directamente.
+
+    Args:
+        campo (str): Sección del cache que alimenta (ej: "peso")
+        claves (str): Claves del export que consume, en orden de preferencia
+    """
+    def decorar(funcion):
+        @wraps(funcion)
+        def desde_datos(datos, cache, nombre_archivo=None):
+            seccion = SeccionExport.desde_datos(datos, claves)
+            if seccion is None:
+                return False
+            return funcion(seccion, cache, nombre_archivo)
+
+        desde_datos.campo = campo
+        desde_datos.claves = claves
+        desde_datos.procesar_seccion = funcion
+        REGISTRO.append(desde_datos)
+        return desde_datos
+
+    return decorar
+
+
+def extractores_por_clave():
+    """
+    Retorna {clave_export: [extractores]} para despachar en una sola pasada.
+    """
+    por_clave = {}
+    for ext in REGISTRO:
+        for clave in ext.claves:
+            por_clave.setdefault(clave, []).append(ext)
+    return por_clave
@@ -5,21 +5,25 @@ Extractor de datos de sueño - VERSIÓN COMPLETA CON RECORD_ID Y STAGES
 Procesa sleep_sessions y sleep_changes
 ✅ AGREGA: session_id, record_id, start_time, end_time, zone_offset, stages array
 ✅ MANTIENE: awake, light, deep, rem por compatibilidad
+⚡ Las fases se guardan codificadas por tramos (core/fases_sueno.py)
 """
 
-from datetime import datetime
 from utils.logger import logger
+from core.extractores.registro import extractor
+from core.fases_sueno import codificar_fases
 from collections import defaultdict
 
 
-def procesar_sueno(datos, cache):
+@extractor("sueno", "sleep_sessions", "sleep_changes")
+def procesar_sueno(seccion, cache, nombre_archivo=None):
     """
     Extrae datos de sueño del JSON.
     
     ✅ VERSIÓN COMPLETA:
     - session_id, record_id (identificadores únicos)
     - start_time, end_time, start_zone_offset, end_zone_offset
-    - stages array completo con todas las fases
+    - fases completas codificadas por tramos (fases_inicio + fases_rle);
+      vista_fases() arma la lista de dicts a pedido
     - awake, light, deep, rem (campos planos por compatibilidad)
     - duration_minutes, stages_count
     
@@ -31,12 +35,7 @@ def procesar_sueno(datos, cache):
     - stage_type 5 = Deep sleep (profundo)
     - stage_type 6 = REM
     """
-    sueno_data = None
-    
-    if "sleep_sessions" in datos and "data" in datos["sleep_sessions"]:
-        sueno_data = datos["sleep_sessions"]["data"]
-    elif "sleep_changes" in datos and "data" in datos["sleep_changes"]:
-        sueno_data = datos["sleep_changes"]["data"]
+    sueno_data = seccion.data
     
     if not sueno_data:
         return False
@@ -57,51 +56,13 @@ def procesar_sueno(datos, cache):
         stages_count = len(fases)
         fuente = s.get("source", "Desconocido")
         
-        # ✅ NUEVO - Construir array de stages completo
-        stages_array = []
-        
-        # Calcular duración por fase (mantener lógica existente)
-        duracion_total = 0
-        duracion_awake = 0
-        duracion_light = 0
-        duracion_deep = 0
-        duracion_rem = 0
-        
-        for f in fases:
-            start = datetime.fromisoformat(f["start_time"].replace("Z", "+00:00"))
-            end = datetime.fromisoformat(f["end_time"].replace("Z", "+00:00"))
-            duracion_minutos = (end - start).total_seconds() / 60
-            
-            duracion_total += duracion_minutos
-            
-            stage_type = f.get("stage_type")
-            
-            # ✅ NUEVO - Agregar a stages array
-            stage_name = "unknown"
-            if stage_type == 1:
-                stage_name = "awake"
-                duracion_awake += duracion_minutos
-            elif stage_type == 2:
-                stage_name = "sleep"
-            elif stage_type == 3:
-                stage_name = "out_of_bed"
-            elif stage_type == 4:
-                stage_name = "light"
-                duracion_light += duracion_minutos
-            elif stage_type == 5:
-                stage_name = "deep"
-                duracion_deep += duracion_minutos
-            elif stage_type == 6:
-                stage_name = "rem"
-                duracion_rem += duracion_minutos
-            
-            stages_array.append({
-                "stage": stage_name,
-                "stage_type": stage_type,
-                "start_time": f["start_time"],
-                "end_time": f["end_time"],
-                "duration_minutes": round(duracion_minutos, 1)
-            })
+        # ⚡ Fases codificadas por tramos + totales calculados una sola vez
+        fases_inicio, fases_rle, totales = codificar_fases(fases)
+        duracion_total = totales["total"]
+        duracion_awake = totales["awake"]
+        duracion_light = totales["light"]
+        duracion_deep = totales["deep"]
+        duracion_rem = totales["rem"]
         
         # Si duration_minutes viene del JSON, usarlo; sino usar el calculado
         if duration_minutes == 0:
@@ -118,8 +79,9 @@ def procesar_sueno(datos, cache):
             "start_zone_offset": start_zone_offset,          # ✅ NUEVO
             "end_zone_offset": end_zone_offset,              # ✅ NUEVO
             
-            # ✅ NUEVOS CAMPOS - Stages array y conteo
-            "stages": stages_array,                          # ✅ NUEVO - Array completo
+            # ⚡ Fases por tramos (ver core/fases_sueno.py) y conteo
+            "fases_inicio": fases_inicio,
+            "fases_rle": fases_rle,
             "stages_count": stages_count,                    # ✅ NUEVO
             
             # Campos existentes (por compatibilidad)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fases de sueño codificadas por tramos (run-length)
+Cada sesión de sueño trae ~60 fases; guardarlas como dicts con dos ISO,
+nombre, código y duración ocupaba la mayor parte del JSON del cache.
+
+Una sesión guarda ahora:
+- "fases_inicio": epoch UTC (segundos) del inicio de la primera fase
+- "fases_rle": base64 de tres arrays paralelos, little-endian:
+      offset   array('i')  segundos desde fases_inicio
+      duracion array('I')  segundos
+      codigo   array('B')  stage_type (1=awake, 4=light, 5=deep, 6=rem, ...)
+
+Los totales por fase (awake, light, deep, rem, duracion) se calculan al
+ingestar y quedan como campos planos. La lista de dicts ("stages") solo
+se arma a pedido con vista_fases().
+"""
+
+import sys
+import base64
+from array import array
+from datetime import datetime, timezone
+
+# stage_type -> nombre
+NOMBRES_FASE = {
+    1: "awake",
+    2: "sleep",
+    3: "out_of_bed",
+    4: "light",
+    5: "deep",
+    6: "rem",
+}
+
+# Fases que suman en los totales planos del registro
+FASES_TOTALES = ("awake", "light", "deep", "rem")
+
+_TIPOS = ("i", "I", "B")
+
+
+def _parsear(texto):
+    """ISO 8601 -> datetime aware (UTC si no trae offset)"""
+    dt = datetime.fromisoformat(texto.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _iso_utc(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def codificar_fases(fases):
+    """
+    Codifica las fases crudas del export (start_time / end_time / stage_type).
+
+    Returns:
+        tuple: (inicio, rle, totales) con totales = {"awake", "light", "deep",
+               "rem", "total"} en minutos exactos (sin redondear)
+    """
+    totales = dict.fromkeys(FASES_TOTALES, 0)
+    totales["total"] = 0
+    if not fases:
+        return None, "", totales
+
+    tramos = []
+    for f in fases:
+        inicio = _parsear(f["start_time"])
+        segundos = (_parsear(f["end_time"]) - inicio).total_seconds()
+        codigo = f.get("stage_type") or 0
+        tramos.append((inicio.timestamp(), segundos, codigo))
+
+        # Mismo cálculo que antes (timedelta), así los totales no cambian
+        minutos = segundos / 60
+        totales["total"] += minutos
+        nombre = NOMBRES_FASE.get(codigo)
+        if nombre in totales:
+            totales[nombre] += minutos
+
+    base = int(min(t[0] for t in tramos))
+    offsets = array("i", (int(round(t[0] - base)) for t in tramos))
+    duraciones = array("I", (max(0, int(round(t[1]))) for t in tramos))
+    codigos = array("B", (min(255, max(0, int(t[2]))) for t in tramos))
+    return base, _empaquetar(offsets, duraciones, codigos), totales
+
+
+def _empaquetar(*columnas):
+    partes = []
+    for columna in columnas:
+        if sys.byteorder == "big":
+            columna = array(columna.typecode, columna)
+            columna.byteswap()
+        partes.append(columna.tobytes())
+    return base64.b64encode(b"".join(partes)).decode("ascii")
+
+
+def decodificar_fases(rle):
+    """base64 -> (offsets, duraciones, codigos) como arrays"""
+    datos = base64.b64decode(rle) if rle else b""
+    # 4 + 4 + 1 bytes por fase
+    n = len(datos) // 9
+    columnas = []
+    pos = 0
+    for tipo in _TIPOS:
+        columna = array(tipo)
+        tam = columna.itemsize * n
+        columna.frombytes(datos[pos:pos + tam])
+        if sys.byteorder == "big":
+            columna.byteswap()
+        columnas.append(columna)
+        pos += tam
+    return tuple(columnas)
+
+
+def vista_fases(registro):
+    """
+    Lista de fases de una sesión con la forma anterior de "stages"
+    (stage, stage_type, start_time, end_time, duration_minutes).
+    """
+    if "stages" in registro:
+        return registro["stages"]
+
+    inicio = registro.get("fases_inicio")
+    if inicio is None:
+        return []
+
+    fases = []
+    for offset, duracion, codigo in zip(*decodificar_fases(registro.get("fases_rle", ""))):
+        desde = inicio + offset
+        fases.append({
+            "stage": NOMBRES_FASE.get(codigo, "unknown"),
+            "stage_type": codigo,
+            "start_time": _iso_utc(desde),
+            "end_time": _iso_utc(desde + duracion),
+            "duration_minutes": round(duracion / 60, 1)
+        })
+    return fases
+
+
+def migrar_stages(registros):
+    """
+    Convierte el "stages" (lista de dicts) de sesiones de caches anteriores
+    a fases_inicio / fases_rle. Los totales planos ya existentes no se tocan.
+
+    Returns:
+        int: Sesiones migradas
+    """
+    migradas = 0
+    for registro in registros:
+        stages = registro.pop("stages", None)
+        if stages is None:
+            continue
+        inicio, rle, _ = codificar_fases(stages)
+        registro["fases_inicio"] = inicio
+        registro["fases_rle"] = rle
+        migradas += 1
+    return migradas
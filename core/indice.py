@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de record_id / session_id del cache, store por clave y borrado con tombstones
+
+Los DIFF traen deletions como lista de record_ids. En vez de recorrer
+todas las secciones del cache por cada archivo, el índice mapea
+id -> [(seccion, slot)] y un borrado solo marca el slot (tombstone).
+
+Cada sección además funciona como store por clave (upsert): la clave es
+el record_id y, si el registro no tiene, una clave de contenido
+(fecha + fuente + valor). Un registro nuevo con una clave que ya existe
+reemplaza al anterior (el anterior queda marcado), así re-procesar un
+FULL no duplica datos.
+
+Los slots marcados se eliminan de las listas en compactar(), que corre
+una vez antes de guardar el cache.
+
+El índice vive en cache["_indice"] (clave privada, no se guarda en el JSON)
+y se sincroniza solo: cada vez que se pide indexa las colas nuevas de
+las listas, así los extractores pueden seguir haciendo append.
+
+También guarda, por sección, los slots en orden de epoch_local con el
+array paralelo de epochs: ventana() es un bisect, O(log n + k), sin
+recorrer ni ordenar la sección.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from operator import itemgetter
+from utils.logger import logger
+from core.tiempo import CAMPOS_FECHA, CAMPO_EPOCH, SerieOrdenada, dia
+
+CLAVE_INDICE = "_indice"
+CLAVE_SUCIAS = "_sucias"
+
+# Registros nuevos fuera de orden que se insertan uno por uno (más: merge)
+INSERCIONES_MAX = 32
+
+# Secciones del cache que pueden tener record_id / session_id
+SECCIONES_CON_ID = [
+    "ejercicio", "peso", "sueno", "grasa_corporal", "fc_reposo",
+    "vo2max", "masa_muscular", "spo2", "pasos", "presion_arterial",
+    "distancia", "calorias_totales", "frecuencia_cardiaca", "glucosa",
+    "tasa_metabolica", "masa_agua", "masa_osea", "nutrition"
+]
+
+# Campos de valor para la clave de contenido (registros sin record_id)
+CAMPOS_VALOR = {
+    "ejercicio": ("tipo", "duracion"),
+    "peso": ("peso",),
+    "sueno": ("duracion",),
+    "grasa_corporal": ("porcentaje",),
+    "fc_reposo": ("bpm",),
+    "vo2max": ("vo2max",),
+    "masa_muscular": ("masa_kg",),
+    "spo2": ("porcentaje",),
+    "pasos": ("pasos",),
+    "presion_arterial": ("sistolica", "diastolica"),
+    "distancia": ("distancia_km",),
+    "calorias_totales": ("energia_kcal",),
+    "frecuencia_cardiaca": ("bpm_min", "bpm_max", "bpm_promedio"),
+    "glucosa": ("nivel_mg_dl",),
+    "tasa_metabolica": ("kcal_dia",),
+    "masa_agua": ("masa_kg",),
+    "masa_osea": ("masa_kg",),
+    # Identidad del registro crudo: fin y todos los valores (varios alimentos
+    # pueden empezar en el mismo instante) y la repetición dentro del export
+    "nutrition": (
+        "end_time", "name", "meal_type", "energy_kcal", "protein_g", "carbs_g",
+        "fat_total_g", "fiber_g", "sugar_g", "repeticion",
+    ),
+}
+
+
+def clave_registro(seccion, registro):
+    """
+    Clave de upsert del registro: ("id", record_id) o, sin record_id,
+    ("contenido", fecha, fuente, valores...)
+    """
+    rid = registro.get("record_id") or registro.get("session_id")
+    if rid is not None:
+        return ("id", rid)
+
+    fecha = None
+    for campo in CAMPOS_FECHA:
+        fecha = registro.get(campo)
+        if fecha:
+            break
+    return ("contenido", fecha, registro.get("fuente")) + tuple(
+        registro.get(campo) for campo in CAMPOS_VALOR.get(seccion, ())
+    )
+
+
+class IndiceRegistros:
+    """id de registro -> ubicaciones en el cache, store por clave y tombstones por sección"""
+
+    def __init__(self):
+        self.ubicaciones = {}   # id -> [(seccion, slot)]
+        self.claves = {}        # seccion -> {clave de upsert: slot vigente}
+        self.por_dia = {}       # seccion -> {dia_local: [slots]}
+        self.tombstones = {}    # seccion -> {slots borrados}
+        self.orden = {}         # seccion -> (epochs ordenados array("d"), [slots en ese orden])
+        self._indexados = {}    # seccion -> (id(lista), cantidad indexada)
+
+    def sincronizar(self, cache):
+        """
+        Indexa los registros agregados desde la última vez (O(nuevos)).
+        Si la clave de un registro nuevo ya existía, el slot anterior se marca:
+        el registro nuevo lo reemplaza (upsert).
+
+        Returns:
+            dict: {seccion: registros reemplazados}
+        """
+        reemplazados = {}
+        for seccion in SECCIONES_CON_ID:
+            # Cache lazy: una sección que no se leyó no tiene nada nuevo que indexar
+            registros = cache.get(seccion) if cargada(cache, seccion) else None
+            if registros is None:
+                continue
+
+            lista, indexados = self._indexados.get(seccion, (None, 0))
+            if lista is not None and (lista != id(registros) or indexados > len(registros)):
+                # La lista fue reemplazada: re-indexar la sección completa
+                self._descartar_seccion(seccion)
+                indexados = 0
+
+            ubicaciones = self.ubicaciones
+            claves = self.claves.setdefault(seccion, {})
+            por_dia = self.por_dia.setdefault(seccion, {})
+            marcados = self.tombstones.get(seccion, ())
+            epochs, slots_ordenados, en_orden = [], [], True
+            for slot in range(indexados, len(registros)):
+                registro = registros[slot]
+                rid = registro.get("record_id")
+                sid = registro.get("session_id")
+                if rid is not None:
+                    ubicaciones.setdefault(rid, []).append((seccion, slot))
+                if sid is not None and sid != rid:
+                    ubicaciones.setdefault(sid, []).append((seccion, slot))
+
+                clave = clave_registro(seccion, registro)
+                previo = claves.get(clave)
+                if previo is not None and previo not in marcados:
+                    marcados = self.tombstones.setdefault(seccion, set())
+                    marcados.add(previo)
+                    reemplazados[seccion] = reemplazados.get(seccion, 0) + 1
+                claves[clave] = slot
+                por_dia.setdefault(dia(registro), []).append(slot)
+                # dia() ya normalizó el registro: epoch_local está
+                e = registro[CAMPO_EPOCH]
+                if e is not None:
+                    if epochs and e < epochs[-1]:
+                        en_orden = False
+                    epochs.append(e)
+                    slots_ordenados.append(slot)
+
+            self._ordenar(seccion, epochs, slots_ordenados, en_orden)
+            self._indexados[seccion] = (id(registros), len(registros))
+
+        return reemplazados
+
+    def _ordenar(self, seccion, nuevos_epochs, nuevos_slots, en_orden):
+        """Agrega los slots nuevos (con sus epochs) al orden por epoch de la sección"""
+        epochs, slots = self.orden.setdefault(seccion, (array("d"), []))
+        if not nuevos_epochs:
+            return
+        if not en_orden:
+            # Estable: a igual epoch queda el orden de slot (el de la lista)
+            pares = sorted(zip(nuevos_epochs, nuevos_slots), key=itemgetter(0))
+            nuevos_epochs = [e for e, _ in pares]
+            nuevos_slots = [slot for _, slot in pares]
+
+        if not epochs or nuevos_epochs[0] >= epochs[-1]:
+            # Caso común: lo agregado es lo más reciente
+            epochs.fromlist(nuevos_epochs)
+            slots.extend(nuevos_slots)
+        elif len(nuevos_epochs) <= INSERCIONES_MAX:
+            for e, slot in zip(nuevos_epochs, nuevos_slots):
+                i = bisect_right(epochs, e)
+                epochs.insert(i, e)
+                slots.insert(i, slot)
+        else:
+            pares = list(merge(zip(epochs, slots), zip(nuevos_epochs, nuevos_slots)))
+            self.orden[seccion] = (array("d", [e for e, _ in pares]), [slot for _, slot in pares])
+
+    def ventana(self, registros, seccion, desde=None, hasta=None, minimo=0):
+        """
+        Registros vivos de la sección con epoch_local en [desde, hasta), en
+        orden de tiempo. Con minimo se completa con los anteriores (lo mismo
+        que garantiza el sufijo de AlmacenSecciones.leer_reciente): al menos
+        `minimo` registros, `minimo` días con datos y el último registro
+        anterior a desde.
+
+        Returns:
+            SerieOrdenada
+        """
+        marcados = self.tombstones.get(seccion, ())
+        orden = self.orden.get(seccion)
+        if orden is None:
+            serie = SerieOrdenada.desde_registros(
+                [r for slot, r in enumerate(registros) if slot not in marcados]
+            )
+            epochs, slots = serie.epochs, range(len(serie))
+            registros = serie
+            marcados = ()
+        else:
+            epochs, slots = orden
+
+        i = 0 if desde is None else bisect_left(epochs, desde)
+        j = len(epochs) if hasta is None else max(i, bisect_left(epochs, hasta))
+        if not marcados and not minimo:
+            return SerieOrdenada([registros[slot] for slot in slots[i:j]], epochs[i:j])
+
+        elegidos = [k for k in range(i, j) if slots[k] not in marcados]
+        if minimo:
+            dias = {epochs[k] // 86400 for k in elegidos}
+            anteriores = []
+            while i > 0 and (len(anteriores) + len(elegidos) < minimo or len(dias) < minimo
+                             or (desde is not None and not anteriores)):
+                i -= 1
+                if slots[i] not in marcados:
+                    anteriores.append(i)
+                    dias.add(epochs[i] // 86400)
+            elegidos = anteriores[::-1] + elegidos
+        return SerieOrdenada([registros[slots[k]] for k in elegidos], array("d", [epochs[k] for k in elegidos]))
+
+    def _descartar_seccion(self, seccion):
+        for rid in list(self.ubicaciones):
+            restantes = [u for u in self.ubicaciones[rid] if u[0] != seccion]
+            if restantes:
+                self.ubicaciones[rid] = restantes
+            else:
+                del self.ubicaciones[rid]
+        self.claves.pop(seccion, None)
+        self.por_dia.pop(seccion, None)
+        self.tombstones.pop(seccion, None)
+        self.orden.pop(seccion, None)
+
+    def borrar(self, record_ids):
+        """
+        Marca como borrados todos los registros con esos ids (O(ids)).
+
+        Args:
+            record_ids (iterable): ids a borrar
+
+        Returns:
+            dict: {seccion: registros marcados}
+        """
+        borrados = {}
+        for rid in record_ids:
+            for seccion, slot in self.ubicaciones.get(rid, ()):
+                marcados = self.tombstones.setdefault(seccion, set())
+                if slot not in marcados:
+                    marcados.add(slot)
+                    borrados[seccion] = borrados.get(seccion, 0) + 1
+        return borrados
+
+    def borrar_dias(self, seccion, dias, filtro=None):
+        """
+        Marca como borrados los registros vivos de la sección en esos días.
+
+        Args:
+            seccion (str): Sección del cache
+            dias (iterable): Ordinales de día local
+            filtro (callable): Opcional, filtro(slot) -> bool; solo marca esos slots
+
+        Returns:
+            int: Registros marcados
+        """
+        por_dia = self.por_dia.get(seccion, {})
+        marcados = self.tombstones.setdefault(seccion, set())
+        antes = len(marcados)
+        for d in dias:
+            slots = por_dia.get(d, ())
+            marcados.update(slots if filtro is None else filter(filtro, slots))
+        return len(marcados) - antes
+
+    def borrado(self, seccion, slot):
+        return slot in self.tombstones.get(seccion, ())
+
+    def pendientes(self):
+        """Cantidad de slots marcados sin compactar"""
+        return sum(len(s) for s in self.tombstones.values())
+
+
+def cargada(cache, clave):
+    """La clave ya está en memoria (un cache por secciones, ver core/almacen.py, la lee al pedirla)"""
+    return dict.__contains__(cache, clave)
+
+
+def cargar_secciones(cache, secciones):
+    """Fuerza la lectura de esas secciones en un cache lazy (no hace nada en un dict común)"""
+    for seccion in secciones:
+        cache.get(seccion)
+
+
+def marcar_sucias(cache, *claves):
+    """
+    Anota las claves del cache modificadas desde el último guardado.
+    El almacén por secciones solo reescribe esas particiones.
+    """
+    cache.setdefault(CLAVE_SUCIAS, set()).update(claves)
+
+
+def obtener_indice(cache):
+    """Índice del cache (se crea la primera vez) sincronizado con las listas actuales"""
+    upsert_nuevos(cache)
+    return cache[CLAVE_INDICE]
+
+
+def upsert_nuevos(cache):
+    """
+    Indexa los registros agregados al cache desde la última sincronización.
+    Los que repiten la clave de un registro existente lo reemplazan.
+
+    Returns:
+        dict: {seccion: registros reemplazados}
+    """
+    indice = cache.get(CLAVE_INDICE)
+    if indice is None:
+        indice = IndiceRegistros()
+        cache[CLAVE_INDICE] = indice
+    return indice.sincronizar(cache)
+
+
+def vivos(cache, seccion):
+    """Registros de la sección que no están marcados como borrados"""
+    registros = cache.get(seccion, [])
+    indice = cache.get(CLAVE_INDICE)
+    if indice is None or not indice.tombstones.get(seccion):
+        return registros
+    return [r for slot, r in enumerate(registros) if not indice.borrado(seccion, slot)]
+
+
+def ventana(cache, seccion, desde=None, hasta=None, minimo=0):
+    """
+    Registros vivos de la sección con epoch_local en [desde, hasta), en
+    orden de tiempo (SerieOrdenada, con el array de epochs). Bisect sobre
+    el orden por epoch del índice: O(log n + k), sin recorrer la sección.
+
+    Args:
+        desde (float): Epoch local inicial (None = desde el primero)
+        hasta (float): Epoch local final (excluido), None = sin límite
+        minimo (int): Completa la ventana con los registros anteriores hasta
+            tener `minimo` registros y `minimo` días con datos, más el último
+            anterior a desde (ej: "los últimos 7 registros / 7 días")
+    """
+    registros = cache.get(seccion, [])
+    return obtener_indice(cache).ventana(registros, seccion, desde, hasta, minimo)
+
+
+def compactar(cache):
+    """
+    Elimina de las listas los slots marcados (borrados y reemplazados).
+    El índice se descarta (los slots cambiaron) y se reconstruye la próxima
+    vez que se pida.
+
+    Returns:
+        int: Registros eliminados
+    """
+    upsert_nuevos(cache)
+    indice = cache[CLAVE_INDICE]
+    if not indice.pendientes():
+        return 0
+
+    total = 0
+    for seccion, slots in list(indice.tombstones.items()):
+        if not slots:
+            continue
+        registros = cache.get(seccion, [])
+        cache[seccion] = [r for slot, r in enumerate(registros) if slot not in slots]
+        total += len(registros) - len(cache[seccion])
+        marcar_sucias(cache, seccion)
+
+    # Los slots cambiaron: el índice se reconstruye la próxima vez que se pida
+    del cache[CLAVE_INDICE]
+    logger.info(f"🧹 Cache compactado: {total} registros borrados/reemplazados eliminados")
+    return total
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lector streaming de exports de HealthConnect
+Lee el JSON sección por sección (weight_records, heart_rate_records, ...)
+sin cargar el documento completo en memoria.
+
+El pico de memoria queda acotado por la sección más grande del archivo,
+no por el archivo entero. Funciona igual para FULL (*_records) y DIFF (*_changes).
+"""
+
+import re
+import json
+
+TAM_BLOQUE = 256 * 1024
+TAM_CABECERA = 8 * 1024   # Un DIFF sin cambios pesa ~1.5 KB
+
+_COUNT = re.compile(rb'"count"\s*:\s*(\d+)')
+_LISTA_CON_DATOS = re.compile(rb'"(?:data|record_ids)"\s*:\s*\[\s*[^\]\s]')
+
+_ESPACIOS = re.compile(r"\s*")
+_CADENA = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_DECODER = json.JSONDecoder()
+_DELIMITADORES = ",}] \t\r\n"
+
+
+class _Buffer:
+    """Buffer de texto que se rellena desde el archivo a medida que se consume"""
+
+    def __init__(self, archivo, tam_bloque):
+        self.archivo = archivo
+        self.tam_bloque = tam_bloque
+        self.texto = ""
+        self.pos = 0
+        self.eof = False
+
+    def leer_mas(self):
+        """Agrega un bloque al buffer. Retorna False si el archivo terminó."""
+        if self.eof:
+            return False
+        bloque = self.archivo.read(self.tam_bloque)
+        if not bloque:
+            self.eof = True
+            return False
+        self.texto += bloque
+        return True
+
+    def descartar_consumido(self):
+        """Libera el texto ya procesado (todo lo anterior a pos)"""
+        if self.pos:
+            self.texto = self.texto[self.pos:]
+            self.pos = 0
+
+    def saltar_espacios(self):
+        while True:
+            self.pos = _ESPACIOS.match(self.texto, self.pos).end()
+            if self.pos < len(self.texto) or not self.leer_mas():
+                return
+
+    def caracter(self):
+        """Retorna el próximo carácter significativo (sin consumirlo)"""
+        self.saltar_espacios()
+        if self.pos >= len(self.texto):
+            raise ValueError("JSON truncado: fin de archivo inesperado")
+        return self.texto[self.pos]
+
+    def esperar(self, caracter):
+        if self.caracter() != caracter:
+            raise ValueError(f"JSON inválido: se esperaba '{caracter}' en posición {self.pos}")
+        self.pos += 1
+
+    def fin_cadena(self, inicio):
+        """Posición final de la cadena que empieza en inicio (leyendo más si hace falta)"""
+        while True:
+            m = _CADENA.match(self.texto, inicio)
+            if m:
+                return m.end()
+            if not self.leer_mas():
+                raise ValueError("JSON truncado: cadena sin cerrar")
+
+    def decodificar_valor(self):
+        """
+        Decodifica el valor JSON que empieza en pos.
+        Si el valor todavía no está completo en el buffer, lee más duplicando
+        el tamaño leído, así el costo total queda lineal en el tamaño del valor.
+        """
+        while True:
+            try:
+                valor, fin = _DECODER.raw_decode(self.texto, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                bloque = self.archivo.read(max(self.tam_bloque, len(self.texto) - self.pos))
+                if not bloque:
+                    self.eof = True
+                else:
+                    self.texto += bloque
+                continue
+
+            # Un número al final del buffer puede estar cortado (ej: 12|34 o 1.|5)
+            siguiente = _ESPACIOS.match(self.texto, fin).end()
+            if not self.eof and (siguiente == len(self.texto) or self.texto[fin] not in _DELIMITADORES):
+                if self.leer_mas():
+                    continue
+
+            self.pos = fin
+            return valor
+
+
+def iterar_secciones(ruta, tam_bloque=TAM_BLOQUE):
+    """
+    Itera las claves de primer nivel de un export JSON.
+
+    Args:
+        ruta (str): Ruta al archivo JSON
+        tam_bloque (int): Caracteres leídos por bloque
+
+    Yields:
+        tuple: (clave, valor) de cada sección, en el orden del archivo
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        buf = _Buffer(f, tam_bloque)
+        buf.esperar("{")
+
+        if buf.caracter() == "}":
+            return
+
+        while True:
+            # Clave
+            if buf.caracter() != '"':
+                raise ValueError(f"JSON inválido: se esperaba una clave en posición {buf.pos}")
+            fin = buf.fin_cadena(buf.pos)
+            clave = json.loads(buf.texto[buf.pos:fin])
+            buf.pos = fin
+            buf.esperar(":")
+
+            # Valor (solo esta sección queda en memoria)
+            buf.caracter()
+            valor = buf.decodificar_valor()
+            buf.descartar_consumido()
+
+            yield clave, valor
+
+            siguiente = buf.caracter()
+            if siguiente == "}":
+                return
+            if siguiente != ",":
+                raise ValueError(f"JSON inválido: se esperaba ',' o '}}' en posición {buf.pos}")
+            buf.pos += 1
+
+
+def export_sin_cambios(ruta, tam_cabecera=TAM_CABECERA):
+    """
+    Mira solo los primeros KB del archivo y dice si es un export sin cambios:
+    todas las secciones (y deletions) con "count": 0 y listas vacías.
+
+    No parsea el JSON. Si el archivo no entra en la cabecera ya tiene datos
+    (o no es un DIFF vacío) y retorna False; ante cualquier duda también.
+
+    Args:
+        ruta (str): Ruta al archivo JSON
+        tam_cabecera (int): Bytes a leer como máximo
+
+    Returns:
+        bool: True si todos los count son 0
+    """
+    try:
+        with open(ruta, "rb") as f:
+            cabecera = f.read(tam_cabecera + 1)
+    except OSError:
+        return False
+
+    if len(cabecera) > tam_cabecera:
+        return False
+
+    counts = _COUNT.findall(cabecera)
+    return bool(counts) and all(int(c) == 0 for c in counts) and not _LISTA_CON_DATOS.search(cabecera)
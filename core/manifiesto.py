@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Manifest de archivos procesados (por nombre y por contenido)
+
+cache["archivos_procesados"] sigue siendo una lista que solo crece (el
+journal guarda la cola y el codec binario la escribe como strings), pero
+cada entrada ahora es "nombre\\ttamaño\\tmtime\\thuella". Las entradas de
+caches anteriores (solo el nombre) se siguen leyendo: cuentan por nombre
+pero no por contenido.
+
+En memoria el manifest vive en cache["_manifiesto"] (clave privada, no se
+guarda) como dicts:
+
+    por_nombre     nombre -> (tamaño, mtime, huella)
+    por_contenido  (tamaño, huella) -> nombre del primer archivo con ese contenido
+    tamanos        tamaños de los archivos con huella
+
+Detectar pendientes es un solo escaneo del directorio con búsquedas O(1).
+La huella (blake2b del contenido) de un pendiente se calcula solo si su
+tamaño coincide con el de un archivo ya visto: un export idéntico a uno
+procesado (aunque tenga otro nombre) se salta sin parsearlo.
+
+Los pendientes se aplican en orden cronológico (orden_export: por el
+timestamp del nombre, FULL y DIFF intercalados), igual que la
+reconstrucción desde procesados/.
+"""
+
+import os
+import re
+import hashlib
+from collections import defaultdict
+from utils.logger import logger
+
+CLAVE_MANIFIESTO = "_manifiesto"
+CLAVE_ARCHIVOS = "archivos_procesados"
+
+_SEPARADOR = "\t"
+_BLOQUE = 1 << 20
+
+
+def huella_archivo(ruta):
+    """blake2b (128 bits) del contenido del archivo, en hex"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(_BLOQUE), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+# health_data_AUTO_FULL_2025-10-18_04-04-44.json -> 2025-10-18_04-04-44
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}")
+
+
+def orden_export(nombre):
+    """
+    Clave de orden cronológico de un export: el timestamp del nombre (por
+    nombre, AUTO_DIFF quedaría antes que un AUTO_FULL anterior).
+    """
+    encontrado = _TIMESTAMP.search(nombre)
+    return (encontrado.group() if encontrado else "", nombre)
+
+
+class Manifiesto:
+    """Archivos procesados indexados por nombre y por contenido"""
+
+    def __init__(self, entradas=()):
+        self.por_nombre = {}
+        self.por_contenido = {}
+        self.tamanos = set()
+        self._huellas = {}  # (ruta, tamaño, mtime) -> huella, calculadas al escanear
+        for entrada in entradas:
+            self._indexar(entrada)
+
+    def _indexar(self, entrada):
+        nombre, *datos = entrada.split(_SEPARADOR)
+        if len(datos) == 3:
+            tamano, mtime, huella = int(datos[0]), int(datos[1]), datos[2]
+            self.por_nombre[nombre] = (tamano, mtime, huella)
+            self.por_contenido.setdefault((tamano, huella), nombre)
+            self.tamanos.add(tamano)
+        else:
+            # Entrada de un cache anterior: solo el nombre
+            self.por_nombre[nombre] = None
+
+    def __contains__(self, nombre):
+        return nombre in self.por_nombre
+
+    def __len__(self):
+        return len(self.por_nombre)
+
+    def __iter__(self):
+        return iter(self.por_nombre)
+
+    def huella(self, ruta, tamano, mtime):
+        clave = (str(ruta), tamano, mtime)
+        huella = self._huellas.get(clave)
+        if huella is None:
+            huella = self._huellas[clave] = huella_archivo(ruta)
+        return huella
+
+    def identico(self, ruta, tamano, mtime):
+        """Nombre del archivo procesado con el mismo contenido, o None"""
+        if tamano not in self.tamanos:
+            return None
+        return self.por_contenido.get((tamano, self.huella(ruta, tamano, mtime)))
+
+    def agregar(self, nombre, ruta):
+        """
+        Registra un archivo (con tamaño, mtime y huella si todavía existe en ruta).
+
+        Returns:
+            str: Entrada para cache["archivos_procesados"], o None si ya estaba
+        """
+        if nombre in self.por_nombre:
+            return None
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            entrada = nombre
+        else:
+            tamano, mtime = st.st_size, int(st.st_mtime)
+            entrada = _SEPARADOR.join((nombre, str(tamano), str(mtime), self.huella(ruta, tamano, mtime)))
+        self._indexar(entrada)
+        return entrada
+
+    def escanear(self, directorio, prefijo, extension):
+        """
+        Un escaneo del directorio: archivos nuevos y exports idénticos a uno
+        ya procesado (o a otro pendiente anterior).
+
+        Returns:
+            tuple: (pendientes, [(duplicado, original)]), en orden cronológico (orden_export)
+        """
+        with os.scandir(directorio) as it:
+            candidatos = sorted(
+                (e for e in it if e.name.startswith(prefijo) and e.name.endswith(extension) and e.is_file()),
+                key=lambda e: orden_export(e.name)
+            )
+
+        pendientes = []
+        duplicados = []
+        # Pendientes de este escaneo por tamaño (la huella se calcula si otro coincide)
+        por_tamano = defaultdict(list)
+        for entrada in candidatos:
+            if entrada.name in self.por_nombre:
+                continue
+            st = entrada.stat()
+            tamano, mtime = st.st_size, int(st.st_mtime)
+            original = self.identico(entrada.path, tamano, mtime)
+            if original is None and tamano in por_tamano:
+                huella = self.huella(entrada.path, tamano, mtime)
+                for otro, otro_mtime in por_tamano[tamano]:
+                    if self.huella(os.path.join(directorio, otro), tamano, otro_mtime) == huella:
+                        original = otro
+                        break
+            if original is None:
+                pendientes.append(entrada.name)
+                por_tamano[tamano].append((entrada.name, mtime))
+            else:
+                duplicados.append((entrada.name, original))
+
+        return pendientes, duplicados
+
+
+def obtener_manifiesto(cache):
+    """Manifest del cache (se arma la primera vez desde cache["archivos_procesados"])"""
+    manifiesto = cache.get(CLAVE_MANIFIESTO)
+    if manifiesto is None:
+        manifiesto = Manifiesto(cache.get(CLAVE_ARCHIVOS, []))
+        cache[CLAVE_MANIFIESTO] = manifiesto
+        sin_huella = sum(1 for datos in manifiesto.por_nombre.values() if datos is None)
+        if sin_huella:
+            logger.debug(f"Manifest: {sin_huella} archivos de caches anteriores solo por nombre")
+    return manifiesto
@@ -1,237 +1,509 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Procesador Principal (MODULAR)
-Orquesta todos los extractores de métricas
-✅ VERSIÓN CON NUTRITION + DELETIONS
-"""
-
-import os
-import json
-from pathlib import Path
-from config import INPUT_DIR, ARCHIVO_PREFIX, ARCHIVO_EXTENSION
-from utils.logger import logger
-
-# Importar extractores modulares
-from core.extractores.ejercicios import procesar_ejercicios
-from core.extractores.biometricos import (
-    procesar_peso, procesar_grasa_corporal, procesar_masa_muscular,
-    procesar_masa_agua, procesar_masa_osea
-)
-from core.extractores.cardiovascular import (
-    procesar_fc_reposo, procesar_presion_arterial, procesar_vo2max,
-    procesar_frecuencia_cardiaca
-)
-from core.extractores.metabolico import (
-    procesar_glucosa, procesar_tasa_metabolica_basal, procesar_nutrition  # ✅ NUEVO
-)
-from core.extractores.actividad import (
-    procesar_distancia, procesar_calorias_totales
-)
-from core.extractores.pasos_spo2 import (
-    procesar_pasos, procesar_saturacion_oxigeno
-)
-from core.extractores.sueno import procesar_sueno
-
-
-def procesar_deletions(cache, datos):
-    """
-    ✅ NUEVA FUNCIÓN: Procesa deletions del JSON y borra registros del cache.
-    
-    Busca en datos["deletions"]["record_ids"] y elimina esos registros
-    de TODAS las secciones del cache que tengan record_id.
-    
-    Args:
-        cache (dict): Cache de datos
-        datos (dict): Datos del JSON con posible sección "deletions"
-    
-    Returns:
-        int: Cantidad de registros borrados
-    """
-    if "deletions" not in datos:
-        return 0
-    
-    deletions = datos.get("deletions", {})
-    record_ids = deletions.get("record_ids", [])
-    
-    if not record_ids:
-        return 0
-    
-    logger.info(f"  🗑️  Procesando {len(record_ids)} deletions...")
-    
-    borrados_total = 0
-    
-    # Lista de TODAS las secciones del cache que pueden tener record_id
-    secciones = [
-        "ejercicio", "peso", "sueno", "grasa_corporal", "fc_reposo", 
-        "vo2max", "masa_muscular", "spo2", "pasos", "presion_arterial",
-        "distancia", "calorias_totales", "frecuencia_cardiaca", "glucosa",
-        "tasa_metabolica", "masa_agua", "masa_osea", "nutrition"
-    ]
-    
-    # Buscar y borrar en cada sección
-    for seccion in secciones:
-        if seccion not in cache:
-            continue
-        
-        antes = len(cache[seccion])
-        
-        # Filtrar: mantener solo los que NO están en record_ids
-        cache[seccion] = [
-            registro for registro in cache[seccion]
-            if registro.get("record_id") not in record_ids and 
-               registro.get("session_id") not in record_ids  # para ejercicios y sueño
-        ]
-        
-        despues = len(cache[seccion])
-        borrados = antes - despues
-        
-        if borrados > 0:
-            borrados_total += borrados
-            logger.info(f"     • {seccion}: {borrados} registros borrados")
-    
-    if borrados_total > 0:
-        logger.info(f"  ✅ Total borrados del cache: {borrados_total}")
-    else:
-        logger.info(f"  ℹ️  No se encontraron registros para borrar")
-    
-    return borrados_total
-
-
-def obtener_archivos_pendientes(archivos_procesados):
-    """Obtiene lista de archivos JSON pendientes de procesar"""
-    try:
-        archivos_json = sorted([
-            f for f in os.listdir(INPUT_DIR)
-            if f.startswith(ARCHIVO_PREFIX) and f.endswith(ARCHIVO_EXTENSION)
-        ])
-    except Exception as e:
-        logger.error(f"Error listando archivos: {e}")
-        return []
-    
-    archivos_nuevos = [f for f in archivos_json if f not in archivos_procesados]
-    
-    logger.info(f"Total archivos JSON encontrados: {len(archivos_json)}")
-    logger.info(f"Archivos ya procesados: {len(archivos_procesados)}")
-    logger.info(f"Archivos nuevos a procesar: {len(archivos_nuevos)}")
-    
-    return archivos_nuevos
-
-
-def procesar_archivo(ruta, cache):
-    """
-    Procesa un JSON de HealthConnect y extrae TODAS las métricas.
-    Orquesta todos los extractores modulares.
-    ✅ VERSIÓN CON NUTRITION + DELETIONS
-    
-    Args:
-        ruta (str): Ruta completa al archivo JSON
-        cache (dict): Cache donde agregar los datos
-    
-    Returns:
-        list: Campos detectados en el archivo
-    """
-    campos_detectados = []
-    nombre_archivo = os.path.basename(ruta)
-    
-    try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-        
-        logger.info(f"Procesando archivo: {nombre_archivo}")
-        logger.info(f"Claves raíz del JSON: {list(datos.keys())}")
-        
-    except Exception as e:
-        logger.error(f"Error leyendo {ruta}: {e}")
-        return campos_detectados
-    
-    # ═══════════════════════════════════════════════════════════════════════
-    # PASO 1: PROCESAR DELETIONS PRIMERO (borrar registros obsoletos)
-    # ═══════════════════════════════════════════════════════════════════════
-    procesar_deletions(cache, datos)
-    
-    # ═══════════════════════════════════════════════════════════════════════
-    # PASO 2: PROCESAR TODAS LAS MÉTRICAS - Llamar a cada extractor modular
-    # ═══════════════════════════════════════════════════════════════════════
-    
-    # Ejercicio
-    if procesar_ejercicios(datos, cache, nombre_archivo):
-        campos_detectados.append("ejercicio")
-    
-    # Biométricos
-    if procesar_peso(datos, cache):
-        campos_detectados.append("peso")
-    
-    if procesar_grasa_corporal(datos, cache, nombre_archivo):
-        campos_detectados.append("grasa_corporal")
-    
-    if procesar_masa_muscular(datos, cache, nombre_archivo):
-        campos_detectados.append("masa_muscular")
-    
-    if procesar_masa_agua(datos, cache, nombre_archivo):
-        campos_detectados.append("masa_agua")
-    
-    if procesar_masa_osea(datos, cache, nombre_archivo):
-        campos_detectados.append("masa_osea")
-    
-    # Cardiovascular
-    if procesar_fc_reposo(datos, cache, nombre_archivo):
-        campos_detectados.append("fc_reposo")
-    
-    if procesar_presion_arterial(datos, cache, nombre_archivo):
-        campos_detectados.append("presion_arterial")
-    
-    if procesar_vo2max(datos, cache, nombre_archivo):
-        campos_detectados.append("vo2max")
-    
-    if procesar_frecuencia_cardiaca(datos, cache, nombre_archivo):
-        campos_detectados.append("frecuencia_cardiaca")
-    
-    # Metabólico
-    if procesar_glucosa(datos, cache, nombre_archivo):
-        campos_detectados.append("glucosa")
-    
-    if procesar_tasa_metabolica_basal(datos, cache, nombre_archivo):
-        campos_detectados.append("tasa_metabolica")
-    
-    # ✅ NUEVO - Nutrición
-    if procesar_nutrition(datos, cache, nombre_archivo):
-        campos_detectados.append("nutrition")
-    
-    # Actividad
-    if procesar_pasos(datos, cache, nombre_archivo):
-        campos_detectados.append("pasos")
-    
-    if procesar_distancia(datos, cache, nombre_archivo):
-        campos_detectados.append("distancia")
-    
-    if procesar_calorias_totales(datos, cache, nombre_archivo):
-        campos_detectados.append("calorias_totales")
-    
-    if procesar_saturacion_oxigeno(datos, cache, nombre_archivo):
-        campos_detectados.append("spo2")
-    
-    # Sueño
-    if procesar_sueno(datos, cache):
-        campos_detectados.append("sueno")
-    
-    if not campos_detectados:
-        logger.warning(f"  ⚠️  No se detectaron campos conocidos en {nombre_archivo}")
-    
-    return campos_detectados
-
-
-def mover_archivo_procesado(nombre_archivo):
-    """Mueve archivo JSON procesado a subcarpeta 'procesados'"""
-    try:
-        carpeta_procesados = INPUT_DIR / "procesados"
-        carpeta_procesados.mkdir(exist_ok=True)
-        
-        origen = INPUT_DIR / nombre_archivo
-        destino = carpeta_procesados / nombre_archivo
-        
-        if origen.exists():
-            origen.rename(destino)
-            logger.info(f"  ✓ Archivo movido a: procesados/{nombre_archivo}")
-    except Exception as e:
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Procesador Principal (MODULAR)
+Orquesta todos los extractores de métricas
+✅ VERSIÓN CON NUTRITION + DELETIONS
+"""
+
+import os
+import json
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from config import INPUT_DIR, ARCHIVO_PREFIX, ARCHIVO_EXTENSION, INGESTA_STREAMING, DIFF_SNAPSHOT_FULL
+from utils.logger import logger
+from core.lector_streaming import iterar_secciones, export_sin_cambios
+from core.tiempo import normalizar, dia
+from core.indice import (
+    SECCIONES_CON_ID, obtener_indice, upsert_nuevos, vivos, compactar, cargar_secciones, marcar_sucias
+)
+from core.manifiesto import orden_export
+from core.snapshot import diferenciar_seccion
+from core.coalescedor import coalescer_deltas
+from core.serie_fc import CLAVE_SERIE_FC, obtener_serie_fc
+
+# Importar extractores modulares (cada uno se registra al importarse)
+from core.extractores.ejercicios import procesar_ejercicios
+from core.extractores.biometricos import (
+    procesar_peso, procesar_grasa_corporal, procesar_masa_muscular,
+    procesar_masa_agua, procesar_masa_osea
+)
+from core.extractores.cardiovascular import (
+    procesar_fc_reposo, procesar_presion_arterial, procesar_vo2max,
+    procesar_frecuencia_cardiaca
+)
+from core.extractores.metabolico import (
+    procesar_glucosa, procesar_tasa_metabolica_basal, procesar_nutrition  # ✅ NUEVO
+)
+from core.extractores.actividad import (
+    procesar_distancia, procesar_calorias_totales
+)
+from core.extractores.pasos_spo2 import (
+    procesar_pasos, procesar_saturacion_oxigeno
+)
+from core.extractores.sueno import procesar_sueno
+
+
+from core.extractores.registro import REGISTRO, SeccionExport, extractores_por_clave
+
+# {clave_export: [extractores]} - cada sección se despacha una sola vez
+CONSUMIDORES = extractores_por_clave()
+
+
+def despachar_seccion(clave, contenido, cache, nombre_archivo, detectados, snapshot=False, campos=None):
+    """
+    Pasa una sección del export a todos los extractores que la consumen.
+    La sección se envuelve una sola vez: los valores derivados (fechas, días)
+    se comparten entre extractores.
+    
+    Los registros nuevos pasan por el store por clave: si ya existían
+    (mismo record_id o mismo contenido) reemplazan al anterior en vez de duplicarse.
+    
+    Args:
+        clave (str): Clave de primer nivel (ej: "heart_rate_records")
+        contenido (dict): Contenido de la sección ({"count": N, "data": [...]})
+        cache (dict): Cache donde agregar los datos
+        nombre_archivo (str): Nombre del archivo (para logs)
+        detectados (set): Campos del cache con datos nuevos (se actualiza)
+        snapshot (bool): La sección viene de un FULL: pasar solo lo que cambió
+            desde el FULL anterior (ver core/snapshot.py)
+        campos (set): Solo los extractores de estos campos del cache (None = todos)
+    """
+    extractores = CONSUMIDORES.get(clave)
+    if extractores and campos is not None:
+        extractores = [ext for ext in extractores if ext.campo in campos]
+    if not extractores or not isinstance(contenido, dict) or "data" not in contenido:
+        return
+    
+    # Sección vacía: no se llama a los extractores (ni se lee su sección en un cache lazy)
+    if not contenido["data"]:
+        return
+    
+    if snapshot:
+        contenido = diferenciar_seccion(clave, contenido, cache, [ext.campo for ext in extractores])
+        if not contenido["data"]:
+            return
+    
+    seccion = SeccionExport(clave, contenido)
+    for ext in extractores:
+        antes = len(cache.get(ext.campo, []))
+        if ext.procesar_seccion(seccion, cache, nombre_archivo):
+            detectados.add(ext.campo)
+        # Columnas de tiempo normalizadas (epoch + día local) en los registros nuevos
+        nuevos = cache.get(ext.campo, [])[antes:]
+        for registro in nuevos:
+            normalizar(registro)
+        if nuevos:
+            marcar_sucias(cache, ext.campo)
+        
+        reemplazados = upsert_nuevos(cache).get(ext.campo, 0)
+        if reemplazados:
+            logger.info(f"  ♻️  {ext.campo}: {reemplazados} registros ya existentes actualizados (sin duplicar)")
+
+
+def _es_full(nombre_archivo):
+    """El archivo es un snapshot FULL y el diff de snapshots está activo"""
+    return DIFF_SNAPSHOT_FULL and "FULL" in nombre_archivo.upper()
+
+
+def _ordenar_campos(detectados):
+    """Campos detectados en el orden de registro de los extractores"""
+    return [ext.campo for ext in REGISTRO if ext.campo in detectados]
+
+
+def _ids_deletions(datos):
+    """record_ids de la sección "deletions" del export (lista vacía si no hay)"""
+    return datos.get("deletions", {}).get("record_ids", [])
+
+
+def procesar_deletions(cache, datos):
+    """
+    ✅ NUEVA FUNCIÓN: Procesa deletions del JSON y borra registros del cache.
+    
+    Busca en datos["deletions"]["record_ids"] y elimina esos registros
+    de TODAS las secciones del cache que tengan record_id.
+    
+    ⚡ Usa el índice record_id -> (sección, slot): cada id es un lookup y el
+    registro queda marcado (tombstone). Las listas se compactan al guardar.
+    
+    Args:
+        cache (dict): Cache de datos
+        datos (dict): Datos del JSON con posible sección "deletions"
+    
+    Returns:
+        int: Cantidad de registros borrados
+    """
+    if "deletions" not in datos:
+        return 0
+    
+    record_ids = _ids_deletions(datos)
+    
+    if not record_ids:
+        return 0
+    
+    logger.info(f"  🗑️  Procesando {len(record_ids)} deletions...")
+    
+    borrados_total = 0
+    
+    # Cache por secciones (lazy): los ids pueden estar en cualquier sección
+    cargar_secciones(cache, SECCIONES_CON_ID)
+    
+    # record_id o session_id (ejercicios y sueño) -> marcar en todas las secciones
+    borrados_por_seccion = obtener_indice(cache).borrar(set(record_ids))
+    
+    for seccion in SECCIONES_CON_ID:
+        borrados = borrados_por_seccion.get(seccion, 0)
+        
+        if borrados > 0:
+            borrados_total += borrados
+            logger.info(f"     • {seccion}: {borrados} registros borrados")
+    
+    if borrados_total > 0:
+        logger.info(f"  ✅ Total borrados del cache: {borrados_total}")
+    else:
+        logger.info(f"  ℹ️  No se encontraron registros para borrar")
+    
+    return borrados_total
+
+
+def obtener_archivos_pendientes(archivos_procesados, duplicados=None):
+    """
+    Obtiene lista de archivos JSON pendientes de procesar.
+    
+    Args:
+        archivos_procesados (Manifiesto): Manifest del cache (obtener_archivos_procesados)
+        duplicados (list): Opcional, se le agregan (archivo, original) de los
+            exports idénticos a uno ya procesado (no se devuelven como pendientes)
+    """
+    try:
+        archivos_nuevos, identicos = archivos_procesados.escanear(INPUT_DIR, ARCHIVO_PREFIX, ARCHIVO_EXTENSION)
+    except Exception as e:
+        logger.error(f"Error listando archivos: {e}")
+        return []
+    
+    if duplicados is not None:
+        duplicados.extend(identicos)
+    
+    logger.info(f"Archivos ya procesados: {len(archivos_procesados)}")
+    logger.info(f"Archivos idénticos a uno procesado: {len(identicos)}")
+    logger.info(f"Archivos nuevos a procesar: {len(archivos_nuevos)}")
+    
+    return archivos_nuevos
+
+
+def es_diff_sin_cambios(nombre_archivo):
+    """DIFF pendiente cuya cabecera dice que no trae cambios (ver export_sin_cambios)"""
+    return "DIFF" in nombre_archivo.upper() and export_sin_cambios(INPUT_DIR / nombre_archivo)
+
+
+def descartar_diffs_sin_cambios():
+    """
+    ⚡ Camino rápido: mueve a procesados/ los DIFF pendientes sin cambios
+    leyendo solo su cabecera, sin cargar el cache.
+    
+    Returns:
+        tuple: (DIFF sin cambios descartados, archivos pendientes que sí traen datos)
+    """
+    try:
+        archivos_json = sorted([
+            f for f in os.listdir(INPUT_DIR)
+            if f.startswith(ARCHIVO_PREFIX) and f.endswith(ARCHIVO_EXTENSION)
+        ], key=orden_export)
+    except Exception as e:
+        logger.error(f"Error listando archivos: {e}")
+        return 0, 0
+    
+    descartados = con_datos = 0
+    for archivo in archivos_json:
+        if es_diff_sin_cambios(archivo):
+            logger.info(f"⏭️  DIFF sin cambios: {archivo}")
+            mover_archivo_procesado(archivo)
+            descartados += 1
+        else:
+            con_datos += 1
+    
+    return descartados, con_datos
+
+
+def procesar_archivo(ruta, cache, streaming=None, deletions=None, campos=None):
+    """
+    Procesa un JSON de HealthConnect y extrae TODAS las métricas.
+    Orquesta todos los extractores modulares.
+    ✅ VERSIÓN CON NUTRITION + DELETIONS
+    
+    Args:
+        ruta (str): Ruta completa al archivo JSON
+        cache (dict): Cache donde agregar los datos
+        streaming (bool): Leer sección por sección (default: INGESTA_STREAMING)
+        deletions (list): Opcional, se le agregan los record_ids que borra el archivo
+        campos (set): Opcional, solo extraer estos campos del cache (reconstrucción parcial)
+    
+    Returns:
+        list: Campos detectados en el archivo, o None si no se pudo leer
+              (el cache queda igual y el archivo no se marca como procesado)
+    """
+    if streaming is None:
+        streaming = INGESTA_STREAMING
+    
+    if streaming:
+        return _procesar_archivo_streaming(ruta, cache, deletions, campos)
+    
+    campos_detectados = []
+    nombre_archivo = os.path.basename(ruta)
+    
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        
+        logger.info(f"Procesando archivo: {nombre_archivo}")
+        logger.info(f"Claves raíz del JSON: {list(datos.keys())}")
+        
+    except Exception as e:
+        logger.error(f"Error leyendo {ruta}: {e}")
+        return None
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # PASO 1: PROCESAR DELETIONS PRIMERO (borrar registros obsoletos)
+    # ═══════════════════════════════════════════════════════════════════════
+    procesar_deletions(cache, datos)
+    if deletions is not None and "deletions" in datos:
+        deletions.extend(_ids_deletions(datos))
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # PASO 2: PROCESAR TODAS LAS MÉTRICAS - Una pasada por las claves del export,
+    # cada sección va a todos los extractores registrados para esa clave
+    # ═══════════════════════════════════════════════════════════════════════
+    detectados = set()
+    snapshot = _es_full(nombre_archivo)
+    for clave, contenido in datos.items():
+        despachar_seccion(clave, contenido, cache, nombre_archivo, detectados, snapshot, campos)
+    
+    campos_detectados = _ordenar_campos(detectados)
+    
+    if not campos_detectados:
+        logger.warning(f"  ⚠️  No se detectaron campos conocidos en {nombre_archivo}")
+    
+    return campos_detectados
+
+
+def _procesar_archivo_streaming(ruta, cache, deletions=None, campos=None):
+    """
+    Variante streaming de procesar_archivo: lee una sección de primer nivel
+    por vez y la pasa directo a los extractores, sin cargar el archivo entero.
+    
+    Se lee dos veces. La primera pasada solo valida el archivo y se queda con
+    las deletions (vienen al final): un archivo cortado o inválido no toca el
+    cache, y las deletions se aplican primero, igual que en modo normal. La
+    segunda despacha las secciones. El pico de memoria sigue siendo la
+    sección más grande.
+    """
+    nombre_archivo = os.path.basename(ruta)
+    claves = []
+    borrados = None
+    
+    try:
+        for clave, valor in iterar_secciones(ruta):
+            claves.append(clave)
+            if clave == "deletions":
+                borrados = {clave: valor}
+    except Exception as e:
+        logger.error(f"Error leyendo {ruta}: {e}")
+        return None
+    
+    logger.info(f"Procesando archivo (streaming): {nombre_archivo}")
+    logger.info(f"Claves raíz del JSON: {claves}")
+    
+    if borrados is not None:
+        procesar_deletions(cache, borrados)
+        if deletions is not None:
+            deletions.extend(_ids_deletions(borrados))
+    
+    detectados = set()
+    snapshot = _es_full(nombre_archivo)
+    for clave, valor in iterar_secciones(ruta):
+        if clave != "deletions":
+            despachar_seccion(clave, valor, cache, nombre_archivo, detectados, snapshot, campos)
+    
+    campos_detectados = _ordenar_campos(detectados)
+    if not campos_detectados:
+        logger.warning(f"  ⚠️  No se detectaron campos conocidos en {nombre_archivo}")
+    
+    return campos_detectados
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INGESTA PARALELA - cada worker extrae un archivo a un delta,
+# el proceso principal aplica los deltas en orden de archivo
+# ═══════════════════════════════════════════════════════════════════════════
+
+def extraer_delta(ruta, streaming=None, campos=None):
+    """
+    Procesa un archivo contra un cache vacío y retorna lo que aporta.
+    Corre en un proceso worker: no toca el cache real.
+    
+    Args:
+        ruta (str): Ruta completa al archivo JSON
+        streaming (bool): Leer sección por sección (default: INGESTA_STREAMING)
+        campos (set): Solo extraer estos campos del cache (None = todos)
+    
+    Returns:
+        dict: {"archivo", "campos", "inserciones": {campo: [registros]}, "deletions": [record_ids],
+               "serie_fc": SerieFC o None}; "campos" es None si el archivo no se pudo leer
+    """
+    from core.cache import inicializar_cache
+    
+    cache = inicializar_cache()
+    deletions = []
+    detectados = procesar_archivo(ruta, cache, streaming, deletions, campos)
+    compactar(cache)
+    
+    return {
+        "archivo": os.path.basename(ruta),
+        "campos": detectados,
+        "inserciones": {
+            campo: registros for campo, registros in cache.items()
+            if campo != "archivos_procesados" and isinstance(registros, list) and registros
+        },
+        "deletions": deletions,
+        "serie_fc": cache.get(CLAVE_SERIE_FC),
+    }
+
+
+def aplicar_delta(cache, delta):
+    """
+    Aplica al cache el delta de un archivo: deletions primero, después inserciones
+    (mismo orden que procesar_archivo).
+    
+    Peso es el único extractor que mira el cache (1 registro por día): los días
+    que ya existen se descartan acá, igual que lo haría el extractor.
+    
+    Returns:
+        list: Campos detectados en el archivo (None si no se pudo leer)
+    """
+    if delta["campos"] is None:
+        return None
+    
+    if delta["deletions"]:
+        procesar_deletions(cache, {"deletions": {"record_ids": delta["deletions"]}})
+    
+    campos = list(delta["campos"])
+    
+    for campo, registros in delta["inserciones"].items():
+        if campo == "peso":
+            dias_existentes = {dia(p) for p in vivos(cache, "peso") if "timestamp" in p}
+            registros = [p for p in registros if dia(p) not in dias_existentes]
+            if not registros and campo in campos:
+                campos.remove(campo)
+        cache.setdefault(campo, []).extend(registros)
+        if registros:
+            marcar_sucias(cache, campo)
+    
+    # Upsert: los registros que ya existían reemplazan al anterior
+    upsert_nuevos(cache)
+    
+    # Buckets de FC: cada registro reemplaza al suyo (los demás del minuto quedan)
+    if delta.get("serie_fc") is not None:
+        obtener_serie_fc(cache).fusionar(delta["serie_fc"])
+    
+    return campos
+
+
+def procesar_archivos_paralelo(rutas, cache, workers, campos=None):
+    """
+    Extrae los archivos en paralelo (ProcessPoolExecutor) y aplica los deltas
+    al cache en el orden de rutas, así la semántica FULL/DIFF y el orden de las
+    deletions quedan idénticos a procesarlos uno por uno.
+    
+    Con el diff de snapshots activo, los FULL dependen del snapshot anterior:
+    se procesan en este proceso, en su turno (y solo extraen lo que cambió).
+    
+    Args:
+        rutas (list): Rutas de los archivos, en orden de procesamiento
+        cache (dict): Cache donde aplicar los deltas
+        workers (int): Cantidad de procesos
+        campos (set): Solo extraer estos campos del cache (None = todos)
+    
+    Yields:
+        list: Campos detectados de cada archivo, en el orden de rutas
+              (el delta ya está aplicado al cache cuando se entrega)
+    """
+    workers = max(1, min(workers, len(rutas)))
+    logger.info(f"⚡ Ingesta paralela: {len(rutas)} archivos con {workers} procesos")
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = [
+            None if _es_full(os.path.basename(ruta)) else executor.submit(extraer_delta, ruta, None, campos)
+            for ruta in rutas
+        ]
+        # Se aplican en el orden de entrada, a medida que cada resultado está listo
+        for ruta, futuro in zip(rutas, futuros):
+            if futuro is None:
+                yield procesar_archivo(ruta, cache, campos=campos)
+            else:
+                yield aplicar_delta(cache, futuro.result())
+
+
+def procesar_archivos_coalescidos(rutas, cache, workers=1, campos=None):
+    """
+    Procesa los archivos combinando cada racha de DIFF consecutivos en un solo
+    delta, o uno por tramo si hay deletions en el medio (ver core/coalescedor.py).
+    Los FULL se procesan en su turno, uno por uno.
+    
+    Args:
+        rutas (list): Rutas de los archivos, en orden de procesamiento
+        cache (dict): Cache donde aplicar los deltas
+        workers (int): Procesos para extraer los DIFF de cada racha
+        campos (set): Solo extraer estos campos del cache (None = todos)
+    
+    Yields:
+        list: Campos detectados de cada archivo, en el orden de rutas
+              (los deltas de la racha ya están aplicados cuando se entregan sus archivos)
+    """
+    racha = []
+    for ruta in rutas + [None]:
+        if ruta is not None and "FULL" not in os.path.basename(ruta).upper():
+            racha.append(ruta)
+            continue
+        
+        if len(racha) == 1:
+            yield procesar_archivo(racha[0], cache, campos=campos)
+        elif racha:
+            yield from _aplicar_racha(racha, cache, workers, campos)
+        racha = []
+        
+        if ruta is not None:
+            yield procesar_archivo(ruta, cache, campos=campos)
+
+
+def _aplicar_racha(rutas, cache, workers, campos=None):
+    """Extrae los DIFF de una racha, los combina y aplica cada tramo una sola vez"""
+    workers = max(1, min(workers, len(rutas)))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            deltas = list(executor.map(extraer_delta, rutas, [None] * len(rutas), [campos] * len(rutas)))
+    else:
+        deltas = [extraer_delta(ruta, None, campos) for ruta in rutas]
+    
+    # Los que no se pudieron leer quedan afuera (no se marcan como procesados)
+    leidos = [delta for delta in deltas if delta["campos"] is not None]
+    for combinado in coalescer_deltas(leidos):
+        aplicar_delta(cache, combinado)
+    
+    for delta in deltas:
+        yield delta["campos"]
+
+
+def mover_archivo_procesado(nombre_archivo):
+    """Mueve archivo JSON procesado a subcarpeta 'procesados'"""
+    try:
+        carpeta_procesados = INPUT_DIR / "procesados"
+        carpeta_procesados.mkdir(exist_ok=True)
+        
+        origen = INPUT_DIR / nombre_archivo
+        destino = carpeta_procesados / nombre_archivo
+        
+        if origen.exists():
+            origen.rename(destino)
+            logger.info(f"  ✓ Archivo movido a: procesados/{nombre_archivo}")
+    except Exception as e:
         logger.warning(f"  No se pudo mover {nombre_archivo}: {e}")
\ No newline at end of file
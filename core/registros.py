@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registros compactos del cache (__slots__ con interfaz de dict)
+
+Un dict por registro pesa ~400-700 bytes solo en su tabla de claves, y
+cada registro cargado del JSON trae sus propias copias de strings que se
+repiten miles de veces ("com.sec.android.app.shealth") o que duplican a
+otro campo (fecha == timestamp / start_time, session_id == record_id).
+
+Al cargar una sección, cada registro pasa a una clase con __slots__ (una
+por esquema = tupla de claves en su orden, creada la primera vez):
+
+- Los valores quedan en slots (8 bytes por campo, sin tabla de hash)
+- fuente, tipo, zona, etc. se internan: una sola copia por valor distinto
+- Los strings, ints y floats iguales de la sección se comparten: fecha es el mismo
+  objeto que timestamp / start_time, session_id el mismo que record_id,
+  dia_local uno por día (sin perder nada: si difieren quedan los dos)
+
+La interfaz es la de un dict (registro["x"], .get, in, items, ==, repr
+idéntico), así los consumidores no cambian. Las claves que no están en
+el esquema (agregadas después de cargar) van a un dict aparte. Al
+guardar se serializan como dict (a_json para json.dumps; el codec
+binario los recorre igual que a un dict).
+
+Los registros nuevos que crean los extractores siguen siendo dicts hasta
+la próxima carga del cache.
+"""
+
+import sys
+import keyword
+from operator import attrgetter
+
+# Campos con pocos valores distintos que se repiten en toda la sección
+CAMPOS_INTERNADOS = ("fuente", "tipo", "zona", "metodo", "meal_type", "relacion_comida")
+
+_FALTA = object()
+
+
+class Registro:
+    """Base de los registros compactos: interfaz de dict sobre __slots__"""
+
+    __slots__ = ("_extra",)
+    _campos = frozenset()
+    _orden = ()
+    _valores = staticmethod(lambda registro: ())
+
+    # ─── Lectura ──────────────────────────────────────────────────────────
+
+    def __getitem__(self, clave):
+        if clave in self._campos:
+            valor = getattr(self, clave, _FALTA)
+            if valor is not _FALTA:
+                return valor
+        elif self._extra is not None and clave in self._extra:
+            return self._extra[clave]
+        raise KeyError(clave)
+
+    def get(self, clave, defecto=None):
+        if clave in self._campos:
+            return getattr(self, clave, defecto)
+        if self._extra is None:
+            return defecto
+        return self._extra.get(clave, defecto)
+
+    def __contains__(self, clave):
+        if clave in self._campos:
+            return hasattr(self, clave)
+        return self._extra is not None and clave in self._extra
+
+    def items(self):
+        try:
+            # Camino rápido (C): todos los slots con valor
+            items = list(zip(self._orden, self._valores(self)))
+        except AttributeError:
+            items = [(k, v) for k in self._orden if (v := getattr(self, k, _FALTA)) is not _FALTA]
+        if self._extra:
+            items.extend(self._extra.items())
+        return items
+
+    def keys(self):
+        return [k for k, _ in self.items()]
+
+    def values(self):
+        return [v for _, v in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.items())
+
+    def a_dict(self):
+        if self._extra is None:
+            try:
+                return dict(zip(self._orden, self._valores(self)))
+            except AttributeError:
+                pass
+        return dict(self.items())
+
+    copy = a_dict
+
+    def __eq__(self, otro):
+        if isinstance(otro, Registro):
+            otro = otro.a_dict()
+        if not isinstance(otro, dict):
+            return NotImplemented
+        return self.a_dict() == otro
+
+    __hash__ = None
+
+    def __repr__(self):
+        # Igual que el repr del dict (lo usan las huellas del journal y del snapshot)
+        return repr(self.a_dict())
+
+    def __reduce__(self):
+        # copy / pickle devuelven un dict (las clases por esquema son dinámicas)
+        return dict, (self.a_dict(),)
+
+    # ─── Escritura ────────────────────────────────────────────────────────
+
+    def __setitem__(self, clave, valor):
+        if clave in self._campos:
+            setattr(self, clave, valor)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[clave] = valor
+
+    def __delitem__(self, clave):
+        if clave in self._campos and hasattr(self, clave):
+            delattr(self, clave)
+        elif self._extra is not None and clave in self._extra:
+            del self._extra[clave]
+        else:
+            raise KeyError(clave)
+
+    def pop(self, clave, *defecto):
+        try:
+            valor = self[clave]
+        except KeyError:
+            if defecto:
+                return defecto[0]
+            raise
+        del self[clave]
+        return valor
+
+    def setdefault(self, clave, defecto=None):
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            self[clave] = valor = defecto
+        return valor
+
+    def update(self, *args, **kwargs):
+        for clave, valor in dict(*args, **kwargs).items():
+            self[clave] = valor
+
+
+_RESERVADOS = frozenset(dir(Registro)) | {"self"}
+_CLASES = {}
+
+
+def _clase(claves):
+    """Clase con __slots__ para un esquema (None si está vacío o alguna clave no sirve de slot)"""
+    clase = _CLASES.get(claves, _FALTA)
+    if clase is _FALTA:
+        if claves and all(k.isidentifier() and not keyword.iskeyword(k) and not k.startswith("_")
+               and k not in _RESERVADOS for k in claves) and len(set(claves)) == len(claves):
+            # __init__ generado: un argumento por campo, en el orden del esquema
+            lineas = [f"def __init__(self, {', '.join(claves)}):"]
+            for k in claves:
+                if k in CAMPOS_INTERNADOS:
+                    lineas.append(f"    self.{k} = _intern({k}) if _type({k}) is _str else {k}")
+                else:
+                    lineas.append(f"    self.{k} = {k}")
+            lineas.append("    self._extra = None")
+            espacio = {}
+            exec("\n".join(lineas), {"_intern": sys.intern, "_type": type, "_str": str}, espacio)
+            clase = type("Registro", (Registro,), {
+                "__slots__": claves,
+                "__init__": espacio["__init__"],
+                "_campos": frozenset(claves),
+                "_orden": claves,
+                # attrgetter devuelve un valor suelto (no una tupla) si hay una sola clave
+                "_valores": attrgetter(*claves) if len(claves) > 1 else
+                            staticmethod(lambda registro, k=claves[0]: (getattr(registro, k),)),
+            })
+        else:
+            clase = None
+        _CLASES[claves] = clase
+    return clase
+
+
+def compactar_seccion(registros):
+    """
+    Reemplaza en la lista los dicts por registros compactos.
+
+    Los strings, ints y floats iguales de la sección quedan como un solo
+    objeto (fecha == timestamp, session_id == record_id, dia_local, ...).
+
+    Returns:
+        int: Registros compactados
+    """
+    textos = {}
+    enteros = {}
+    reales = {}
+    compactados = 0
+    for i, registro in enumerate(registros):
+        if type(registro) is not dict:
+            continue
+        clase = _clase(tuple(registro))
+        if clase is None:
+            continue
+        registros[i] = clase(*[
+            textos.setdefault(v, v) if t is str else
+            enteros.setdefault(v, v) if t is int else
+            # 0.0 y -0.0 son iguales como clave: los ceros no se comparten
+            reales.setdefault(v, v) if t is float and v else v
+            for v, t in zip(registro.values(), map(type, registro.values()))
+        ])
+        compactados += 1
+    return compactados
+
+
+def a_json(valor):
+    """default= de json.dumps: los registros compactos se guardan como dict"""
+    if isinstance(valor, Registro):
+        return valor.a_dict()
+    raise TypeError(f"Object of type {type(valor).__name__} is not JSON serializable")
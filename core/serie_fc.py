@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serie compacta de frecuencia cardíaca (buckets por minuto)
+heart_rate_records es el stream de mayor volumen. En vez de un dict por
+muestra (fc_reposo) y un dict por día (frecuencia_cardiaca), cada registro
+del export es un bucket min/max/suma/cantidad, por día, minuto y fuente, en
+buffers de array:
+
+    minutos  array('H')  minuto del día local (0-1439)
+    inicio   array('H')  milisegundo de start_time dentro del minuto
+    fuentes  array('H')  índice en la lista de fuentes (strings internados)
+    bpm_min  array('B')
+    bpm_max  array('B')
+    conteo   array('H')  registros del export con ese mismo start_time
+    suma     array('f')  suma de avg_bpm (promedio = suma / conteo)
+
+Un bucket pesa 14 bytes (contra ~200 de un dict en el JSON). La serie se
+guarda en binario en CACHE_FC, aparte del JSON del cache.
+
+Upsert: (minuto, inicio, fuente) es la identidad del registro (start_time +
+source), así un registro que vuelve a llegar (los DIFF re-envían la hora en
+curso, un FULL re-envía todo) reemplaza solo su propio bucket y los otros
+registros del mismo minuto se conservan. Las vistas juntan los buckets de
+cada minuto.
+
+fc_reposo, frecuencia_cardiaca y el gráfico intradía son vistas: se
+arman al pedirlas (vista_fc_reposo, vista_frecuencia_cardiaca, intradia).
+
+Caches anteriores: las muestras de fc_reposo se migran a buckets con
+conteo 0 (cuentan para FC reposo, no para las estadísticas del día) y
+los resúmenes diarios de frecuencia_cardiaca se conservan como están
+para los días que la serie no cubre.
+"""
+
+import sys
+import struct
+from array import array
+from datetime import date
+from config import CACHE_FC
+from utils.logger import logger
+from core import tiempo
+
+CLAVE_SERIE_FC = "_serie_fc"
+
+# Secciones del cache que ahora son vistas de la serie
+CAMPOS_FC = ("fc_reposo", "frecuencia_cardiaca")
+
+# Horario nocturno de FC reposo: 22:00 - 06:00
+NOCHE_DESDE = 22 * 60
+NOCHE_HASTA = 6 * 60
+
+MAGIA = b"FCM2"
+MAGIA_V1 = b"FCM1"  # Sin "inicio" y con fuentes de 1 byte (se lee igual)
+
+# Columnas de cada día: (nombre, typecode)
+COLUMNAS = (
+    ("minutos", "H"),
+    ("inicio", "H"),
+    ("fuentes", "H"),
+    ("bpm_min", "B"),
+    ("bpm_max", "B"),
+    ("conteo", "H"),
+    ("suma", "f"),
+)
+COLUMNAS_V1 = tuple(
+    (nombre, "B" if nombre == "fuentes" else tipo) for nombre, tipo in COLUMNAS if nombre != "inicio"
+)
+
+# Fuentes distintas que entran en array('H') (y en la cabecera del binario)
+MAX_FUENTES = 0xFFFF
+
+
+def _bpm(valor):
+    """bpm a entero de 1 byte"""
+    return min(255, max(0, int(round(valor))))
+
+
+def es_nocturno(minuto):
+    """Minuto del día dentro del horario nocturno de FC reposo"""
+    return minuto >= NOCHE_DESDE or minuto < NOCHE_HASTA
+
+
+class DiaFC:
+    """Buckets de un día, ordenados por (minuto, fuente, inicio)"""
+
+    __slots__ = tuple(nombre for nombre, _ in COLUMNAS)
+
+    def __init__(self):
+        for nombre, tipo in COLUMNAS:
+            setattr(self, nombre, array(tipo))
+
+    def __len__(self):
+        return len(self.minutos)
+
+    def __eq__(self, otro):
+        return all(getattr(self, n) == getattr(otro, n) for n, _ in COLUMNAS)
+
+    def buckets(self):
+        """{(minuto, fuente, inicio): (min, max, suma, conteo)}"""
+        return {
+            (m, f, i): (bmin, bmax, s, c)
+            for m, i, f, bmin, bmax, s, c in zip(
+                self.minutos, self.inicio, self.fuentes, self.bpm_min, self.bpm_max, self.suma, self.conteo
+            )
+        }
+
+    @classmethod
+    def desde_buckets(cls, buckets):
+        bloque = cls()
+        for (m, f, i), (bmin, bmax, s, c) in sorted(buckets.items()):
+            bloque.minutos.append(m)
+            bloque.inicio.append(i)
+            bloque.fuentes.append(f)
+            bloque.bpm_min.append(bmin)
+            bloque.bpm_max.append(bmax)
+            bloque.suma.append(s)
+            bloque.conteo.append(c)
+        return bloque
+
+
+class SerieFC:
+    """Serie de FC por minuto: {dia_local: DiaFC} + fuentes internadas"""
+
+    def __init__(self):
+        self.fuentes = []
+        self._indice_fuentes = {}
+        self.dias = {}
+
+    def __len__(self):
+        return sum(len(bloque) for bloque in self.dias.values())
+
+    def __eq__(self, otra):
+        if not isinstance(otra, SerieFC):
+            return NotImplemented
+        if set(self.dias) != set(otra.dias):
+            return False
+        for d, bloque in self.dias.items():
+            otro = otra.dias[d]
+            if [self.fuentes[f] for f in bloque.fuentes] != [otra.fuentes[f] for f in otro.fuentes]:
+                return False
+            if bloque.minutos != otro.minutos or bloque.inicio != otro.inicio or bloque.bpm_min != otro.bpm_min or \
+                    bloque.bpm_max != otro.bpm_max or bloque.conteo != otro.conteo or bloque.suma != otro.suma:
+                return False
+        return True
+
+    def indice_fuente(self, fuente):
+        """Índice de la fuente (se agrega la primera vez que aparece)"""
+        indice = self._indice_fuentes.get(fuente)
+        if indice is None:
+            indice = len(self.fuentes)
+            if indice >= MAX_FUENTES:
+                raise ValueError(f"Serie FC: más de {MAX_FUENTES} fuentes")
+            self.fuentes.append(sys.intern(fuente))
+            self._indice_fuentes[fuente] = indice
+        return indice
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Escritura
+    # ─────────────────────────────────────────────────────────────────────
+
+    def upsert(self, buckets):
+        """
+        Reemplaza (o agrega) buckets: un registro que vuelve a llegar pisa
+        el suyo, los demás del mismo minuto y fuente quedan.
+
+        Args:
+            buckets (dict): {(dia, minuto, fuente, inicio): (min, max, suma, conteo)}
+                            con fuente como string
+
+        Returns:
+            int: Buckets escritos
+        """
+        por_dia = {}
+        for (d, m, fuente, i), valores in buckets.items():
+            por_dia.setdefault(d, {})[(m, self.indice_fuente(fuente), i)] = valores
+
+        for d, nuevos in por_dia.items():
+            bloque = self.dias.get(d)
+            if bloque is not None:
+                actuales = bloque.buckets()
+                actuales.update(nuevos)
+                nuevos = actuales
+            self.dias[d] = DiaFC.desde_buckets(nuevos)
+
+        return len(buckets)
+
+    def fusionar(self, otra):
+        """Upsert de todos los buckets de otra serie (la otra gana en cada registro)"""
+        buckets = {}
+        for d, bloque in otra.dias.items():
+            for (m, f, i), valores in bloque.buckets().items():
+                buckets[(d, m, otra.fuentes[f], i)] = valores
+        return self.upsert(buckets)
+
+    def borrar_dias(self, dias):
+        """Elimina los buckets de esos días. Retorna cuántos."""
+        borrados = 0
+        for d in dias:
+            bloque = self.dias.pop(d, None)
+            if bloque is not None:
+                borrados += len(bloque)
+        return borrados
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Vistas
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _registro(self, d, minuto, fuente):
+        hora, minutos = divmod(minuto, 60)
+        fecha = f"{tiempo.dia_iso(d)}T{hora:02d}:{minutos:02d}:00"
+        return {
+            "timestamp": fecha,
+            "fecha": fecha,
+            "fuente": self.fuentes[fuente],
+            tiempo.CAMPO_EPOCH: float((d - tiempo.EPOCH.toordinal()) * 86400 + minuto * 60),
+            tiempo.CAMPO_DIA: d,
+        }
+
+    def fc_reposo(self, desde=None):
+        """
+        Vista fc_reposo: un registro por minuto nocturno y fuente, bpm = mínimo del minuto.
+        desde: ordinal del primer día a incluir (None = toda la historia)
+        """
+        registros = []
+        for d in sorted(self.dias):
+            if desde is not None and d < desde:
+                continue
+            bloque = self.dias[d]
+            anterior = None
+            for m, f, bmin in zip(bloque.minutos, bloque.fuentes, bloque.bpm_min):
+                if not es_nocturno(m):
+                    continue
+                # Varios registros en el mismo minuto y fuente: quedan juntos (orden del bloque)
+                if anterior is not None and (m, f) == anterior:
+                    registros[-1]["bpm"] = min(registros[-1]["bpm"], bmin)
+                    continue
+                registro = self._registro(d, m, f)
+                registro["bpm"] = bmin
+                registros.append(registro)
+                anterior = (m, f)
+        return registros
+
+    def resumen_dias(self, desde=None):
+        """Vista frecuencia_cardiaca: un registro por día con min / max / promedio"""
+        registros = []
+        for d in sorted(self.dias):
+            if desde is not None and d < desde:
+                continue
+            bloque = self.dias[d]
+            primero = None
+            bpm_min, bpm_max, suma, conteo = 999, 0, 0.0, 0
+            for i, c in enumerate(bloque.conteo):
+                if not c:
+                    continue
+                if primero is None:
+                    primero = i
+                bpm_min = min(bpm_min, bloque.bpm_min[i])
+                bpm_max = max(bpm_max, bloque.bpm_max[i])
+                suma += bloque.suma[i]
+                conteo += c
+            if primero is None:
+                continue
+            registro = self._registro(d, bloque.minutos[primero], bloque.fuentes[primero])
+            registro.update({"bpm_min": bpm_min, "bpm_max": bpm_max, "bpm_promedio": suma / conteo})
+            registros.append(registro)
+        return registros
+
+    def ultimo_dia(self):
+        """Último día local con FC continua (None si no hay)"""
+        dias = [d for d, bloque in self.dias.items() if any(bloque.conteo)]
+        return max(dias) if dias else None
+
+    def intradia(self, d):
+        """
+        Serie por minuto de un día (todas las fuentes juntas).
+
+        Returns:
+            dict: {"minutos": [...], "bpm_min": [...], "bpm_max": [...], "bpm_promedio": [...]}
+        """
+        por_minuto = {}
+        bloque = self.dias.get(d)
+        if bloque is not None:
+            for m, bmin, bmax, s, c in zip(bloque.minutos, bloque.bpm_min, bloque.bpm_max, bloque.suma, bloque.conteo):
+                if not c:
+                    continue
+                actual = por_minuto.get(m)
+                if actual is None:
+                    por_minuto[m] = [bmin, bmax, s, c]
+                else:
+                    actual[0] = min(actual[0], bmin)
+                    actual[1] = max(actual[1], bmax)
+                    actual[2] += s
+                    actual[3] += c
+        minutos = sorted(por_minuto)
+        return {
+            "minutos": minutos,
+            "bpm_min": [por_minuto[m][0] for m in minutos],
+            "bpm_max": [por_minuto[m][1] for m in minutos],
+            "bpm_promedio": [por_minuto[m][2] / por_minuto[m][3] for m in minutos],
+        }
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Binario
+    # ─────────────────────────────────────────────────────────────────────
+
+    def a_bytes(self, dias=None):
+        """Serie en binario (solo esos días si se pasan, ej: para el journal del cache)"""
+        dias = sorted(self.dias) if dias is None else sorted(d for d in dias if d in self.dias)
+        partes = [MAGIA, struct.pack("<H", len(self.fuentes))]
+        for fuente in self.fuentes:
+            texto = fuente.encode("utf-8")
+            partes.append(struct.pack("<H", len(texto)))
+            partes.append(texto)
+
+        partes.append(struct.pack("<I", len(dias)))
+        for d in dias:
+            bloque = self.dias[d]
+            partes.append(struct.pack("<iI", d, len(bloque)))
+            for nombre, _ in COLUMNAS:
+                columna = getattr(bloque, nombre)
+                if sys.byteorder == "big":
+                    columna = array(columna.typecode, columna)
+                    columna.byteswap()
+                partes.append(columna.tobytes())
+        return b"".join(partes)
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        if datos[:4] == MAGIA:
+            columnas = COLUMNAS
+        elif datos[:4] == MAGIA_V1:
+            columnas = COLUMNAS_V1
+        else:
+            raise ValueError("Archivo de serie FC inválido")
+        serie = cls()
+        pos = 4
+        (n_fuentes,) = struct.unpack_from("<H", datos, pos)
+        pos += 2
+        for _ in range(n_fuentes):
+            (largo,) = struct.unpack_from("<H", datos, pos)
+            pos += 2
+            serie.indice_fuente(datos[pos:pos + largo].decode("utf-8"))
+            pos += largo
+
+        (n_dias,) = struct.unpack_from("<I", datos, pos)
+        pos += 4
+        for _ in range(n_dias):
+            d, n = struct.unpack_from("<iI", datos, pos)
+            pos += 8
+            bloque = DiaFC()
+            for nombre, tipo in columnas:
+                columna = array(tipo)
+                tam = columna.itemsize * n
+                columna.frombytes(datos[pos:pos + tam])
+                if sys.byteorder == "big":
+                    columna.byteswap()
+                setattr(bloque, nombre, columna)
+                pos += tam
+            if columnas is COLUMNAS_V1:
+                # Un bucket por minuto y fuente: queda como un registro que empieza en el segundo 0
+                bloque.fuentes = array("H", bloque.fuentes)
+                bloque.inicio = array("H", bytes(2 * n))
+            serie.dias[d] = bloque
+        return serie
+
+
+def buckets_de_registros(registros, fechas):
+    """
+    Agrupa registros crudos de heart_rate por (día, minuto, fuente, inicio):
+    un bucket por registro (start_time + source).
+
+    Args:
+        registros (list): Registros del export (avg_bpm / min_bpm / max_bpm)
+        fechas (list): datetime de start_time de cada registro (None si no parsea)
+
+    Returns:
+        dict: {(dia, minuto, fuente, inicio): (min, max, suma, conteo)}
+    """
+    buckets = {}
+    for registro, fecha in zip(registros, fechas):
+        if fecha is None:
+            logger.warning(f"Error procesando FC: start_time inválido: {registro.get('start_time')!r}")
+            continue
+        avg = registro.get("avg_bpm", registro.get("bpm", 0)) or 0
+        bmin = _bpm(registro.get("min_bpm", avg) or 0)
+        bmax = _bpm(registro.get("max_bpm", avg) or 0)
+        clave = (
+            fecha.toordinal(), fecha.hour * 60 + fecha.minute, registro.get("source", "Desconocido"),
+            fecha.second * 1000 + fecha.microsecond // 1000,
+        )
+
+        actual = buckets.get(clave)
+        if actual is None:
+            buckets[clave] = (bmin, bmax, float(avg), 1)
+        else:
+            buckets[clave] = (min(actual[0], bmin), max(actual[1], bmax), actual[2] + avg, actual[3] + 1)
+    return buckets
+
+
+def obtener_serie_fc(cache):
+    """Serie FC del cache (se crea la primera vez, migrando fc_reposo de caches anteriores)"""
+    serie = cache.get(CLAVE_SERIE_FC)
+    if serie is None:
+        serie = SerieFC()
+        cache[CLAVE_SERIE_FC] = serie
+        _migrar_fc_reposo(cache, serie)
+    return serie
+
+
+def _migrar_fc_reposo(cache, serie):
+    """Muestras de fc_reposo (dict por muestra) -> buckets con conteo 0"""
+    anteriores = cache.pop("fc_reposo", None)
+    if not anteriores:
+        return
+
+    buckets = {}
+    for registro in anteriores:
+        e = tiempo.epoch(registro)
+        if e is None or registro.get("bpm") is None:
+            continue
+        d = tiempo.dia(registro)
+        minuto = int(e // 60 % 1440)
+        clave = (d, minuto, registro.get("fuente", "Desconocido"), 0)
+        bpm = _bpm(registro["bpm"])
+        previo = buckets.get(clave)
+        buckets[clave] = (bpm if previo is None else min(previo[0], bpm), bpm, 0.0, 0)
+    serie.upsert(buckets)
+    logger.info(f"💓 fc_reposo migrado a serie compacta: {len(anteriores)} registros -> {len(buckets)} buckets")
+
+
+def _desde(dias):
+    """Ordinal del primer día de una ventana de `dias` días hasta hoy (None = todo)"""
+    return None if dias is None else date.today().toordinal() - dias
+
+
+def vista_fc_reposo(cache, dias=None):
+    """
+    Registros de FC reposo (misma forma que la sección fc_reposo anterior),
+    en orden de tiempo (SerieOrdenada).
+    dias: solo los últimos N días (los gráficos no necesitan toda la historia)
+    """
+    return tiempo.ordenados(obtener_serie_fc(cache).fc_reposo(_desde(dias)))
+
+
+def vista_frecuencia_cardiaca(cache, dias=None):
+    """
+    Un registro por día de FC continua, en orden de tiempo (SerieOrdenada).
+    Los resúmenes diarios de caches anteriores se usan para los días que la
+    serie no cubre.
+    """
+    desde = _desde(dias)
+    registros = obtener_serie_fc(cache).resumen_dias(desde)
+    cubiertos = {r[tiempo.CAMPO_DIA] for r in registros}
+    anteriores = [
+        r for r in cache.get("frecuencia_cardiaca", [])
+        if tiempo.dia(r) not in cubiertos and (desde is None or (tiempo.dia(r) or 0) >= desde)
+    ]
+    return tiempo.ordenados(anteriores + registros)
+
+
+def guardar_serie_fc(cache, ruta=CACHE_FC):
+    """Escribe la serie en binario"""
+    serie = obtener_serie_fc(cache)
+    ruta.write_bytes(serie.a_bytes())
+    logger.info(f"Serie FC guardada: {ruta} ({len(serie)} buckets)")
+
+
+def cargar_serie_fc(cache, ruta=CACHE_FC):
+    """Lee la serie binaria (si existe) y la deja en el cache"""
+    if ruta.exists():
+        try:
+            cache[CLAVE_SERIE_FC] = SerieFC.desde_bytes(ruta.read_bytes())
+        except (ValueError, struct.error) as e:
+            logger.warning(f"Serie FC ilegible ({e}), se empieza vacía")
+    return obtener_serie_fc(cache)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diff de snapshots FULL
+Un AUTO_FULL trae toda la historia de cada sección, pero casi todo ya está
+en el cache. Se guarda, por sección del export, un digest de cada registro
+agrupado por día:
+
+    cache["snapshot_full"][clave] = {"YYYY-MM-DD": {crc32(identidad): crc32(registro)}}
+
+Al llegar el próximo FULL se comparan los digests y a los extractores solo
+llegan los registros de los días que cambiaron (altas, modificaciones o
+registros que desaparecieron). Esos días se re-procesan: se marcan como
+borrados los registros del cache de ese día cuya identidad conocía alguno
+de los dos snapshots y se vuelven a extraer del FULL (los que desaparecieron
+no vuelven; así también se corrigen los agregados por día: pasos, distancia,
+calorías). Los que ningún snapshot conoce (ej: de un DIFF posterior al FULL)
+se conservan. La serie FC y los registros sin identidad (peso, un promedio
+por día sin fuente) se reemplazan por día completo.
+
+Cobertura: un FULL trae una ventana (ej: los últimos 30 días) y cada sección
+se corta en FULL_MAX_REGISTROS por el lado de los más nuevos (ej: pasos hasta
+el 21/09 en un FULL del 18/10). Solo se consideran los días entre el primero
+y el último que trae la sección. Los dos extremos son parciales: de esos días
+se re-envían solo los registros nuevos o modificados (reemplazan a los del
+cache con la misma identidad) y no se borra nada. Con la sección en el tope,
+los días del snapshot anterior posteriores al último quedan sin cubrir y se
+conservan en el snapshot nuevo.
+
+FULL parciales: hay exports FULL que traen solo una parte de una sección
+(ej: 6 ejercicios en vez de 150). Si la sección trae menos de
+UMBRAL_FULL_PARCIAL de los registros del snapshot anterior no se borra nada:
+los registros nuevos o modificados se envían igual a los extractores
+(upsert) y se conserva el snapshot anterior.
+"""
+
+import zlib
+from datetime import date, datetime
+from config import FULL_MAX_REGISTROS
+from utils.logger import logger
+from core.indice import obtener_indice, cargar_secciones, marcar_sucias
+from core.serie_fc import CAMPOS_FC, obtener_serie_fc
+
+CLAVE_SNAPSHOT = "snapshot_full"
+UMBRAL_FULL_PARCIAL = 0.5
+
+
+def _hash(texto):
+    """CRC32 del texto: estable entre ejecuciones y barato (solo compara un registro consigo mismo)"""
+    return zlib.crc32(texto.encode("utf-8"))
+
+
+def _dia_registro(registro):
+    """
+    Día local "YYYY-MM-DD" del registro crudo del export ("" si no tiene fecha válida).
+    Es la fecha de reloj del ISO (igual que core.tiempo), o sea sus primeros 10 caracteres.
+    """
+    texto = registro.get("start_time") or registro.get("timestamp")
+    if isinstance(texto, str) and len(texto) >= 10 and texto[4] == "-" and texto[7] == "-":
+        return texto[:10]
+    return ""
+
+
+def _identidad_fecha(fecha, fuente):
+    """
+    fecha + fuente, con la fecha como instante UTC en ms: un DIFF trae el
+    mismo registro en Z ("10:31:48Z") y el FULL con el offset local
+    ("07:31:48-03:00").
+    """
+    if isinstance(fecha, str):
+        try:
+            dt = datetime.fromisoformat(fecha.replace("Z", "+00:00"))
+        except ValueError:
+            dt = None
+        if dt is not None and dt.tzinfo is not None:
+            fecha = round(dt.timestamp() * 1000)
+    return f"{fecha}|{fuente}"
+
+
+def _identidad(registro):
+    """Identidad estable del registro crudo: session_id/record_id o fecha + fuente"""
+    rid = registro.get("session_id") or registro.get("record_id") or registro.get("id")
+    if rid is not None:
+        return str(rid)
+    return _identidad_fecha(registro.get("start_time") or registro.get("timestamp"), registro.get("source"))
+
+
+def _identidades_cache(registro):
+    """
+    Hashes de identidad (los del snapshot) del registro crudo del que salió
+    un registro del cache: session_id / record_id o fecha + fuente. None si
+    no se puede saber (ej: peso, un promedio por día sin fuente).
+    """
+    rid = registro.get("session_id") or registro.get("record_id")
+    if rid is not None:
+        return (str(_hash(str(rid))),)
+    fuente = registro.get("fuente")
+    if fuente is None:
+        return None
+    fecha = registro.get("start_time") or registro.get("timestamp") or registro.get("fecha")
+    identidades = [_identidad_fecha(fecha, fuente)]
+    if fuente == "Desconocido":
+        # Los extractores ponen "Desconocido" cuando el export no trae source
+        identidades.append(_identidad_fecha(fecha, None))
+    return tuple(str(_hash(i)) for i in identidades)
+
+
+def _conocido(registro, conocidas):
+    """El registro viene de una identidad del snapshot (o no tiene identidad)"""
+    identidades = _identidades_cache(registro)
+    return identidades is None or not conocidas.isdisjoint(identidades)
+
+
+def digests_seccion(data):
+    """
+    Calcula los digests de los registros crudos de una sección.
+
+    Returns:
+        tuple: ({dia: {identidad: digest}}, [(dia, identidad) de cada registro])
+    """
+    por_dia = {}
+    dias = []
+    vistos = {}
+
+    for registro in data:
+        identidad = _identidad(registro)
+        repetidos = vistos.get(identidad, 0)
+        vistos[identidad] = repetidos + 1
+        if repetidos:
+            identidad = f"{identidad}#{repetidos}"
+
+        dia = _dia_registro(registro)
+        # repr del dict: mismo orden de claves que el JSON, mucho más rápido que json.dumps
+        digest = _hash(repr(registro))
+        # Claves como string: el snapshot se guarda en el JSON del cache
+        identidad = str(_hash(identidad))
+        por_dia.setdefault(dia, {})[identidad] = digest
+        dias.append((dia, identidad))
+
+    return por_dia, dias
+
+
+def diferenciar_seccion(clave, contenido, cache, campos):
+    """
+    Compara una sección de un FULL contra el snapshot anterior y deja solo lo que cambió.
+
+    Args:
+        clave (str): Clave de la sección del export (ej: "weight_records")
+        contenido (dict): {"count": N, "data": [...]}
+        cache (dict): Cache (guarda el snapshot nuevo y marca los días re-procesados)
+        campos (list): Secciones del cache que alimenta esta clave
+
+    Returns:
+        dict: Contenido con solo los registros de los días que cambiaron
+    """
+    data = contenido.get("data", [])
+    nuevo, dias_registros = digests_seccion(data)
+
+    dias_validos = sorted(d for d in nuevo if d)
+    if not dias_validos:
+        # Sección vacía o sin fechas: no hay cobertura, se conserva el snapshot anterior
+        return contenido
+
+    snapshots = cache.setdefault(CLAVE_SNAPSHOT, {})
+    anterior = snapshots.get(clave)
+
+    if anterior is None:
+        snapshots[clave] = nuevo
+        marcar_sucias(cache, CLAVE_SNAPSHOT)
+        logger.info(f"  🔍 Snapshot {clave}: sin snapshot previo, se procesan {len(data)} registros")
+        return contenido
+
+    primero, ultimo = dias_validos[0], dias_validos[-1]
+    truncado = max(contenido.get("count", 0), len(data)) >= FULL_MAX_REGISTROS
+    parcial = len(data) < UMBRAL_FULL_PARCIAL * sum(len(ids) for ids in anterior.values())
+    if parcial:
+        logger.warning(f"  ⚠️  Snapshot {clave}: FULL parcial ({len(data)} registros), no se aplican borrados implícitos")
+    else:
+        if truncado:
+            # Cortado en el tope: lo posterior al último día no lo cubre este FULL
+            nuevo = {**nuevo, **{d: ids for d, ids in anterior.items() if d > ultimo}}
+        if anterior != nuevo:
+            snapshots[clave] = nuevo
+            marcar_sucias(cache, CLAVE_SNAPSHOT)
+
+    insertados = actualizados = borrados = 0
+    cambiados = set()
+    # Días parciales: solo las identidades nuevas o modificadas de cada uno
+    en_bordes = {}
+
+    dias = {d for d in nuevo if d <= ultimo}
+    if not parcial:
+        dias.update(d for d in anterior if primero < d < ultimo)
+    for dia in dias:
+        viejo = anterior.get(dia, {})
+        actual = nuevo.get(dia, {})
+        if viejo == actual:
+            continue
+
+        distintas = set()
+        for identidad, digest in actual.items():
+            previo = viejo.get(identidad)
+            if previo is None:
+                insertados += 1
+            elif previo != digest:
+                actualizados += 1
+            else:
+                continue
+            distintas.add(identidad)
+        borrados += sum(1 for identidad in viejo if identidad not in actual)
+        if parcial or not primero < dia < ultimo:
+            # Día parcial: lo que falta puede estar fuera del corte, no se borra
+            # ni se re-envía el día entero (un agregado por día quedaría parcial)
+            if distintas:
+                en_bordes[dia] = distintas
+        else:
+            cambiados.add(dia)
+
+    # Días completos dentro de la cobertura: se reemplazan en el cache los
+    # registros que conocen los snapshots (no los de un DIFF posterior al FULL).
+    # De los días parciales, solo los que se re-envían.
+    reemplazar = {d: set(anterior.get(d, ())) | set(nuevo.get(d, ())) for d in cambiados}
+    reemplazar.update(en_bordes if not parcial else {})
+    if reemplazar:
+        cargar_secciones(cache, campos)
+        indice = obtener_indice(cache)
+        for campo in campos:
+            registros = cache.get(campo, [])
+            for d, conocidas in sorted(reemplazar.items()):
+                indice.borrar_dias(campo, [date.fromisoformat(d).toordinal()],
+                                   lambda slot: _conocido(registros[slot], conocidas))
+        if any(campo in CAMPOS_FC for campo in campos) and cambiados:
+            obtener_serie_fc(cache).borrar_dias([date.fromisoformat(d).toordinal() for d in sorted(cambiados)])
+
+    emitidos = [
+        r for r, (dia, identidad) in zip(data, dias_registros)
+        if dia in cambiados or identidad in en_bordes.get(dia, ())
+    ]
+
+    if cambiados or en_bordes:
+        logger.info(
+            f"  🔍 Snapshot {clave}: +{insertados} ~{actualizados} -{borrados} "
+            f"→ {len(emitidos)}/{len(data)} registros a extractores ({len(cambiados)} días re-procesados)"
+        )
+    else:
+        logger.info(f"  🔍 Snapshot {clave}: sin cambios ({len(data)} registros)")
+
+    return {"count": len(emitidos), "data": emitidos}
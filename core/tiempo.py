@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnas de tiempo normalizadas (parseo único al ingestar)
+
+Cada registro del cache guarda, además de sus strings ISO:
+- "epoch_local": segundos desde 1970-01-01 de la hora LOCAL del registro
+  (la hora de reloj que figura en el ISO, sin aplicar el offset)
+- "dia_local": ordinal del día local (date.toordinal())
+
+Es exactamente lo que hacía cada consumidor con
+datetime.fromisoformat(x["fecha"].replace("Z", ...)).replace(tzinfo=None):
+comparar contra datetime.now() y agrupar por strftime("%Y-%m-%d").
+Los consumidores usan epoch()/dia() y no parsean strings en el camino caliente.
+
+SerieOrdenada es una lista de registros en orden de epoch_local con el
+array paralelo de epochs: las ventanas de tiempo son un bisect, O(log n + k).
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from operator import itemgetter
+
+EPOCH = datetime(1970, 1, 1)
+
+CAMPO_EPOCH = "epoch_local"
+CAMPO_DIA = "dia_local"
+
+# Campo de referencia, en orden de preferencia (todos tienen el mismo valor cuando coexisten)
+CAMPOS_FECHA = ("fecha", "timestamp", "start_time")
+
+
+def parsear_local(texto):
+    """ISO 8601 -> datetime naive con la hora local del registro"""
+    return datetime.fromisoformat(texto.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def epoch_de(dt):
+    """datetime naive -> segundos epoch (misma escala que epoch_local)"""
+    return (dt - EPOCH).total_seconds()
+
+
+def normalizar(registro):
+    """
+    Agrega epoch_local y dia_local al registro parseando su fecha una sola vez.
+    Si la fecha no existe o no parsea, guarda None en ambos campos.
+
+    Returns:
+        dict: El mismo registro
+    """
+    texto = None
+    for campo in CAMPOS_FECHA:
+        texto = registro.get(campo)
+        if texto:
+            break
+
+    try:
+        dt = parsear_local(texto)
+        registro[CAMPO_EPOCH] = epoch_de(dt)
+        registro[CAMPO_DIA] = dt.toordinal()
+    except (AttributeError, TypeError, ValueError):
+        registro[CAMPO_EPOCH] = None
+        registro[CAMPO_DIA] = None
+
+    return registro
+
+
+def normalizar_seccion(registros):
+    """Normaliza los registros que todavía no tienen columnas de tiempo. Retorna cuántos."""
+    pendientes = 0
+    for registro in registros:
+        if CAMPO_EPOCH not in registro:
+            normalizar(registro)
+            pendientes += 1
+    return pendientes
+
+
+def epoch(registro):
+    """Epoch local del registro (None si no tiene fecha válida)"""
+    if CAMPO_EPOCH not in registro:
+        normalizar(registro)
+    return registro[CAMPO_EPOCH]
+
+
+def dia(registro):
+    """Ordinal del día local del registro (None si no tiene fecha válida)"""
+    if CAMPO_DIA not in registro:
+        normalizar(registro)
+    return registro[CAMPO_DIA]
+
+
+def hora(registro):
+    """Hora local (0-23) del registro"""
+    e = epoch(registro)
+    return None if e is None else int(e // 3600 % 24)
+
+
+@lru_cache(maxsize=4096)
+def dia_iso(ordinal):
+    """Ordinal de día -> "YYYY-MM-DD" """
+    return date.fromordinal(ordinal).isoformat()
+
+
+def a_datetime(e):
+    """Epoch local -> datetime naive"""
+    return EPOCH + timedelta(seconds=e)
+
+
+def epoch_limite(dias):
+    """Epoch local de datetime.now() - dias (límite de ventana de los gráficos)"""
+    return epoch_de(datetime.now() - timedelta(days=dias))
+
+
+def dia_limite(dias):
+    """Día local de datetime.now() - dias (primer día de la ventana de los gráficos)"""
+    return (datetime.now() - timedelta(days=dias)).toordinal()
+
+
+class SerieOrdenada(list):
+    """
+    Registros ordenados por epoch_local (a igual epoch, en el orden de la
+    lista original) con sus epochs en un array paralelo. Los registros sin
+    fecha válida no entran. Se usa como cualquier lista de registros.
+    """
+
+    __slots__ = ("epochs",)
+
+    def __init__(self, registros=(), epochs=None):
+        super().__init__(registros)
+        self.epochs = epochs if epochs is not None else array("d", map(epoch, self))
+
+    @classmethod
+    def desde_registros(cls, registros):
+        """La misma serie si ya está ordenada; si es una lista, la ordena (estable)"""
+        if isinstance(registros, cls):
+            return registros
+        pares = sorted(((e, r) for r in registros if (e := epoch(r)) is not None), key=itemgetter(0))
+        return cls([r for _, r in pares], array("d", [e for e, _ in pares]))
+
+    def rango(self, desde=None, hasta=None):
+        """Posiciones [i, j) de los registros con epoch_local en [desde, hasta)"""
+        i = 0 if desde is None else bisect_left(self.epochs, desde)
+        j = len(self) if hasta is None else bisect_left(self.epochs, hasta)
+        return i, max(i, j)
+
+    def ventana(self, desde=None, hasta=None):
+        """Registros con epoch_local en [desde, hasta), O(log n + k)"""
+        i, j = self.rango(desde, hasta)
+        return SerieOrdenada(self[i:j], self.epochs[i:j])
+
+
+def ordenados(registros):
+    """Registros en orden de tiempo (SerieOrdenada; sin copiar si ya lo están)"""
+    return SerieOrdenada.desde_registros(registros or [])
+
+
+def en_ventana(registros, dias):
+    """Registros con fecha >= ahora - dias"""
+    limite = epoch_limite(dias)
+    if isinstance(registros, SerieOrdenada):
+        # Bisect sobre los epochs: solo se recorre la ventana
+        return registros[registros.rango(limite)[0]:]
+    recientes = []
+    for r in registros:
+        e = epoch(r)
+        if e is not None and e >= limite:
+            recientes.append(r)
+    return recientes
@@ -6,17 +6,19 @@ Script de DEBUG para verificar por qué no se usan las glucemias diarias
 
 import json
 import sys
-from pathlib import Path
+
+from core.almacen import obtener_almacen
+from core.cache import cargar_cache
+from core.registros import a_json
 
 print("=" * 80)
 print("DEBUG: Verificando glucemias en cache y función de laboratorio")
 print("=" * 80)
 
-# 1. Verificar cache
-cache_path = Path("cache_datos.json")  # ✅ En la raíz de SCRIPT
-if cache_path.exists():
-    with open(cache_path, 'r', encoding='utf-8') as f:
-        cache = json.load(f)
+# 1. Verificar cache (base + journal del almacén configurado, en cualquier formato)
+almacen = obtener_almacen()
+if almacen.existe():
+    cache = cargar_cache(almacen, secciones=["glucosa"])
     
     glucosa = cache.get("glucosa", [])
     print(f"\n✓ Cache encontrado")
@@ -30,7 +32,7 @@ if cache_path.exists():
             print(f"    - Fecha: {fecha}, Valor: {valor}")
         
         print("\n  📋 Estructura completa de la primera glucemia:")
-        print(f"    {json.dumps(glucosa[0], indent=4, ensure_ascii=False)}")
+        print(f"    {json.dumps(glucosa[0], indent=4, ensure_ascii=False, default=a_json)}")
     else:
         print("\n  ⚠️ NO HAY GLUCEMIAS EN EL CACHE")
 else:
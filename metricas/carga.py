@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo de carga de entrenamiento vectorizado (hrTSS diario)
+
+El TSB de metricas/fitness.py recorre los días en un loop de Python con dos
+constantes fijas (TSB_CTL_DIAS / TSB_ATL_DIAS). Acá la carga es un array
+denso (hrTSS de Samsung Health por día, desde el primer entrenamiento hasta
+hoy) y cada curva es un filtro recursivo de primer orden:
+
+    y[t] = y[t-1] * decaimiento + carga[t] * ganancia
+
+- EWMA (TrainingPeaks): decaimiento = 1 - 1/dias, ganancia = 1/dias. Varias
+  constantes en una pasada (CARGA_CONSTANTES_DIAS: 7 / 28 / 42 / 90).
+- Banister (fitness-fatiga): decaimiento = e^(-1/tau), ganancia = 1;
+  rendimiento = k_fitness * fitness - k_fatiga * fatiga.
+
+Motores, según lo instalado (MOTOR):
+- "scipy": scipy.signal.lfilter, el filtro en C con las mismas operaciones
+  en el mismo orden que el loop: CTL/ATL idénticos bit a bit a calcular_tsb.
+- "numpy": los días en bloques de BLOQUE resueltos en forma cerrada (un
+  producto de matrices para todas las constantes juntas) y el estado
+  encadenado entre bloques. Difiere del loop en los últimos bits (~1e-13),
+  no en los valores redondeados.
+- "python": el mismo loop de fitness.py sobre array("d").
+"""
+
+import math
+from array import array
+from datetime import datetime
+from config import (
+    TSB_CTL_DIAS, TSB_ATL_DIAS, CARGA_CONSTANTES_DIAS,
+    BANISTER_TAU_FITNESS, BANISTER_TAU_FATIGA, BANISTER_K_FITNESS, BANISTER_K_FATIGA
+)
+from metricas.fitness import _hrtss_por_ordinal, _filtrar_samsung
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+MOTOR = "scipy" if lfilter is not None and np is not None else "numpy" if np is not None else "python"
+
+# Días por bloque del motor NumPy (decaimiento^BLOQUE no llega a underflow con tau >= 1)
+BLOQUE = 64
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Carga diaria
+# ═══════════════════════════════════════════════════════════════════════════
+
+def carga_diaria(ejercicios, hasta_dia=None):
+    """
+    hrTSS por día en un array denso (0 los días sin entrenamientos).
+    ⚠️ FILTRADO: Solo usa ejercicios de Samsung Health (igual que el TSB)
+
+    Returns:
+        tuple: (primer día ordinal, cargas) o (None, vacío) si no hay
+               entrenamientos. cargas es un array de NumPy o array("d").
+    """
+    if hasta_dia is None:
+        hasta_dia = datetime.now().date().toordinal()
+
+    hrtss_por_dia = {d: v for d, v in _hrtss_por_ordinal(_filtrar_samsung(ejercicios)).items() if d <= hasta_dia}
+    if not hrtss_por_dia:
+        return None, (np.zeros(0) if np is not None else array("d"))
+
+    desde = min(hrtss_por_dia)
+    n = hasta_dia - desde + 1
+    if np is not None:
+        cargas = np.zeros(n)
+        cargas[np.fromiter(hrtss_por_dia, dtype=np.int64, count=len(hrtss_por_dia)) - desde] = \
+            np.fromiter(hrtss_por_dia.values(), dtype=np.float64, count=len(hrtss_por_dia))
+    else:
+        cargas = array("d", bytes(8 * n))
+        for dia, total in hrtss_por_dia.items():
+            cargas[dia - desde] = total
+    return desde, cargas
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Filtro recursivo
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _filtro_python(cargas, decaimiento, ganancia, inicial):
+    y = inicial
+    salida = array("d", bytes(8 * len(cargas)))
+    for t, carga in enumerate(cargas):
+        y = y * decaimiento + carga * ganancia
+        salida[t] = y
+    return salida
+
+
+def _filtro_numpy(cargas, decaimientos, ganancias, iniciales):
+    """
+    Todas las curvas juntas (una fila por constante). En cada bloque:
+
+        y[t] = d^(t+1) * y_antes + g * sum(d^(t-j) * carga[j], j <= t)
+
+    La suma es un producto por la matriz triangular de potencias (la misma
+    para todos los bloques). El estado al final de cada bloque es la misma
+    recurrencia con decaimiento d^BLOQUE: otra matriz triangular, de bloques.
+    """
+    n = len(cargas)
+    bloques = -(-n // BLOQUE)
+    x = np.zeros(bloques * BLOQUE)
+    x[:n] = cargas
+    x = x.reshape(bloques, BLOQUE)
+
+    d = np.asarray(decaimientos, dtype=np.float64)[:, None]
+    g = np.asarray(ganancias, dtype=np.float64)[:, None, None]
+    # Sin estado previo: convolución de cada bloque con d^0 .. d^(BLOQUE-1)
+    locales = np.matmul(x, _triangular(d, BLOQUE).transpose(0, 2, 1)) * g    # (C, bloques, BLOQUE)
+
+    # Estado al final de cada bloque: s[b] = s[b-1] * d^BLOQUE + locales[b, -1]
+    finales = np.matmul(locales[:, :, -1][:, None, :], _triangular(d ** BLOQUE, bloques).transpose(0, 2, 1))[:, 0]
+    previos = np.concatenate([np.zeros((len(d), 1)), finales[:, :-1]], axis=1)   # (C, bloques)
+    iniciales = np.asarray(iniciales, dtype=np.float64)[:, None]
+    if iniciales.any():
+        previos = previos + iniciales * (d ** BLOQUE) ** np.arange(bloques)
+
+    locales += previos[:, :, None] * (d ** np.arange(1, BLOQUE + 1))[:, None, :]
+    return locales.reshape(len(d), -1)[:, :n]
+
+
+def _triangular(d, n):
+    """T[c, t, j] = d[c]^(t-j) para j <= t, 0 arriba de la diagonal"""
+    t = np.arange(n)
+    exponentes = t[:, None] - t[None, :]
+    return np.where(exponentes >= 0, d[:, :, None] ** np.maximum(exponentes, 0), 0.0)
+
+
+def filtrar(cargas, decaimientos, ganancias, iniciales=None):
+    """
+    y[t] = y[t-1] * decaimiento + carga[t] * ganancia, una curva por par
+    (decaimiento, ganancia), con y[-1] = inicial (0 por defecto).
+
+    Returns:
+        list: Una curva por constante (arrays del mismo largo que cargas)
+    """
+    iniciales = list(iniciales) if iniciales is not None else [0.0] * len(decaimientos)
+    if not len(cargas):
+        return [cargas[:0] for _ in decaimientos]
+
+    if MOTOR == "scipy":
+        x = np.asarray(cargas, dtype=np.float64)
+        # zi = estado previo * decaimiento: el primer y sale de la misma suma que en el loop
+        return [lfilter([g], [1.0, -d], x, zi=[y0 * d])[0]
+                for d, g, y0 in zip(decaimientos, ganancias, iniciales)]
+    if MOTOR == "numpy":
+        return list(_filtro_numpy(cargas, decaimientos, ganancias, iniciales))
+    return [_filtro_python(cargas, d, g, y0) for d, g, y0 in zip(decaimientos, ganancias, iniciales)]
+
+
+def ewma(cargas, constantes=CARGA_CONSTANTES_DIAS):
+    """
+    EWMA de la carga para varias constantes en una pasada.
+
+    Returns:
+        dict: {dias: curva}
+    """
+    ganancias = [1.0 / dias for dias in constantes]
+    return dict(zip(constantes, filtrar(cargas, [1 - k for k in ganancias], ganancias)))
+
+
+def banister(cargas, tau_fitness=BANISTER_TAU_FITNESS, tau_fatiga=BANISTER_TAU_FATIGA,
+             k_fitness=BANISTER_K_FITNESS, k_fatiga=BANISTER_K_FATIGA):
+    """
+    Modelo fitness-fatiga de Banister (respuesta a impulsos):
+
+        fitness[t] = fitness[t-1] * e^(-1/tau_fitness) + carga[t]
+        fatiga[t]  = fatiga[t-1]  * e^(-1/tau_fatiga)  + carga[t]
+        rendimiento = k_fitness * fitness - k_fatiga * fatiga
+
+    Returns:
+        dict: {"fitness", "fatiga", "rendimiento"} (curvas por día)
+    """
+    fitness, fatiga = filtrar(cargas, [math.exp(-1 / tau_fitness), math.exp(-1 / tau_fatiga)], [1.0, 1.0])
+    if np is not None:
+        rendimiento = k_fitness * np.asarray(fitness) - k_fatiga * np.asarray(fatiga)
+    else:
+        rendimiento = array("d", (k_fitness * f - k_fatiga * g for f, g in zip(fitness, fatiga)))
+    return {"fitness": fitness, "fatiga": fatiga, "rendimiento": rendimiento}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Modelo completo
+# ═══════════════════════════════════════════════════════════════════════════
+
+def modelo_carga(ejercicios, constantes=CARGA_CONSTANTES_DIAS, hasta_dia=None):
+    """
+    Carga diaria, EWMA para cada constante (más las del TSB) y Banister.
+
+    Returns:
+        dict: {"desde": primer día ordinal (None sin entrenamientos),
+               "carga": hrTSS por día, "ewma": {dias: curva} (constantes y las del TSB),
+               "tsb": CTL - ATL por día, "banister": ver banister()}
+    """
+    desde, cargas = carga_diaria(ejercicios, hasta_dia)
+    todas = tuple(dict.fromkeys(tuple(constantes) + (TSB_ATL_DIAS, TSB_CTL_DIAS)))
+    curvas = ewma(cargas, todas)
+    ctl, atl = curvas[TSB_CTL_DIAS], curvas[TSB_ATL_DIAS]
+    if np is not None:
+        tsb = np.asarray(ctl) - np.asarray(atl)
+    else:
+        tsb = array("d", (c - a for c, a in zip(ctl, atl)))
+    return {
+        "desde": desde,
+        "carga": cargas,
+        "ewma": curvas,
+        "tsb": tsb,
+        "banister": banister(cargas),
+    }
+
+
+def tsb_actual(modelo):
+    """
+    Último día del modelo en el formato de calcular_tsb (mismo resultado).
+
+    Returns:
+        dict: {"tsb": float, "ctl": float, "atl": float}
+    """
+    if modelo["desde"] is None:
+        return {"tsb": 0, "ctl": 0, "atl": 0}
+    ctl = float(modelo["ewma"][TSB_CTL_DIAS][-1])
+    atl = float(modelo["ewma"][TSB_ATL_DIAS][-1])
+    tsb = ctl - atl
+    return {
+        "tsb": round(tsb, 1),
+        "ctl": round(ctl, 1),
+        "atl": round(atl, 1)
+    }
+
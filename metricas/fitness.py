@@ -5,41 +5,43 @@ Métricas de fitness cardiovascular - VERSIÓN CON hrTSS
 ✅ PAI se mantiene como métrica independiente de salud cardiovascular
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from collections import defaultdict
+from core import tiempo
+from core.cache import historial_con_checkpoint
+from core.diario import cobertura, dias_tocados, registros_del_dia
+from core.indice import marcar_sucias, vivos
 from config import (
     FC_MAX, FC_REPOSO, EDAD,
     TSB_CTL_DIAS, TSB_ATL_DIAS,
     GRAFICOS_DIAS_HISTORICO
 )
 
+# Serie diaria del EWMA del TSB en el cache (ver serie_tsb)
+CLAVE_TSB = "tsb_diario"
+
 
 def calcular_vo2max(ejercicios):
     """Estima VO2max usando la fórmula de Firstbeat."""
-    fecha_limite = datetime.now().replace(tzinfo=None) - timedelta(days=30)
+    # Últimos 30 días (bisect si ejercicios es una SerieOrdenada)
+    recientes = tiempo.en_ventana(ejercicios, 30)
 
     entrenamientos_relevantes = []
 
-    for e in ejercicios:
+    for e in recientes:
         try:
-            fecha_e = datetime.fromisoformat(
-                e["fecha"].replace("Z", "+00:00")
-            ).replace(tzinfo=None)
             fc = e.get("fc_promedio", 0)
             duracion = e.get("duracion", 0)
 
-            if fecha_e >= fecha_limite and fc > (FC_MAX * 0.80) and duracion >= 10:
+            if fc > (FC_MAX * 0.80) and duracion >= 10:
                 entrenamientos_relevantes.append(e)
         except:
             continue
 
     if not entrenamientos_relevantes:
-        for e in ejercicios:
+        for e in recientes:
             try:
-                fecha_e = datetime.fromisoformat(
-                    e["fecha"].replace("Z", "+00:00")
-                ).replace(tzinfo=None)
-                if fecha_e >= fecha_limite and e.get("fc_promedio", 0) > 0:
+                if e.get("fc_promedio", 0) > 0:
                     entrenamientos_relevantes.append(e)
             except:
                 continue
@@ -61,26 +63,289 @@ def calcular_vo2max(ejercicios):
     return round(vo2max_final, 1)
 
 
-def _agrupar_hrtss_por_dia(ejercicios):
+def _hrtss_por_ordinal(ejercicios):
     """
-    Agrupa hrTSS (Heart Rate Training Stress Score) total por día.
+    Agrupa hrTSS (Heart Rate Training Stress Score) total por día (ordinal).
     ✅ Usa hrTSS en vez de PAI para calcular carga de entrenamiento.
     """
     hrtss_por_dia = defaultdict(float)
 
     for e in ejercicios:
         try:
-            fecha = datetime.fromisoformat(
-                e["fecha"].replace("Z", "+00:00")
-            ).date()
-            hrtss_por_dia[fecha] += e.get("hrtss", 0)
+            dia = tiempo.dia(e)
+            if dia is not None:
+                hrtss_por_dia[dia] += e.get("hrtss", 0)
         except:
             continue
 
     return hrtss_por_dia
 
 
-def calcular_tsb(ejercicios):
+def _agrupar_hrtss_por_dia(ejercicios):
+    # Ordinal -> date (los cálculos EWMA recorren fechas)
+    return {date.fromordinal(dia): total for dia, total in _hrtss_por_ordinal(ejercicios).items()}
+
+
+def _filtrar_samsung(ejercicios):
+    # ✅ FILTRAR: Solo Samsung Health para evitar duplicados
+    return [e for e in ejercicios if e.get("fuente") == "com.sec.android.app.shealth"]
+
+
+def _hrtss_del_dia(cache, d):
+    """hrTSS del día d como en _hrtss_por_ordinal (0 si no hay entrenamientos de Samsung)"""
+    del_dia = _filtrar_samsung(registros_del_dia(cache, "ejercicio", d))
+    if not del_dia:
+        return 0
+    total = 0.0
+    for e in del_dia:
+        total += e.get("hrtss", 0)
+    return total
+
+
+def checkpoint_tsb(ejercicios, hasta_dia):
+    """
+    Estado del EWMA (CTL/ATL) al final de hasta_dia, para seguir desde ahí
+    sin recorrer los entrenamientos viejos (ver core.cache.historial_con_checkpoint).
+
+    Returns:
+        dict: {"dia", "inicio" (primer día con datos o None), "ctl", "atl"}
+    """
+    hrtss_por_dia = {
+        f: v for f, v in _agrupar_hrtss_por_dia(_filtrar_samsung(ejercicios)).items()
+        if f.toordinal() <= hasta_dia
+    }
+    estado = {"dia": hasta_dia, "inicio": None, "ctl": 0, "atl": 0}
+    if not hrtss_por_dia:
+        return estado
+
+    k_ctl = 1.0 / TSB_CTL_DIAS
+    k_atl = 1.0 / TSB_ATL_DIAS
+    ctl = 0
+    atl = 0
+
+    fecha_inicio = min(hrtss_por_dia)
+    for dias in range(hasta_dia - fecha_inicio.toordinal() + 1):
+        hrtss_hoy = hrtss_por_dia.get(fecha_inicio + timedelta(days=dias), 0)
+        ctl = ctl * (1 - k_ctl) + hrtss_hoy * k_ctl
+        atl = atl * (1 - k_atl) + hrtss_hoy * k_atl
+
+    estado.update(inicio=fecha_inicio.toordinal(), ctl=ctl, atl=atl)
+    return estado
+
+
+def _filas_reutilizables(previa, inicio, desde, base):
+    """
+    Filas de la serie previa que siguen valiendo antes de desde, o None.
+
+    La serie sirve si empieza en el mismo primer día con datos y su EWMA al
+    final de desde - 1 es el punto de partida actual (con el checkpoint del
+    historial viejo: que los meses viejos no cambiaron).
+    """
+    if not previa or previa["inicio"] != inicio or previa["desde"] > desde:
+        return None
+    n = desde - previa["desde"]
+    if n > len(previa["ctl"]):
+        return None
+    punto = [previa["ctl"][n - 1], previa["atl"][n - 1]] if n else previa["base"]
+    return n if punto == list(base) else None
+
+
+def _primer_dia_cambiado(previa, hrtss_por_dia, desde, fin):
+    """
+    Primer día de [desde, fin) cuyo hrTSS no es el de la serie previa
+    (entrenamientos nuevos, editados o borrados); fin si no cambió ninguno.
+    Recorre solo los días con entrenamientos; los días guardados con carga
+    se cuentan en C (list.count) y se buscan uno por uno solo si falta alguno.
+    """
+    origen = previa["desde"]
+    guardados = previa["hrtss"]
+    cambio = fin
+    con_carga = 0
+    for dia, total in hrtss_por_dia.items():
+        if desde <= dia < fin:
+            if guardados[dia - origen] != total:
+                cambio = min(cambio, dia)
+            if total:
+                con_carga += 1
+
+    tramo = guardados[desde - origen:fin - origen]
+    if len(tramo) - tramo.count(0) != con_carga:
+        # Días que tenían carga y ya no tienen entrenamientos (borrados)
+        for i, total in enumerate(tramo):
+            if desde + i >= cambio:
+                break
+            if total and not hrtss_por_dia.get(desde + i):
+                cambio = desde + i
+                break
+    return cambio
+
+
+def serie_tsb(ejercicios, previa=None, estado=None, hasta_dia=None):
+    """
+    EWMA del TSB día por día hasta hoy (CTL/ATL al final de cada día).
+
+    Con la serie de una corrida anterior (previa) se conservan sus días hasta
+    el anterior al primero cuyo hrTSS cambió (entrenamientos nuevos, editados
+    o borrados) y solo se recorre desde ahí: O(días cambiados) en vez de
+    O(días desde el primer entrenamiento). Los gráficos toman una porción.
+
+    Args:
+        previa (dict): Serie guardada (cache["tsb_diario"]) o None
+        estado (dict): Checkpoint del EWMA (checkpoint_tsb) si ejercicios es
+            solo el historial reciente
+
+    Returns:
+        dict: {"inicio": primer día con datos, "desde": día de la primera fila,
+               "base": [ctl, atl] antes de desde, "hrtss": [...], "ctl": [...],
+               "atl": [...]} (días ordinales, una fila por día hasta hoy)
+               o None si no hay ningún entrenamiento
+    """
+    if hasta_dia is None:
+        hasta_dia = datetime.now().date().toordinal()
+
+    hrtss_por_dia = _hrtss_por_ordinal(_filtrar_samsung(ejercicios))
+    if estado is not None:
+        hrtss_por_dia = {d: v for d, v in hrtss_por_dia.items() if d > estado["dia"]}
+
+    if estado is not None and estado["inicio"] is not None:
+        inicio, desde, base = estado["inicio"], estado["dia"] + 1, [estado["ctl"], estado["atl"]]
+    elif hrtss_por_dia:
+        inicio = desde = min(hrtss_por_dia)
+        base = [0, 0]
+    else:
+        return None
+
+    diario = {"inicio": inicio, "desde": desde, "base": base, "hrtss": [], "ctl": [], "atl": []}
+    recorrer_desde = desde
+
+    if _filas_reutilizables(previa, inicio, desde, base) is not None:
+        fin = min(previa["desde"] + len(previa["ctl"]), hasta_dia + 1)
+        recorrer_desde = _primer_dia_cambiado(previa, hrtss_por_dia, desde, fin)
+        # Las filas previas a desde (historial viejo ya validado) también se conservan
+        n = recorrer_desde - previa["desde"]
+        diario.update(
+            desde=previa["desde"], base=previa["base"],
+            hrtss=previa["hrtss"][:n], ctl=previa["ctl"][:n], atl=previa["atl"][:n]
+        )
+
+    # Constantes EWMA
+    k_ctl = 1.0 / TSB_CTL_DIAS  # 1/42 = 0.0238
+    k_atl = 1.0 / TSB_ATL_DIAS  # 1/7 = 0.1429
+
+    if diario["ctl"]:
+        ctl, atl = diario["ctl"][-1], diario["atl"][-1]
+    else:
+        ctl, atl = diario["base"]
+
+    for dia in range(recorrer_desde, hasta_dia + 1):
+        hrtss_hoy = hrtss_por_dia.get(dia, 0)
+
+        # EWMA: nueva = antigua * (1 - k) + valor_hoy * k
+        ctl = ctl * (1 - k_ctl) + hrtss_hoy * k_ctl
+        atl = atl * (1 - k_atl) + hrtss_hoy * k_atl
+
+        diario["hrtss"].append(hrtss_hoy)
+        diario["ctl"].append(ctl)
+        diario["atl"].append(atl)
+
+    return diario
+
+
+def _avanzar_serie(cache, previa, hasta_dia):
+    """
+    Pone al día en el lugar la serie guardada con los entrenamientos
+    agregados o borrados desde que se calculó ("registros" / "ultimo", ver
+    core.diario.dias_tocados): se recalcula el hrTSS solo de esos días y se
+    recorre desde el primero que cambió. Nada es O(historial).
+
+    Returns:
+        bool: La serie cambió, o None si hay que recalcularla con serie_tsb
+              (serie sin cobertura, otra lista de entrenamientos, o un cambio
+              en el primer día con datos o antes del inicio de la serie)
+    """
+    if not previa or previa.get("registros") is None:
+        return None
+    tocados = dias_tocados(cache, "ejercicio", previa)
+    if tocados is None or any(d <= previa["inicio"] or d < previa["desde"] for d in tocados):
+        return None
+
+    origen = previa["desde"]
+    fin = origen + len(previa["hrtss"])
+    nuevos = {d: _hrtss_del_dia(cache, d) for d in tocados if d < fin}
+    recorrer_desde = min(
+        [d for d, total in nuevos.items() if total != previa["hrtss"][d - origen]] + [fin, hasta_dia + 1]
+    )
+    n = recorrer_desde - origen
+    cambio = n < len(previa["hrtss"]) or recorrer_desde <= hasta_dia
+
+    # Filas desde recorrer_desde: se rehacen con el hrTSS guardado de los días no tocados
+    guardados = previa["hrtss"][n:]
+    for columna in ("hrtss", "ctl", "atl"):
+        del previa[columna][n:]
+    ctl, atl = (previa["ctl"][-1], previa["atl"][-1]) if n else previa["base"]
+
+    k_ctl = 1.0 / TSB_CTL_DIAS
+    k_atl = 1.0 / TSB_ATL_DIAS
+    for dia in range(recorrer_desde, hasta_dia + 1):
+        if dia in nuevos:
+            hrtss_hoy = nuevos[dia]
+        elif dia < fin:
+            hrtss_hoy = guardados[dia - recorrer_desde]
+        else:
+            hrtss_hoy = _hrtss_del_dia(cache, dia)
+        ctl = ctl * (1 - k_ctl) + hrtss_hoy * k_ctl
+        atl = atl * (1 - k_atl) + hrtss_hoy * k_atl
+        previa["hrtss"].append(hrtss_hoy)
+        previa["ctl"].append(ctl)
+        previa["atl"].append(atl)
+
+    actual = cobertura(cache, "ejercicio")
+    if actual["registros"] != previa["registros"] or actual["ultimo"] != previa["ultimo"]:
+        previa.update(actual)
+        cambio = True
+    return cambio
+
+
+def tsb_diario(cache):
+    """
+    Serie diaria del TSB del cache al día de hoy (ver serie_tsb).
+
+    Parte de cache["tsb_diario"], que guarda también qué registros de
+    ejercicio cubre: solo se recalculan los días con entrenamientos nuevos o
+    borrados desde entonces y se recorre desde el primero que cambió
+    (_avanzar_serie). Con el cache lazy y la sección sin leer, o si la serie
+    no sirve, se arma con serie_tsb. Si la serie cambió queda en el cache
+    (marcada para el próximo guardar_cache).
+
+    Returns:
+        tuple: (estado, ejercicios, diario) - estado y ejercicios como
+               core.cache.historial_con_checkpoint
+    """
+    estado, ejercicios = historial_con_checkpoint(cache, "ejercicio", "tsb", checkpoint_tsb)
+    previa = cache.get(CLAVE_TSB)
+    if estado is None:
+        # Sin los registros borrados todavía no compactados (durante la ingesta)
+        ejercicios = vivos(cache, "ejercicio")
+        cambio = _avanzar_serie(cache, previa, datetime.now().date().toordinal())
+        if cambio is not None:
+            if cambio:
+                marcar_sucias(cache, CLAVE_TSB)
+            return estado, ejercicios, previa
+
+    diario = serie_tsb(ejercicios, previa, estado)
+    if diario is not None:
+        if estado is None:
+            diario.update(cobertura(cache, "ejercicio"))
+        elif previa:
+            # Historial lazy: la sección no cambió desde que se calculó la serie previa
+            diario.update(registros=previa.get("registros"), ultimo=previa.get("ultimo"))
+    if diario != previa:
+        cache[CLAVE_TSB] = diario
+        marcar_sucias(cache, CLAVE_TSB)
+    return estado, ejercicios, diario
+
+
+def calcular_tsb(ejercicios, estado=None, diario=None):
     """
     Calcula TSB usando EWMA (como TrainingPeaks).
 
@@ -92,43 +357,27 @@ def calcular_tsb(ejercicios):
     ✅ USA hrTSS (Heart Rate Training Stress Score) en vez de PAI
     ⚠️ FILTRADO: Solo usa ejercicios de Samsung Health
 
+    Args:
+        estado (dict): Checkpoint del EWMA (checkpoint_tsb); con él alcanzan
+            los entrenamientos posteriores al día del checkpoint
+        diario (dict): Serie de serie_tsb / tsb_diario ya calculada (el
+            último día); sin ella se calcula
+
     Returns:
         dict: {"tsb": float, "ctl": float, "atl": float}
     """
     if not ejercicios:
         return {"tsb": 0, "ctl": 0, "atl": 0}
 
-    # ✅ FILTRAR: Solo Samsung Health para evitar duplicados
-    ejercicios_limpios = [
-        e for e in ejercicios
-        if e.get("fuente") == "com.sec.android.app.shealth"
-    ]
-
-    hrtss_por_dia = _agrupar_hrtss_por_dia(ejercicios_limpios)
-
-    # Ordenar fechas
-    todas_fechas = sorted(hrtss_por_dia.keys())
-    if not todas_fechas:
+    if diario is None:
+        diario = serie_tsb(ejercicios, estado=estado)
+    if diario is None:
         return {"tsb": 0, "ctl": 0, "atl": 0}
 
-    # Constantes EWMA
-    k_ctl = 1.0 / TSB_CTL_DIAS  # 1/42 = 0.0238
-    k_atl = 1.0 / TSB_ATL_DIAS  # 1/7 = 0.1429
-
-    ctl = 0
-    atl = 0
-
-    # Calcular EWMA día por día desde el primer entrenamiento
-    fecha_actual = datetime.now().date()
-    fecha_inicio = todas_fechas[0]
-
-    for dias in range((fecha_actual - fecha_inicio).days + 1):
-        fecha = fecha_inicio + timedelta(days=dias)
-        hrtss_hoy = hrtss_por_dia.get(fecha, 0)
-
-        # EWMA: nueva = antigua * (1 - k) + valor_hoy * k
-        ctl = ctl * (1 - k_ctl) + hrtss_hoy * k_ctl
-        atl = atl * (1 - k_atl) + hrtss_hoy * k_atl
+    if diario["ctl"]:
+        ctl, atl = diario["ctl"][-1], diario["atl"][-1]
+    else:
+        ctl, atl = diario["base"]
 
     tsb = ctl - atl
 
@@ -139,32 +388,20 @@ def calcular_tsb(ejercicios):
     }
 
 
-def preparar_datos_tsb_historico(ejercicios):
+def preparar_datos_tsb_historico(ejercicios, estado=None, diario=None):
     """
     Prepara datos históricos de TSB para gráficos usando EWMA.
 
     ✅ FÓRMULA CORRECTA aplicada día por día
     ✅ USA hrTSS (Heart Rate Training Stress Score) en vez de PAI
     ⚠️ FILTRADO: Solo usa ejercicios de Samsung Health
-    """
-    if not ejercicios:
-        return {
-            "fechas": [],
-            "tsb": [],
-            "ctl": [],
-            "atl": []
-        }
-
-    # ✅ FILTRAR: Solo Samsung Health para evitar duplicados
-    ejercicios_limpios = [
-        e for e in ejercicios
-        if e.get("fuente") == "com.sec.android.app.shealth"
-    ]
-
-    hrtss_por_dia = _agrupar_hrtss_por_dia(ejercicios_limpios)
 
-    todas_fechas = sorted(hrtss_por_dia.keys())
-    if not todas_fechas:
+    estado: checkpoint del EWMA (ver calcular_tsb), anterior a la ventana del gráfico
+    diario: serie de serie_tsb / tsb_diario; el gráfico es una porción de ella
+    """
+    if ejercicios and diario is None:
+        diario = serie_tsb(ejercicios, estado=estado)
+    if not ejercicios or diario is None:
         return {
             "fechas": [],
             "tsb": [],
@@ -172,47 +409,30 @@ def preparar_datos_tsb_historico(ejercicios):
             "atl": []
         }
 
-    # Constantes EWMA
-    k_ctl = 1.0 / TSB_CTL_DIAS
-    k_atl = 1.0 / TSB_ATL_DIAS
-
+    # Solo los últimos GRAFICOS_DIAS_HISTORICO días
     fecha_actual = datetime.now().date()
-    fecha_inicio = max(
-        todas_fechas[0],
-        fecha_actual - timedelta(days=GRAFICOS_DIAS_HISTORICO)
+    dia_inicio = max(
+        diario["inicio"],
+        (fecha_actual - timedelta(days=GRAFICOS_DIAS_HISTORICO)).toordinal()
     )
+    i = max(dia_inicio - diario["desde"], 0)
 
     fechas = []
     valores_tsb = []
     valores_ctl = []
     valores_atl = []
 
-    ctl = 0
-    atl = 0
-
-    # Calcular EWMA desde el inicio hasta hoy
-    # Pero solo guardar los últimos GRAFICOS_DIAS_HISTORICO días
-    fecha_inicio_total = todas_fechas[0]
-
-    for dias in range((fecha_actual - fecha_inicio_total).days + 1):
-        fecha = fecha_inicio_total + timedelta(days=dias)
-        hrtss_hoy = hrtss_por_dia.get(fecha, 0)
-
-        # Actualizar EWMA
-        ctl = ctl * (1 - k_ctl) + hrtss_hoy * k_ctl
-        atl = atl * (1 - k_atl) + hrtss_hoy * k_atl
+    for dia, ctl, atl in zip(range(diario["desde"] + i, fecha_actual.toordinal() + 1),
+                             diario["ctl"][i:], diario["atl"][i:]):
         tsb = ctl - atl
-
-        # Solo guardar si está en la ventana de gráfico
-        if fecha >= fecha_inicio:
-            fechas.append(fecha.isoformat())
-            valores_tsb.append(round(tsb, 1))
-            valores_ctl.append(round(ctl, 1))
-            valores_atl.append(round(atl, 1))
+        fechas.append(date.fromordinal(dia).isoformat())
+        valores_tsb.append(round(tsb, 1))
+        valores_ctl.append(round(ctl, 1))
+        valores_atl.append(round(atl, 1))
 
     return {
         "fechas": fechas,
         "tsb": valores_tsb,
         "ctl": valores_ctl,
         "atl": valores_atl
-    }
\ No newline at end of file
+    }
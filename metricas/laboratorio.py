@@ -210,26 +210,20 @@ def generar_alertas_laboratorio(parametros, scores, glucemias_diarias=None):
     # Calcular promedio de glucemias diarias recientes (últimos 90 días)
     glucemia_promedio_reciente = None
     if glucemias_diarias and len(glucemias_diarias) > 0:
-        from datetime import datetime, timedelta
+        from core import tiempo
         import logging
         logger = logging.getLogger(__name__)
         
         logger.info(f"🔍 DEBUG Glucemias: Recibidas {len(glucemias_diarias)} mediciones")
         
-        fecha_limite = datetime.now() - timedelta(days=90)
-        
         glucemias_recientes = []
-        for g in glucemias_diarias:
+        # Hora local naive, normalizada al ingestar (bisect si viene ordenada)
+        for g in tiempo.en_ventana(glucemias_diarias, 90):
             try:
-                fecha_g = datetime.fromisoformat(g.get("fecha", "").replace("Z", "+00:00"))
-                # Convertir a naive para comparar
-                fecha_g_naive = fecha_g.replace(tzinfo=None)
-                
-                if fecha_g_naive >= fecha_limite:
-                    # ✅ Buscar valor en diferentes campos (Samsung Health usa "nivel_mg_dl")
-                    valor = g.get("nivel_mg_dl") or g.get("valor") or g.get("glucosa")
-                    if valor is not None:
-                        glucemias_recientes.append(valor)
+                # ✅ Buscar valor en diferentes campos (Samsung Health usa "nivel_mg_dl")
+                valor = g.get("nivel_mg_dl") or g.get("valor") or g.get("glucosa")
+                if valor is not None:
+                    glucemias_recientes.append(valor)
             except Exception as e:
                 logger.debug(f"Error procesando glucemia: {e}")
                 continue
@@ -6,9 +6,9 @@ Usa ventana móvil de 7 días
 """
 
 from datetime import datetime, timedelta
-from collections import defaultdict
 from config import PAI_VENTANA_DIAS, GRAFICOS_DIAS_HISTORICO
 from utils.logger import logger
+from core.diario import tabla_diaria
 
 
 def calcular_pai_semanal(ejercicios, silencioso=False):
@@ -16,7 +16,7 @@ def calcular_pai_semanal(ejercicios, silencioso=False):
     Calcula PAI semanal con ventana móvil de 7 días desde fecha actual.
     
     Args:
-        ejercicios (list): Lista de entrenamientos
+        ejercicios (list): Lista de entrenamientos o su TablaDiaria (core/diario.py)
         silencioso (bool): Si es True, no imprime logs (para resumen final)
     
     Returns:
@@ -30,25 +30,15 @@ def calcular_pai_semanal(ejercicios, silencioso=False):
         logger.info(f"CÁLCULO PAI SEMANAL - Fecha actual: {fecha_actual}")
         logger.info(f"Ventana de {PAI_VENTANA_DIAS} días: {fecha_inicio} a {fecha_actual}")
     
-    pai_total = 0
-    entrenamientos_ventana = []
-    
-    for e in ejercicios:
-        try:
-            fecha_entrenamiento = datetime.fromisoformat(
-                e["fecha"].replace("Z", "+00:00")
-            ).date()
-            
-            if fecha_inicio <= fecha_entrenamiento <= fecha_actual:
-                pai_total += e.get("pai", 0)
-                entrenamientos_ventana.append(e)
-                #✂️ LOGS DETALLADOS ELIMINADOS - info ya está en el dashboard HTML
-        except:
-            continue
+    # ⚡ Ventana = resta de sumas prefijas de la tabla diaria (O(1))
+    tabla = tabla_diaria(ejercicios)
+    dia_inicio = fecha_inicio.toordinal()
+    dia_actual = fecha_actual.toordinal()
+    pai_total = tabla.suma("pai", dia_inicio, dia_actual)
     
     if not silencioso:
         logger.info(f"PAI TOTAL SEMANAL: {pai_total:.1f}")
-        logger.info(f"Entrenamientos en ventana: {len(entrenamientos_ventana)}")
+        logger.info(f"Entrenamientos en ventana: {tabla.suma('n', dia_inicio, dia_actual)}")
         logger.info("=" * 50)
     
     return round(pai_total, 1)
@@ -60,36 +50,22 @@ def preparar_datos_pai_historico(ejercicios):
     Calcula ventana móvil de 7 días para los últimos N días.
     
     Args:
-        ejercicios (list): Lista de entrenamientos
+        ejercicios (list): Lista de entrenamientos o su TablaDiaria (core/diario.py)
     
     Returns:
         dict: {"fechas": [...], "valores": [...]}
     """
     fecha_actual = datetime.now().date()
-    pai_diario = defaultdict(float)
-    
-    # Primero calcular PAI por día
-    for e in ejercicios:
-        try:
-            fecha = datetime.fromisoformat(
-                e["fecha"].replace("Z", "+00:00")
-            ).date()
-            pai_diario[fecha] += e.get("pai", 0)
-        except:
-            continue
+    tabla = tabla_diaria(ejercicios)
     
-    # Calcular PAI semanal móvil para cada día
+    # PAI semanal móvil para cada día: una resta de sumas prefijas por día
     fechas = []
     valores = []
     
     for i in range(GRAFICOS_DIAS_HISTORICO - 1, -1, -1):
         fecha = fecha_actual - timedelta(days=i)
-        
-        # Sumar PAI de los últimos 7 días desde esta fecha
-        pai_semana = 0
-        for j in range(PAI_VENTANA_DIAS):
-            fecha_ventana = fecha - timedelta(days=j)
-            pai_semana += pai_diario.get(fecha_ventana, 0)
+        dia = fecha.toordinal()
+        pai_semana = tabla.suma("pai", dia - PAI_VENTANA_DIAS + 1, dia)
         
         fechas.append(fecha.isoformat())
         valores.append(round(pai_semana, 1))
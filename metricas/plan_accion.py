@@ -6,6 +6,7 @@ Monitorea cumplimiento del plan de déficit calórico y proteína
 """
 
 from datetime import datetime, timedelta
+from core import tiempo
 
 
 def generar_plan_accion(metricas, nutrition_data, tmb_data, calorias_data):
@@ -68,8 +69,7 @@ def generar_plan_accion(metricas, nutrition_data, tmb_data, calorias_data):
     if nutrition_data:
         for n in nutrition_data:
             try:
-                fecha = datetime.fromisoformat(n["timestamp"].replace("Z", "+00:00"))
-                dia = fecha.strftime("%Y-%m-%d")
+                dia = tiempo.dia_iso(tiempo.dia(n))
                 
                 proteina = n.get("protein_g", 0)  # ✅ CORREGIDO: sin acento
                 
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migración del cache entre almacenes (ver core/almacen.py)
+
+Uso:
+    python migrar_cache.py                 # json (base CACHE_BIN o CACHE_JSON + journal + CACHE_FC) -> SQLite (CACHE_SQLITE)
+    python migrar_cache.py json secciones  # JSON -> un archivo por sección (CACHE_DIR)
+    python migrar_cache.py sqlite json     # vuelta atrás
+
+Carga el origen con la misma normalización que cargar_cache(), lo escribe
+en el destino y verifica que al releerlo las secciones sean idénticas.
+Después hay que poner CACHE_BACKEND = "<destino>" en config.py.
+"""
+
+import sys
+import time
+
+
+def migrar(origen="json", destino="sqlite"):
+    from core.almacen import obtener_almacen
+    from core.cache import cargar_cache, guardar_cache
+    from core.serie_fc import obtener_serie_fc
+
+    almacen_origen = obtener_almacen(origen)
+    almacen_destino = obtener_almacen(destino)
+
+    if not almacen_origen.existe():
+        print(f"❌ No existe el cache de origen: {almacen_origen}")
+        return 1
+
+    inicio = time.perf_counter()
+    cache = cargar_cache(almacen_origen)
+    guardar_cache(cache, almacen_destino)
+    segundos = time.perf_counter() - inicio
+
+    # Verificación: releer el destino y comparar sección por sección
+    copia = cargar_cache(almacen_destino)
+    diferentes = []
+    for clave, valor in cache.items():
+        if clave.startswith("_") or clave == "ultima_actualizacion":
+            continue
+        if copia.get(clave) != valor:
+            diferentes.append(clave)
+    if obtener_serie_fc(copia) != obtener_serie_fc(cache):
+        diferentes.append("serie FC")
+
+    print(f"📦 {almacen_origen} -> {almacen_destino} ({segundos:.2f}s)")
+    for clave, valor in cache.items():
+        if isinstance(valor, list) and not clave.startswith("_"):
+            print(f"   {clave:25s} {len(valor):>8}")
+    print(f"   {'serie FC (buckets)':25s} {len(obtener_serie_fc(cache)):>8}")
+
+    if diferentes:
+        print(f"❌ El destino no coincide con el origen en: {', '.join(diferentes)}")
+        return 1
+
+    print(f"✅ Migración verificada. Para usarlo: CACHE_BACKEND = \"{destino}\" en config.py")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(migrar(*sys.argv[1:3]))
@@ -9,18 +9,27 @@ ESTRATEGIA: SIN LIMPIEZA
 - Reporte por fuente para monitorear y detectar apps problemáticas
 """
 
+import os
 import sys
 import time
-from datetime import datetime
+from datetime import datetime, date
 
 # Imports de módulos propios
-from config import INTERVALO_MINUTOS
+from config import INTERVALO_MINUTOS, SALTAR_DIFF_VACIOS, OUTPUT_HTML
 from utils.logger import logger
-from core.cache import cargar_cache, guardar_cache, obtener_archivos_procesados, marcar_archivo_procesado
-from core.procesador import obtener_archivos_pendientes, procesar_archivo, mover_archivo_procesado
+from core.cache import (
+    cargar_cache, guardar_cache, obtener_archivos_procesados, marcar_archivo_procesado,
+    historial_reciente, cantidad_registros
+)
+from core.diario import obtener_diario
+from core.procesador import (
+    obtener_archivos_pendientes, procesar_archivo, procesar_archivos_paralelo,
+    procesar_archivos_coalescidos, mover_archivo_procesado,
+    es_diff_sin_cambios, descartar_diffs_sin_cambios
+)
 # from core.limpieza import validar_y_limpiar_ejercicios  # DESACTIVADO - sin duplicados en origen
 from metricas.pai import calcular_pai_semanal
-from metricas.fitness import calcular_vo2max
+from metricas.fitness import calcular_vo2max, tsb_diario
 from metricas.score import calcular_score_longevidad
 from outputs.dashboard import generar_dashboard
 from outputs.github import publicar_github
@@ -39,26 +48,63 @@ def procesar_datos_nuevos():
     
     # Obtener archivos pendientes
     archivos_procesados = obtener_archivos_procesados(cache)
-    archivos_nuevos = obtener_archivos_pendientes(archivos_procesados)
+    duplicados = []
+    archivos_nuevos = obtener_archivos_pendientes(archivos_procesados, duplicados)
+    
+    # 🗂️ Exports byte a byte idénticos a uno ya procesado: se marcan y mueven sin parsearlos
+    for archivo, original in duplicados:
+        logger.info(f"⏭️  Idéntico a {original}: {archivo}")
+        marcar_archivo_procesado(cache, archivo)
+        mover_archivo_procesado(archivo)
     
     if not archivos_nuevos:
         logger.info("No hay archivos nuevos para procesar.")
+        if duplicados:
+            guardar_cache(cache)
         return cache
     
     logger.info(f"Archivos nuevos encontrados: {archivos_nuevos}")
     
+    # ⚡ DIFF sin cambios: se marcan y mueven sin parsearlos (solo se lee la cabecera)
+    if SALTAR_DIFF_VACIOS:
+        vacios = [a for a in archivos_nuevos if es_diff_sin_cambios(a)]
+        for archivo in vacios:
+            logger.info(f"⏭️  DIFF sin cambios: {archivo}")
+            marcar_archivo_procesado(cache, archivo)
+            mover_archivo_procesado(archivo)
+        archivos_nuevos = [a for a in archivos_nuevos if a not in vacios]
+        
+        if not archivos_nuevos:
+            guardar_cache(cache)
+            return cache
+    
+    from config import INPUT_DIR, INGESTA_WORKERS, COALESCER_DIFF
+    import os
+    rutas = [os.path.join(INPUT_DIR, archivo) for archivo in archivos_nuevos]
+    
+    # 🧩 Los DIFF acumulados se combinan en un solo delta (se aplica una vez).
+    # ⚡ Con varios workers se extrae en paralelo; los resultados se aplican
+    # al cache en el mismo orden que el procesamiento secuencial
+    if COALESCER_DIFF and len(rutas) > 1:
+        resultados = procesar_archivos_coalescidos(rutas, cache, INGESTA_WORKERS)
+    elif INGESTA_WORKERS > 1 and len(rutas) > 1:
+        resultados = procesar_archivos_paralelo(rutas, cache, INGESTA_WORKERS)
+    else:
+        resultados = (procesar_archivo(ruta, cache) for ruta in rutas)
+    
     # Procesar cada archivo
-    for archivo in archivos_nuevos:
+    for archivo, campos in zip(archivos_nuevos, resultados):
         es_full = "FULL" in archivo.upper()
         es_diff = "DIFF" in archivo.upper()
         
         tipo_archivo = "FULL" if es_full else ("DIFF" if es_diff else "UNKNOWN")
-        logger.info(f"→ Procesando [{tipo_archivo}]: {archivo}")
         
-        # Procesar archivo
-        from config import INPUT_DIR
-        import os
-        campos = procesar_archivo(os.path.join(INPUT_DIR, archivo), cache)
+        # Archivo ilegible (ej: todavía se está copiando): no se marca ni se mueve
+        if campos is None:
+            logger.error(f"✗ No se pudo leer [{tipo_archivo}]: {archivo} (queda para el próximo ciclo)")
+            continue
+        
+        logger.info(f"→ Procesado [{tipo_archivo}]: {archivo}")
         
         if campos:
             logger.info(f"  Campos detectados: {', '.join(campos)}")
@@ -72,6 +118,10 @@ def procesar_datos_nuevos():
         marcar_archivo_procesado(cache, archivo)
         mover_archivo_procesado(archivo)
     
+    # 📈 Serie diaria del TSB: se recorre solo desde el primer día con
+    # entrenamientos nuevos o borrados y se guarda con el cache
+    tsb_diario(cache)
+    
     # Guardar cache actualizado
     guardar_cache(cache)
     
@@ -83,15 +133,15 @@ def mostrar_resumen(cache):
     Muestra resumen de métricas en consola.
     🤫 Llama a calcular_pai_semanal en modo SILENCIOSO (sin logs)
     """
-    ejercicios = cache.get("ejercicio", [])
-    peso = cache.get("peso", [])
+    ejercicios = historial_reciente(cache, "ejercicio")
+    peso = historial_reciente(cache, "peso")
     
     # Corrección de seguridad: Usar .get() o [0] con validación en la lógica de su proyecto
     # Asumo que su lógica interna ya extrae el peso actual correctamente.
     peso_actual = peso[-1]["peso"] if peso and peso[-1].get("peso") is not None else None
     
     # 🤫 LLAMADA SILENCIOSA - No imprime logs
-    pai_semanal = calcular_pai_semanal(ejercicios, silencioso=True)
+    pai_semanal = calcular_pai_semanal(obtener_diario(cache, "ejercicio"), silencioso=True)
     vo2max = calcular_vo2max(ejercicios)
     
     # Aseguramos que la función reciba el peso actual (o None)
@@ -107,10 +157,18 @@ def mostrar_resumen(cache):
     logger.info(f"PAI Semanal: {pai_semanal:.1f} (objetivo ≥{PAI_OBJETIVO_SEMANAL})")
     logger.info(f"VO2max: {vo2max} ml/kg/min")
     logger.info(f"Peso: {peso_actual:.1f} kg (objetivo {PESO_OBJETIVO})" if peso_actual is not None else f"Peso: Dato no disponible (objetivo {PESO_OBJETIVO})")
-    logger.info(f"Total entrenamientos únicos: {len(ejercicios)}")
+    logger.info(f"Total entrenamientos únicos: {cantidad_registros(cache, 'ejercicio')}")
     logger.info("=" * 80)
 
 
+def _dashboard_de_hoy():
+    """El dashboard ya se generó hoy (las ventanas "últimos 7/30 días" siguen al día)"""
+    try:
+        return date.fromtimestamp(os.path.getmtime(OUTPUT_HTML)) == date.today()
+    except OSError:
+        return False
+
+
 def ciclo_principal():
     """
     Ejecuta un ciclo completo:
@@ -124,6 +182,16 @@ def ciclo_principal():
     logger.info("=" * 80)
     
     try:
+        # ⚡ Camino rápido: si lo único pendiente eran DIFF sin cambios y el
+        # dashboard ya es de hoy, no se carga el cache ni se regenera/publica.
+        # Sin nada pendiente (o en un día nuevo) se regenera igual: las
+        # ventanas relativas a hoy cambian aunque no lleguen datos
+        if SALTAR_DIFF_VACIOS:
+            descartados, con_datos = descartar_diffs_sin_cambios()
+            if descartados and not con_datos and _dashboard_de_hoy():
+                logger.info("Solo DIFF sin cambios: no se regenera el dashboard.")
+                return
+        
         # Procesar datos
         cache = procesar_datos_nuevos()
         
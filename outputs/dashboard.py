@@ -5,8 +5,12 @@ Dashboard Generator - Orquestador Principal MODULAR
 Coordina todos los módulos de generación del dashboard
 """
 
-from datetime import datetime, timedelta
 from config import OUTPUT_HTML, EDAD, ALTURA_CM
+from core import tiempo
+from core.serie_fc import obtener_serie_fc, vista_fc_reposo, vista_frecuencia_cardiaca
+from core.columnas import obtener_columnas
+from core.cache import historial_reciente
+from core.diario import obtener_diario
 from utils.logger import logger
 from utils.logs_helper import leer_ultimos_logs, generar_resumen_ejecucion, formatear_logs_html
 
@@ -25,12 +29,12 @@ from outputs.prep_graficos_body import (
     preparar_datos_tasa_metabolica
 )
 from outputs.prep_graficos_cardio import (
-    preparar_datos_fc_reposo, preparar_datos_fc_diurna,
+    preparar_datos_fc_reposo, preparar_datos_fc_diurna, preparar_datos_fc_intradia,
     preparar_datos_presion_arterial, preparar_datos_spo2, preparar_datos_glucosa
 )
 
 # Módulos de TSB
-from metricas.fitness import preparar_datos_tsb_historico
+from metricas.fitness import preparar_datos_tsb_historico, tsb_diario
 
 # Módulos de plan de acción
 from metricas.plan_accion import generar_plan_accion, renderizar_plan_accion_html
@@ -67,30 +71,36 @@ def generar_dashboard(cache):
     logger.info("Generando dashboard HTML con gráficos...")
     
     # 1. EXTRAER DATOS DEL CACHE
-    ejercicios = cache.get("ejercicio", [])
-    peso = cache.get("peso", [])
-    sueno = cache.get("sueno", [])
-    spo2 = cache.get("spo2", [])
-    grasa_corporal = cache.get("grasa_corporal", [])
-    masa_muscular = cache.get("masa_muscular", [])
-    vo2max_medido = cache.get("vo2max", [])
-    fc_reposo = cache.get("fc_reposo", [])
-    pasos = cache.get("pasos", [])
-    presion_arterial = cache.get("presion_arterial", [])
-    glucosa = cache.get("glucosa", [])
-    masa_osea = cache.get("masa_osea", [])
-    masa_agua = cache.get("masa_agua", [])
-    tasa_metabolica = cache.get("tasa_metabolica", [])
-    distancia = cache.get("distancia", [])
-    calorias_totales = cache.get("calorias_totales", [])
-    nutrition = cache.get("nutrition", [])
-    frecuencia_cardiaca = cache.get("frecuencia_cardiaca", [])
+    # 🗂️ Con el almacén por secciones se leen solo los meses recientes; el TSB
+    # sigue desde un checkpoint del EWMA en vez de recorrer toda la historia.
+    # 📈 La serie diaria del EWMA está guardada en el cache: solo se recorren
+    # los días desde el primero con entrenamientos nuevos o borrados
+    estado_tsb, ejercicios, diario_tsb = tsb_diario(cache)
+    # 📅 PAI desde la tabla diaria de ejercicio (ventanas con sumas prefijas)
+    diario_ejercicio = obtener_diario(cache, "ejercicio")
+    peso = historial_reciente(cache, "peso")
+    sueno = historial_reciente(cache, "sueno")
+    spo2 = historial_reciente(cache, "spo2")
+    grasa_corporal = historial_reciente(cache, "grasa_corporal")
+    masa_muscular = historial_reciente(cache, "masa_muscular")
+    vo2max_medido = historial_reciente(cache, "vo2max")
+    # ⚡ Vistas de la serie FC compacta, solo la ventana que usan gráficos y métricas
+    fc_reposo = vista_fc_reposo(cache, dias=31)
+    # 📊 Series columnares (mmap si el archivo está al día, ver core/columnas.py)
+    pasos = obtener_columnas(cache, "pasos")
+    presion_arterial = historial_reciente(cache, "presion_arterial")
+    glucosa = historial_reciente(cache, "glucosa")
+    tasa_metabolica = historial_reciente(cache, "tasa_metabolica")
+    calorias_totales = obtener_columnas(cache, "calorias_totales")
+    nutrition = historial_reciente(cache, "nutrition")
+    frecuencia_cardiaca = vista_frecuencia_cardiaca(cache, dias=31)
     
     # 2. CALCULAR MÉTRICAS
     metricas = calcular_metricas(
         ejercicios, peso, sueno, spo2, grasa_corporal,
         masa_muscular, vo2max_medido, fc_reposo, pasos, presion_arterial,
-        nutrition, tasa_metabolica, calorias_totales, glucosa
+        nutrition, tasa_metabolica, calorias_totales, glucosa,
+        estado_tsb=estado_tsb, tsb_diario=diario_tsb, diario_ejercicio=diario_ejercicio
     )
     
     # 3. PROCESAR LABORATORIO (si está disponible)
@@ -109,25 +119,29 @@ def generar_dashboard(cache):
             logger.error(f"Error procesando laboratorio: {e}")
     
     # 4. PREPARAR DATOS PARA GRÁFICOS
+    # 📅 Los gráficos por día leen la tabla diaria de cada sección (agregada al
+    # ingestar): el costo depende de los días de la ventana, no de los registros
+    diario = lambda seccion: obtener_diario(cache, seccion)
     datos_graficos = {
-        "pai": preparar_datos_pai_completo(ejercicios),
-        "peso": preparar_datos_peso_deduplicado(peso),
-        "tsb": preparar_datos_tsb_historico(ejercicios),
-        "sueno": preparar_datos_sueno(sueno),
-        "spo2": preparar_datos_spo2(spo2),
-        "grasa": preparar_datos_metrica_corporal(grasa_corporal, "porcentaje"),
-        "masa_muscular": preparar_datos_metrica_corporal(masa_muscular, "masa_kg"),
+        "pai": preparar_datos_pai_completo(diario_ejercicio),
+        "peso": preparar_datos_peso_deduplicado(diario("peso")),
+        "tsb": preparar_datos_tsb_historico(ejercicios, estado_tsb, diario_tsb),
+        "sueno": preparar_datos_sueno(diario("sueno")),
+        "spo2": preparar_datos_spo2(diario("spo2")),
+        "grasa": preparar_datos_metrica_corporal(diario("grasa_corporal"), "porcentaje"),
+        "masa_muscular": preparar_datos_metrica_corporal(diario("masa_muscular"), "masa_kg"),
         "fc_reposo": preparar_datos_fc_reposo(fc_reposo),
         "frecuencia_cardiaca": preparar_datos_fc_diurna(frecuencia_cardiaca),
-        "pasos": preparar_datos_pasos(pasos),
-        "presion_arterial": preparar_datos_presion_arterial(presion_arterial),
+        "fc_intradia": preparar_datos_fc_intradia(obtener_serie_fc(cache)),
+        "pasos": preparar_datos_pasos(diario("pasos")),
+        "presion_arterial": preparar_datos_presion_arterial(diario("presion_arterial")),
         "glucosa": preparar_datos_glucosa(glucosa),
-        "masa_osea": preparar_datos_metrica_corporal(masa_osea, "masa_kg"),
-        "masa_agua": preparar_datos_metrica_corporal(masa_agua, "masa_kg"),
-        "tasa_metabolica": preparar_datos_tasa_metabolica(tasa_metabolica),
-        "distancia": preparar_datos_distancia(distancia),
-        "calorias_totales": preparar_datos_calorias(calorias_totales),
-        "nutrition": preparar_datos_nutrition(nutrition, dias=14),
+        "masa_osea": preparar_datos_metrica_corporal(diario("masa_osea"), "masa_kg"),
+        "masa_agua": preparar_datos_metrica_corporal(diario("masa_agua"), "masa_kg"),
+        "tasa_metabolica": preparar_datos_tasa_metabolica(diario("tasa_metabolica")),
+        "distancia": preparar_datos_distancia(diario("distancia")),
+        "calorias_totales": preparar_datos_calorias(diario("calorias_totales")),
+        "nutrition": preparar_datos_nutrition(diario("nutrition"), dias=14),
         "deficit": calcular_deficit_calorico(nutrition, tasa_metabolica, calorias_totales, dias=14)
     }
     
@@ -204,10 +218,6 @@ def _obtener_entrenamientos_recientes(ejercicios, dias=7):
     if not ejercicios:
         return []
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        e for e in ejercicios
-        if datetime.fromisoformat(e["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
+    recientes = tiempo.en_ventana(ejercicios, dias)
     recientes.sort(key=lambda x: x["fecha"], reverse=True)
     return recientes[:10]
\ No newline at end of file
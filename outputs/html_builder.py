@@ -145,6 +145,10 @@ def construir_html_completo(html_laboratorio, cards_html, entrenamientos_html,
                         <h3>FC Diurna (Continua)</h3>
                         <div id="fc-diurna-chart"></div>
                     </div>
+                    <div class="chart-container">
+                        <h3>FC Intradía (minuto a minuto)</h3>
+                        <div id="fc-intradia-chart"></div>
+                    </div>
                     <div class="chart-container">
                         <h3>Pasos Diarios</h3>
                         <div id="pasos-chart"></div>
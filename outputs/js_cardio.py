@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 JavaScript - Gráficos Cardiovasculares
-Genera código JS para FC reposo, FC diurna, presión arterial y SpO2
+Genera código JS para FC reposo, FC diurna, FC intradía, presión arterial y SpO2
 """
 
 from outputs.js_helpers import tiene_datos
@@ -120,6 +120,42 @@ def generar_grafico_fc_diurna(datos_graficos):
         """
 
 
+def generar_grafico_fc_intradia(datos_graficos):
+    """Genera JavaScript para el gráfico de FC minuto a minuto del último día"""
+    datos = datos_graficos.get('fc_intradia', {})
+    if tiene_datos(datos):
+        return f"""
+        // FC Intradía (minuto a minuto)
+        Plotly.newPlot('fc-intradia-chart', [
+            {{
+                x: {datos['fechas']},
+                y: {datos['bpm_promedio']},
+                type: 'scatter',
+                mode: 'lines',
+                name: 'Promedio',
+                line: {{ color: '#ffa657', width: 1 }}
+            }},
+            {{
+                x: {datos['fechas']},
+                y: {datos['bpm_max']},
+                type: 'scatter',
+                mode: 'markers',
+                name: 'Máxima',
+                marker: {{ color: '#f85149', size: 3 }}
+            }}
+        ], {{
+            ...layout_config,
+            title: {{ text: '{datos['dia']}', font: {{ color: '#c9d1d9', size: 12 }} }},
+            yaxis: {{ title: 'FC (bpm)', gridcolor: '#30363d' }},
+            xaxis: {{ gridcolor: '#30363d' }}
+        }});
+        """
+    else:
+        return """
+        document.getElementById('fc-intradia-chart').innerHTML = '<div class="chart-empty">Sin datos de FC intradía</div>';
+        """
+
+
 def generar_grafico_presion_arterial(datos_graficos):
     """Genera JavaScript para el gráfico de presión arterial"""
     if tiene_datos(datos_graficos.get('presion_arterial', {})):
@@ -182,6 +218,7 @@ def generar_js_cardio(datos_graficos):
     js = ""
     js += generar_grafico_fc_reposo(datos_graficos)
     js += generar_grafico_fc_diurna(datos_graficos)
+    js += generar_grafico_fc_intradia(datos_graficos)
     js += generar_grafico_presion_arterial(datos_graficos)
     js += generar_grafico_spo2(datos_graficos)
     return js
\ No newline at end of file
@@ -7,11 +7,18 @@ Prepara datos para gráficos de PAI, TSB, pasos, sueño, nutrition y déficit
 
 from datetime import datetime, timedelta
 from collections import defaultdict
+from config import PAI_VENTANA_DIAS
 from metricas.fitness import preparar_datos_tsb_historico
+from core import tiempo
+from core.diario import COMIDAS, tabla_diaria
+from core.columnas import valores_por_dia
 
 
 def preparar_datos_pai_completo(ejercicios_data, dias=30):
-    """Prepara datos de PAI diario + ventana móvil"""
+    """
+    Prepara datos de PAI diario + ventana móvil.
+    ejercicios_data: lista del cache o su TablaDiaria (core/diario.py)
+    """
     if not ejercicios_data:
         return {
             "fechas": [],
@@ -19,26 +26,17 @@ def preparar_datos_pai_completo(ejercicios_data, dias=30):
             "pai_ventana_movil": []
         }
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        e for e in ejercicios_data
-        if datetime.fromisoformat(e["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
-    
-    pai_por_dia = defaultdict(float)
-    for e in recientes:
-        fecha = datetime.fromisoformat(e["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        pai_por_dia[fecha] += e.get("pai", 0)
+    tabla = tabla_diaria(ejercicios_data)
     
-    fechas = sorted(pai_por_dia.keys())
-    pai_diario = [pai_por_dia[f] for f in fechas]
+    # Días con entrenamientos de los últimos `dias` días (misma ventana que los otros gráficos)
+    dias_ordenados = tabla.dias(tiempo.dia_limite(dias))
+    fechas = [tiempo.dia_iso(d) for d in dias_ordenados]
+    pai_diario = [tabla.valor("pai", d) for d in dias_ordenados]
     
-    # Ventana móvil de 7 días
-    pai_ventana_movil = []
-    for i, fecha in enumerate(fechas):
-        inicio = max(0, i - 6)
-        suma_ventana = sum(pai_diario[inicio:i + 1])
-        pai_ventana_movil.append(suma_ventana)
+    # Ventana móvil de 7 días (calendario, como el PAI semanal): resta de sumas prefijas
+    pai_ventana_movil = [
+        round(tabla.suma("pai", d - PAI_VENTANA_DIAS + 1, d), 1) for d in dias_ordenados
+    ]
     
     return {
         "fechas": fechas,
@@ -48,26 +46,19 @@ def preparar_datos_pai_completo(ejercicios_data, dias=30):
 
 
 def preparar_datos_pasos(pasos_data, dias=30):
-    """Prepara datos de pasos diarios (Samsung guarda valores acumulados)"""
+    """
+    Prepara datos de pasos diarios (Samsung guarda valores acumulados)
+    pasos_data: lista del cache o su TablaDiaria (core/diario.py)
+    """
     if not pasos_data:
         return {"fechas": [], "valores": []}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        p for p in pasos_data
-        if datetime.fromisoformat(p["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
+    # Máximo por día (Samsung guarda acumulados), ya agregado en la tabla diaria
+    tabla = tabla_diaria(pasos_data, "pasos")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
     
-    # Agrupar por día y tomar MÁXIMO (Samsung guarda acumulados)
-    por_dia = {}
-    for p in recientes:
-        fecha = datetime.fromisoformat(p["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        if fecha not in por_dia:
-            por_dia[fecha] = []
-        por_dia[fecha].append(p["pasos"])
-    
-    fechas = sorted(por_dia.keys())
-    valores = [max(por_dia[f]) for f in fechas]
+    valores = [tabla.valor("pasos", d) for d in dias_ventana]
+    fechas = [tiempo.dia_iso(d) for d in dias_ventana]
     
     return {"fechas": fechas, "valores": valores}
 
@@ -75,7 +66,7 @@ def preparar_datos_pasos(pasos_data, dias=30):
 def preparar_datos_sueno(sueno_data, dias=14):
     """
     Prepara datos de sueño para gráfico de barras apiladas.
-    Últimos 14 días con todas las fases.
+    Últimos 14 días con todas las fases (en horas, sumadas si hay múltiples sesiones).
     """
     if not sueno_data:
         return {
@@ -86,80 +77,42 @@ def preparar_datos_sueno(sueno_data, dias=14):
             "rem": []
         }
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        s for s in sueno_data
-        if datetime.fromisoformat(s["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
-    
-    # Agrupar por día (sumar si hay múltiples sesiones)
-    por_dia = defaultdict(lambda: {"awake": 0, "light": 0, "deep": 0, "rem": 0})
-    for s in recientes:
-        fecha = datetime.fromisoformat(s["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        por_dia[fecha]["awake"] += s.get("awake", 0) / 60  # Convertir a horas
-        por_dia[fecha]["light"] += s.get("light", 0) / 60
-        por_dia[fecha]["deep"] += s.get("deep", 0) / 60
-        por_dia[fecha]["rem"] += s.get("rem", 0) / 60
-    
-    fechas = sorted(por_dia.keys())
-    awake = [por_dia[f]["awake"] for f in fechas]
-    light = [por_dia[f]["light"] for f in fechas]
-    deep = [por_dia[f]["deep"] for f in fechas]
-    rem = [por_dia[f]["rem"] for f in fechas]
+    tabla = tabla_diaria(sueno_data, "sueno")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
     
     return {
-        "fechas": fechas,
-        "awake": awake,
-        "light": light,
-        "deep": deep,
-        "rem": rem
+        "fechas": [tiempo.dia_iso(d) for d in dias_ventana],
+        "awake": [tabla.valor("awake", d) for d in dias_ventana],
+        "light": [tabla.valor("light", d) for d in dias_ventana],
+        "deep": [tabla.valor("deep", d) for d in dias_ventana],
+        "rem": [tabla.valor("rem", d) for d in dias_ventana]
     }
 
 
 def preparar_datos_distancia(distancia_data, dias=90):
-    """Prepara datos de distancia recorrida"""
+    """Prepara datos de distancia recorrida (suma del día)"""
     if not distancia_data:
         return {"fechas": [], "valores": []}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        d for d in distancia_data
-        if datetime.fromisoformat(d["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
-    
-    por_dia = {}
-    for d in recientes:
-        fecha = datetime.fromisoformat(d["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        if fecha not in por_dia:
-            por_dia[fecha] = []
-        por_dia[fecha].append(d.get("distancia_km", 0))
+    tabla = tabla_diaria(distancia_data, "distancia")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
     
-    fechas = sorted(por_dia.keys())
-    valores = [sum(por_dia[f]) for f in fechas]  # Sumar distancia del día
+    valores = [tabla.valor("distancia_km", d) for d in dias_ventana]
+    fechas = [tiempo.dia_iso(d) for d in dias_ventana]
     
     return {"fechas": fechas, "valores": valores}
 
 
 def preparar_datos_calorias(calorias_data, dias=90):
-    """Prepara datos de calorías totales quemadas"""
+    """Prepara datos de calorías totales quemadas (suma del día)"""
     if not calorias_data:
         return {"fechas": [], "valores": []}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        c for c in calorias_data
-        if datetime.fromisoformat(c["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
+    tabla = tabla_diaria(calorias_data, "calorias_totales")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
     
-    por_dia = {}
-    for c in recientes:
-        fecha = datetime.fromisoformat(c["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        if fecha not in por_dia:
-            por_dia[fecha] = []
-        por_dia[fecha].append(c.get("energia_kcal", 0))
-    
-    fechas = sorted(por_dia.keys())
-    valores = [sum(por_dia[f]) for f in fechas]  # Sumar calorías del día
+    valores = [tabla.valor("energia_kcal", d) for d in dias_ventana]
+    fechas = [tiempo.dia_iso(d) for d in dias_ventana]
     
     return {"fechas": fechas, "valores": valores}
 
@@ -168,7 +121,7 @@ def preparar_datos_nutrition(nutrition_data, dias=14):
     """
     Prepara datos de nutrición agrupados por día.
     ✅ MODIFICADO: 14 días en lugar de 7
-    Calcula totales diarios de calorías y macronutrientes.
+    Totales diarios de calorías y macronutrientes (tabla diaria de nutrition).
     """
     if not nutrition_data:
         return {
@@ -185,55 +138,19 @@ def preparar_datos_nutrition(nutrition_data, dias=14):
             }
         }
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        n for n in nutrition_data
-        if datetime.fromisoformat(n["timestamp"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
+    tabla = tabla_diaria(nutrition_data, "nutrition")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
     
-    por_dia = defaultdict(lambda: {
-        "calorias": 0,
-        "proteinas": 0,
-        "carbohidratos": 0,
-        "grasas": 0,
-        "desayuno": 0,
-        "almuerzo": 0,
-        "cena": 0,
-        "snack": 0
-    })
-    
-    meal_type_map = {
-        1: "desayuno",
-        2: "almuerzo",
-        3: "cena",
-        4: "snack"
-    }
-    
-    for n in recientes:
-        fecha = datetime.fromisoformat(n["timestamp"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        por_dia[fecha]["calorias"] += n.get("energy_kcal", 0)
-        por_dia[fecha]["proteinas"] += n.get("protein_g", 0)
-        por_dia[fecha]["carbohidratos"] += n.get("carbs_g", 0)
-        por_dia[fecha]["grasas"] += n.get("fat_total_g", 0)
-        
-        meal_type = n.get("meal_type", 0)
-        meal_name = meal_type_map.get(meal_type, "snack")
-        por_dia[fecha][meal_name] += n.get("energy_kcal", 0)
-    
-    fechas = sorted(por_dia.keys())
+    def columna(nombre, decimales):
+        return [round(tabla.valor(nombre, d), decimales) for d in dias_ventana]
     
     return {
-        "fechas": fechas,
-        "calorias": [round(por_dia[f]["calorias"], 0) for f in fechas],
-        "proteinas": [round(por_dia[f]["proteinas"], 1) for f in fechas],
-        "carbohidratos": [round(por_dia[f]["carbohidratos"], 1) for f in fechas],
-        "grasas": [round(por_dia[f]["grasas"], 1) for f in fechas],
-        "por_comida": {
-            "desayuno": [round(por_dia[f]["desayuno"], 0) for f in fechas],
-            "almuerzo": [round(por_dia[f]["almuerzo"], 0) for f in fechas],
-            "cena": [round(por_dia[f]["cena"], 0) for f in fechas],
-            "snack": [round(por_dia[f]["snack"], 0) for f in fechas]
-        }
+        "fechas": [tiempo.dia_iso(d) for d in dias_ventana],
+        "calorias": columna("calorias", 0),
+        "proteinas": columna("proteinas", 1),
+        "carbohidratos": columna("carbohidratos", 1),
+        "grasas": columna("grasas", 1),
+        "por_comida": {comida: columna(comida, 0) for comida in COMIDAS.values()}
     }
 
 
@@ -256,8 +173,7 @@ def calcular_deficit_calorico(nutrition_data, tmb_data, calorias_data, dias=14):
     if nutrition_data:
         for n in nutrition_data:
             try:
-                fecha = datetime.fromisoformat(n["timestamp"].replace("Z", "+00:00"))
-                dia = fecha.strftime("%Y-%m-%d")
+                dia = tiempo.dia_iso(tiempo.dia(n))
                 comido_por_dia[dia] += n.get("energy_kcal", 0)
             except:
                 continue
@@ -267,22 +183,19 @@ def calcular_deficit_calorico(nutrition_data, tmb_data, calorias_data, dias=14):
     if tmb_data:
         for t in tmb_data:
             try:
-                fecha = datetime.fromisoformat(t["timestamp"].replace("Z", "+00:00"))
-                dia = fecha.strftime("%Y-%m-%d")
+                dia = tiempo.dia_iso(tiempo.dia(t))
                 tmb_por_dia[dia] = t.get("kcal_dia", 1700)
             except:
                 continue
     
     # Agrupar EJERCICIO por día
+    # ⚡ Solo los días candidatos (calorias_data puede ser SerieColumnar)
     ejercicio_por_dia = defaultdict(float)
     if calorias_data:
-        for c in calorias_data:
-            try:
-                fecha = datetime.fromisoformat(c.get("fecha", c.get("timestamp", "")).replace("Z", "+00:00"))
-                dia = fecha.strftime("%Y-%m-%d")
-                ejercicio_por_dia[dia] += c.get("energia_kcal", 0)
-            except:
-                continue
+        por_dia = valores_por_dia(calorias_data, "energia_kcal", desde_dia=hoy.toordinal() - (dias - 1))
+        for dia, valores in por_dia.items():
+            for valor in valores:
+                ejercicio_por_dia[tiempo.dia_iso(dia)] += valor
     
     # Filtrar solo días con AL MENOS un dato real
     fechas_con_datos = []
@@ -329,8 +242,8 @@ def calcular_circulo_hoy(nutrition_data, tmb_data, calorias_data):
     """
     from utils.logger import logger
     
-    hoy = datetime.now().strftime("%Y-%m-%d")
-    logger.info(f"🔍 Calculando círculo para HOY: {hoy}")
+    hoy = datetime.now().toordinal()
+    logger.info(f"🔍 Calculando círculo para HOY: {tiempo.dia_iso(hoy)}")
     
     # Comido hoy
     comido = 0
@@ -343,9 +256,7 @@ def calcular_circulo_hoy(nutrition_data, tmb_data, calorias_data):
         registros_hoy = 0
         for n in nutrition_data:
             try:
-                fecha = datetime.fromisoformat(n["timestamp"].replace("Z", "+00:00"))
-                dia = fecha.strftime("%Y-%m-%d")
-                if dia == hoy:
+                if tiempo.dia(n) == hoy:
                     registros_hoy += 1
                     comido += n.get("energy_kcal", 0)
                     proteinas += n.get("protein_g", 0)
@@ -363,8 +274,7 @@ def calcular_circulo_hoy(nutrition_data, tmb_data, calorias_data):
     if tmb_data:
         for t in tmb_data:
             try:
-                fecha = datetime.fromisoformat(t["timestamp"].replace("Z", "+00:00"))
-                if fecha.strftime("%Y-%m-%d") == hoy:
+                if tiempo.dia(t) == hoy:
                     tmb = t.get("kcal_dia", 1700)
                     logger.info(f"✅ TMB HOY: {tmb} kcal")
                     break
@@ -374,14 +284,9 @@ def calcular_circulo_hoy(nutrition_data, tmb_data, calorias_data):
     # Ejercicio hoy
     ejercicio = 0
     if calorias_data:
-        for c in calorias_data:
-            try:
-                # ✅ CORRECCIÓN: calorias_totales usa 'fecha' no 'timestamp'
-                fecha = datetime.fromisoformat(c.get("fecha", c.get("timestamp", "")).replace("Z", "+00:00"))
-                if fecha.strftime("%Y-%m-%d") == hoy:
-                    ejercicio += c.get("energia_kcal", 0)
-            except:
-                continue
+        # ⚡ calorias_data puede ser SerieColumnar: solo se leen los registros de hoy
+        for valor in valores_por_dia(calorias_data, "energia_kcal", desde_dia=hoy).get(hoy, []):
+            ejercicio += valor
         logger.info(f"✅ Ejercicio HOY: {ejercicio} kcal")
     
     presupuesto = tmb + ejercicio
@@ -440,8 +345,7 @@ def calcular_macros_promedio_7d(nutrition_data):
     
     for n in nutrition_data:
         try:
-            fecha = datetime.fromisoformat(n["timestamp"].replace("Z", "+00:00"))
-            dia = fecha.strftime("%Y-%m-%d")
+            dia = tiempo.dia_iso(tiempo.dia(n))
             
             if dia in por_dia:
                 por_dia[dia]["proteinas"] += n.get("protein_g", 0)
@@ -5,7 +5,9 @@ Preparadores de Gráficos - Composición Corporal
 Prepara datos para gráficos de peso, grasa, masa muscular, masa ósea, masa agua, TMB
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from core import tiempo
+from core.diario import tabla_diaria
 
 def _calcular_regresion_lineal(fechas_str, valores, unidad="kg"):
     """
@@ -68,33 +70,23 @@ def _calcular_regresion_lineal(fechas_str, valores, unidad="kg"):
     }
 
 
+def _promedios_por_dia(tabla, columna, dias):
+    """Días de la ventana con datos (ISO) y el promedio del día de la columna"""
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
+    fechas = [tiempo.dia_iso(d) for d in dias_ventana]
+    valores = [tabla.promedio(columna, d) for d in dias_ventana]
+    return fechas, valores
+
+
 def preparar_datos_peso_deduplicado(peso_data, dias=90):
     """
-    Prepara datos de peso DEDUPLICADOS y calcula TENDENCIA.
+    Prepara datos de peso DEDUPLICADOS (promedio del día) y calcula TENDENCIA.
+    peso_data: lista del cache o su TablaDiaria (core/diario.py)
     """
     if not peso_data:
         return {"fechas": [], "valores": [], "tendencia": None}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    
-    # Ordenar
-    datos_ordenados = sorted(peso_data, key=lambda x: x.get("fecha", ""))
-    
-    recientes = [
-        p for p in datos_ordenados
-        if datetime.fromisoformat(p["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
-    
-    # Deduplicar por día
-    por_dia = {}
-    for p in recientes:
-        fecha = datetime.fromisoformat(p["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        if fecha not in por_dia:
-            por_dia[fecha] = []
-        por_dia[fecha].append(p["peso"])
-    
-    fechas = sorted(por_dia.keys())
-    valores = [sum(por_dia[f]) / len(por_dia[f]) for f in fechas]
+    fechas, valores = _promedios_por_dia(tabla_diaria(peso_data, "peso"), "peso", dias)
     
     # Calcular tendencia
     tendencia = None
@@ -108,29 +100,12 @@ def preparar_datos_metrica_corporal(datos, campo, dias=90):
     """
     Prepara datos de métricas corporales (Grasa, Músculo, etc.)
     Calcula tendencia automáticamente.
+    datos: lista del cache o su TablaDiaria (con la columna campo)
     """
     if not datos:
         return {"fechas": [], "valores": [], "tendencia": None}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    
-    # Ordenar
-    datos_ordenados = sorted(datos, key=lambda x: x.get("fecha", ""))
-    
-    recientes = [
-        d for d in datos_ordenados
-        if datetime.fromisoformat(d["fecha"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
-    
-    por_dia = {}
-    for d in recientes:
-        fecha = datetime.fromisoformat(d["fecha"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        if fecha not in por_dia:
-            por_dia[fecha] = []
-        por_dia[fecha].append(d.get(campo, 0))
-    
-    fechas = sorted(por_dia.keys())
-    valores = [sum(por_dia[f]) / len(por_dia[f]) for f in fechas]
+    fechas, valores = _promedios_por_dia(tabla_diaria(datos, campos={campo: campo}), campo, dias)
     
     # Determinar unidad para la tendencia
     unidad = "%" if "porcentaje" in campo else "kg"
@@ -143,24 +118,10 @@ def preparar_datos_metrica_corporal(datos, campo, dias=90):
 
 
 def preparar_datos_tasa_metabolica(tmb_data, dias=90):
-    """Prepara datos de tasa metabólica basal"""
+    """Prepara datos de tasa metabólica basal (promedio del día)"""
     if not tmb_data:
         return {"fechas": [], "valores": []}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [
-        t for t in tmb_data
-        if datetime.fromisoformat(t["timestamp"].replace("Z", "+00:00")).replace(tzinfo=None) >= fecha_limite
-    ]
-    
-    por_dia = {}
-    for t in recientes:
-        fecha = datetime.fromisoformat(t["timestamp"].replace("Z", "+00:00")).strftime("%Y-%m-%d")
-        if fecha not in por_dia:
-            por_dia[fecha] = []
-        por_dia[fecha].append(t.get("kcal_dia", 0))
-    
-    fechas = sorted(por_dia.keys())
-    valores = [sum(por_dia[f]) / len(por_dia[f]) for f in fechas]
+    fechas, valores = _promedios_por_dia(tabla_diaria(tmb_data, "tasa_metabolica"), "kcal_dia", dias)
     
-    return {"fechas": fechas, "valores": valores}
\ No newline at end of file
+    return {"fechas": fechas, "valores": valores}
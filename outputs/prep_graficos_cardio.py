@@ -2,10 +2,12 @@
 # -*- coding: utf-8 -*-
 """
 Preparadores de Gráficos - Salud Cardiovascular
-Prepara datos para gráficos de FC reposo, FC diurna, presión arterial, SpO2, glucosa
+Prepara datos para gráficos de FC reposo, FC diurna, FC intradía, presión arterial, SpO2, glucosa
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from core import tiempo
+from core.diario import tabla_diaria
 
 def _calcular_regresion(fechas_str, valores, unidad=""):
     """Calcula regresión lineal simple."""
@@ -50,12 +52,12 @@ def _calcular_regresion(fechas_str, valores, unidad=""):
 
 def preparar_datos_fc_reposo(fc_reposo_data, dias=30):
     if not fc_reposo_data: return {"fechas": [], "valores": [], "tendencia": None}
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [fc for fc in sorted(fc_reposo_data, key=lambda x: x.get("fecha")) if datetime.fromisoformat(fc["fecha"].replace("Z", "")).replace(tzinfo=None) >= fecha_limite]
+    # ⚡ La vista de la serie FC ya viene ordenada: la ventana es un bisect
+    recientes = tiempo.en_ventana(tiempo.ordenados(fc_reposo_data), dias)
     
     por_dia = {}
     for fc in recientes:
-        fecha = datetime.fromisoformat(fc["fecha"].replace("Z", "")).strftime("%Y-%m-%d")
+        fecha = tiempo.dia_iso(tiempo.dia(fc))
         por_dia.setdefault(fecha, []).append(fc["bpm"])
     
     fechas = sorted(por_dia.keys())
@@ -70,11 +72,10 @@ def preparar_datos_fc_reposo(fc_reposo_data, dias=30):
 
 def preparar_datos_fc_diurna(fc_diurna_data, dias=30):
     if not fc_diurna_data: return {"fechas": [], "bpm_min": [], "bpm_max": [], "bpm_promedio": []}
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [fc for fc in fc_diurna_data if datetime.fromisoformat(fc["fecha"].replace("Z", "")).replace(tzinfo=None) >= fecha_limite]
+    recientes = tiempo.en_ventana(fc_diurna_data, dias)
     por_dia = {}
     for fc in recientes:
-        fecha = datetime.fromisoformat(fc["fecha"].replace("Z", "")).strftime("%Y-%m-%d")
+        fecha = tiempo.dia_iso(tiempo.dia(fc))
         entry = por_dia.setdefault(fecha, {"bpm_min": [], "bpm_max": [], "bpm_promedio": []})
         entry["bpm_min"].append(fc.get("bpm_min", 0))
         entry["bpm_max"].append(fc.get("bpm_max", 0))
@@ -88,34 +89,40 @@ def preparar_datos_fc_diurna(fc_diurna_data, dias=30):
     }
 
 
+def preparar_datos_fc_intradia(serie_fc, dia=None):
+    """FC minuto a minuto de un día (default: el último con datos) desde la serie compacta"""
+    if dia is None:
+        dia = serie_fc.ultimo_dia()
+        if dia is None: return {"fechas": [], "bpm_min": [], "bpm_max": [], "bpm_promedio": [], "dia": None}
+    datos = serie_fc.intradia(dia)
+    fecha = tiempo.dia_iso(dia)
+    return {
+        "fechas": [f"{fecha} {m // 60:02d}:{m % 60:02d}" for m in datos["minutos"]],
+        "bpm_min": datos["bpm_min"],
+        "bpm_max": datos["bpm_max"],
+        "bpm_promedio": [round(v, 1) for v in datos["bpm_promedio"]],
+        "dia": fecha
+    }
+
+
 def preparar_datos_presion_arterial(presion_data, dias=90):
     if not presion_data: return {"fechas": [], "sistolica": [], "diastolica": []}
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [p for p in presion_data if datetime.fromisoformat(p["fecha"].replace("Z", "")).replace(tzinfo=None) >= fecha_limite]
-    por_dia = {}
-    for p in recientes:
-        fecha = datetime.fromisoformat(p["fecha"].replace("Z", "")).strftime("%Y-%m-%d")
-        entry = por_dia.setdefault(fecha, {"sistolica": [], "diastolica": []})
-        entry["sistolica"].append(p.get("sistolica", 0))
-        entry["diastolica"].append(p.get("diastolica", 0))
-    fechas = sorted(por_dia.keys())
+    # Promedio del día desde la tabla diaria (core/diario.py)
+    tabla = tabla_diaria(presion_data, "presion_arterial")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
     return {
-        "fechas": fechas,
-        "sistolica": [sum(por_dia[f]["sistolica"]) / len(por_dia[f]["sistolica"]) for f in fechas],
-        "diastolica": [sum(por_dia[f]["diastolica"]) / len(por_dia[f]["diastolica"]) for f in fechas]
+        "fechas": [tiempo.dia_iso(d) for d in dias_ventana],
+        "sistolica": [tabla.promedio("sistolica", d) for d in dias_ventana],
+        "diastolica": [tabla.promedio("diastolica", d) for d in dias_ventana]
     }
 
 
 def preparar_datos_spo2(spo2_data, dias=30):
     if not spo2_data: return {"fechas": [], "valores": []}
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    recientes = [s for s in spo2_data if datetime.fromisoformat(s["fecha"].replace("Z", "")).replace(tzinfo=None) >= fecha_limite]
-    por_dia = {}
-    for s in recientes:
-        fecha = datetime.fromisoformat(s["fecha"].replace("Z", "")).strftime("%Y-%m-%d")
-        por_dia.setdefault(fecha, []).append(s["porcentaje"])
-    fechas = sorted(por_dia.keys())
-    valores = [sum(por_dia[f]) / len(por_dia[f]) for f in fechas]
+    tabla = tabla_diaria(spo2_data, "spo2")
+    dias_ventana = tabla.dias(tiempo.dia_limite(dias))
+    fechas = [tiempo.dia_iso(d) for d in dias_ventana]
+    valores = [tabla.promedio("porcentaje", d) for d in dias_ventana]
     return {"fechas": fechas, "valores": valores}
 
 
@@ -131,17 +138,13 @@ def preparar_datos_glucosa(glucosa_data, dias=90):
     if not glucosa_data:
         return {"ayunas": ayunas, "post": post, "tendencia": None}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    datos_ordenados = sorted(glucosa_data, key=lambda x: x.get("timestamp", x.get("fecha", "")))
+    # ⚡ En orden de tiempo (historial_reciente ya lo está): la ventana es un bisect
+    recientes = tiempo.en_ventana(tiempo.ordenados(glucosa_data), dias)
     
-    for g in datos_ordenados:
+    for g in recientes:
         try:
-            ts = g.get("timestamp", g.get("fecha", ""))
-            # Parseo literal y forzamos a naive (sin zona)
-            dt_local = datetime.fromisoformat(ts.replace("Z", "")).replace(tzinfo=None)
-            
-            if dt_local < fecha_limite:
-                continue
+            # Hora local ya normalizada al ingestar (naive, sin zona)
+            dt_local = tiempo.a_datetime(tiempo.epoch(g))
             
             valor = g.get("nivel_mg_dl", 0)
             if valor <= 0: continue
@@ -5,9 +5,10 @@ Preparador de Métricas - Cálculo de todas las métricas del dashboard
 Centraliza el cálculo de PAI, TSB, VO2max, sueño, SpO2, etc.
 """
 
-from datetime import datetime, timedelta
 from collections import defaultdict
 from utils.logger import logger
+from core import tiempo
+from core.columnas import valores_por_dia
 from metricas.pai import calcular_pai_semanal
 from metricas.fitness import calcular_tsb
 from metricas.score import calcular_score_longevidad, generar_recomendaciones
@@ -22,21 +23,13 @@ def calcular_glucemia_ayunas_postprandial(glucosa_data, dias=7):
     if not glucosa_data:
         return {"ayunas": None, "postprandial": None}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    
     ayunas_valores = []
     postprandial_valores = []
     
-    for g in glucosa_data:
+    # Hora local naive (sin zona horaria) normalizada al ingestar
+    # ⚡ Con una SerieOrdenada la ventana es un bisect
+    for g in tiempo.en_ventana(glucosa_data, dias):
         try:
-            ts = g.get("timestamp", g.get("fecha", ""))
-            # Parseamos y FORZAMOS a naive (sin zona horaria) para evitar errores
-            dt_local = datetime.fromisoformat(ts.replace("Z", "")).replace(tzinfo=None)
-            
-            # Filtrar por fecha
-            if dt_local < fecha_limite:
-                continue
-            
             valor = g.get("nivel_mg_dl", 0)
             if valor <= 0: continue
             
@@ -44,7 +37,7 @@ def calcular_glucemia_ayunas_postprandial(glucosa_data, dias=7):
             es_basal = False
             
             # 1. REGLA DE ORO: Hora Literal < 08:00 = BASAL
-            if dt_local.hour < 8:
+            if tiempo.hora(g) < 8:
                 es_basal = True
             # 2. Si es más tarde, miramos la etiqueta
             elif relacion == 1 or relacion == "1": 
@@ -76,16 +69,9 @@ def calcular_hba1c_estimada(glucosa_data, dias=90):
     if not glucosa_data:
         return {"hba1c": None, "glucosa_promedio": None, "num_mediciones": 0}
     
-    fecha_limite = datetime.now() - timedelta(days=dias)
-    
     valores_glucosa = []
-    for g in glucosa_data:
+    for g in tiempo.en_ventana(glucosa_data, dias):
         try:
-            ts = g.get("timestamp", g.get("fecha", ""))
-            dt = datetime.fromisoformat(ts.replace("Z", "")).replace(tzinfo=None)
-            
-            if dt < fecha_limite:
-                continue
             nivel = g.get("nivel_mg_dl", 0)
             if nivel > 0:
                 valores_glucosa.append(nivel)
@@ -107,25 +93,31 @@ def calcular_hba1c_estimada(glucosa_data, dias=90):
 
 def calcular_metricas(ejercicios, peso, sueno, spo2, grasa_corporal, 
                      masa_muscular, vo2max_medido, fc_reposo, pasos, 
-                     presion_arterial, nutrition, tasa_metabolica, calorias_totales, glucosa=None):
-    """Calcula todas las métricas del dashboard."""
+                     presion_arterial, nutrition, tasa_metabolica, calorias_totales, glucosa=None,
+                     estado_tsb=None, tsb_diario=None, diario_ejercicio=None):
+    """
+    Calcula todas las métricas del dashboard.
+    estado_tsb: checkpoint del EWMA si ejercicios es solo el historial reciente
+    tsb_diario: serie diaria del EWMA ya calculada (ver metricas.fitness.tsb_diario)
+    diario_ejercicio: tabla diaria de ejercicio (core/diario.py) para el PAI
+    """
     
-    pai_semanal = calcular_pai_semanal(ejercicios)
+    pai_semanal = calcular_pai_semanal(diario_ejercicio if diario_ejercicio is not None else ejercicios)
     peso_actual = peso[-1]["peso"] if peso else None
     
     peso_hace_7_dias = peso_actual
     if peso:
-        fecha_limite = datetime.now() - timedelta(days=7)
+        limite = tiempo.epoch_limite(7)
         for p in reversed(peso):
             try:
-                fecha = datetime.fromisoformat(p["fecha"].replace("Z", "")).replace(tzinfo=None)
-                if fecha <= fecha_limite:
+                e = tiempo.epoch(p)
+                if e is not None and e <= limite:
                     peso_hace_7_dias = p.get("peso", peso_actual)
                     break
             except: continue
     
     vo2max = vo2max_medido[-1]["vo2max"] if vo2max_medido else None
-    tsb_dict = calcular_tsb(ejercicios) if ejercicios else {"tsb": 0, "ctl": 0, "atl": 0}
+    tsb_dict = calcular_tsb(ejercicios, estado_tsb, tsb_diario) if ejercicios else {"tsb": 0, "ctl": 0, "atl": 0}
     tsb_actual = tsb_dict.get("tsb", 0) if isinstance(tsb_dict, dict) else tsb_dict
     
     promedio_sueno_horas = None
@@ -133,8 +125,9 @@ def calcular_metricas(ejercicios, peso, sueno, spo2, grasa_corporal,
         sueno_por_dia = defaultdict(float)
         for s in sueno:
             try:
-                fecha = datetime.fromisoformat(s["fecha"].replace("Z", "")).strftime("%Y-%m-%d")
-                sueno_por_dia[fecha] += s.get("duracion", 0)
+                dia = tiempo.dia(s)
+                if dia is not None:
+                    sueno_por_dia[dia] += s.get("duracion", 0)
             except: continue
         fechas_ordenadas = sorted(sueno_por_dia.keys())[-7:]
         if fechas_ordenadas:
@@ -156,13 +149,9 @@ def calcular_metricas(ejercicios, peso, sueno, spo2, grasa_corporal,
     
     pasos_promedio = None
     if pasos:
-        pasos_por_dia = defaultdict(list)
-        for p in pasos:
-            try:
-                fecha = datetime.fromisoformat(p["fecha"].replace("Z", "")).strftime("%Y-%m-%d")
-                pasos_por_dia[fecha].append(p.get("pasos", 0))
-            except: continue
-        fechas_ordenadas = sorted(pasos_por_dia.keys())[-7:]
+        # ⚡ Últimos 7 días con datos (pasos puede ser SerieColumnar)
+        pasos_por_dia = valores_por_dia(pasos, "pasos", ultimos=7)
+        fechas_ordenadas = sorted(pasos_por_dia.keys())
         if fechas_ordenadas:
             total_pasos = sum(max(pasos_por_dia[f]) for f in fechas_ordenadas)
             pasos_promedio = total_pasos / len(fechas_ordenadas)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reconstrucción del cache desde los exports archivados en procesados/
+
+Cuando cambia la lógica de un extractor (ej: mmol/L -> mg/dL en glucosa,
+FC reposo nocturna) re-procesa en orden todos los exports de PROCESADOS_DIR
+sobre un cache nuevo y reemplaza en el cache configurado las secciones
+reconstruidas, sin borrar nada a mano ni mover archivos.
+
+Uso:
+    python reconstruir_cache.py                          # todas las secciones
+    python reconstruir_cache.py glucosa fc_reposo        # solo esas (el resto no se toca)
+    python reconstruir_cache.py --workers 4 glucosa      # procesos para extraer (default: cpu_count)
+    python reconstruir_cache.py --desde-cero             # ignora el checkpoint de una corrida anterior
+
+- Los DIFF se extraen en paralelo (ProcessPoolExecutor, igual que la ingesta
+  con INGESTA_WORKERS); los deltas se aplican en orden de archivo.
+- Cada RECONSTRUCCION_CHECKPOINT_ARCHIVOS exports el cache parcial se guarda
+  en RECONSTRUCCION_DIR (almacén JSON con journal, su manifest de archivos
+  dice hasta dónde llegó): si se corta, la próxima corrida sigue desde ahí.
+- fc_reposo y frecuencia_cardiaca reconstruyen la serie FC compacta.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+
+CAMPOS_FC = ("fc_reposo", "frecuencia_cardiaca")
+
+
+def _exports():
+    """Exports archivados, en el orden en que se generaron (el mismo que la ingesta)"""
+    from config import PROCESADOS_DIR, ARCHIVO_PREFIX, ARCHIVO_EXTENSION
+    from core.manifiesto import orden_export
+
+    return sorted(
+        (f for f in os.listdir(PROCESADOS_DIR)
+         if f.startswith(ARCHIVO_PREFIX) and f.endswith(ARCHIVO_EXTENSION)),
+        key=orden_export
+    )
+
+
+def _almacen_checkpoint():
+    from config import RECONSTRUCCION_DIR
+    from core.almacen import AlmacenJSON
+
+    return AlmacenJSON(
+        ruta=RECONSTRUCCION_DIR / "cache_datos.json",
+        ruta_fc=RECONSTRUCCION_DIR / "cache_fc.bin",
+        ruta_journal=RECONSTRUCCION_DIR / "cache_datos.journal",
+        ruta_bin=RECONSTRUCCION_DIR / "cache_datos.bin",
+    )
+
+
+def _registros(cache, campos):
+    """Registros de las secciones reconstruidas (buckets para la serie FC)"""
+    from core.serie_fc import obtener_serie_fc
+
+    total = sum(len(cache.get(c, [])) for c in campos if c not in CAMPOS_FC)
+    if any(c in CAMPOS_FC for c in campos):
+        total += len(obtener_serie_fc(cache))
+    return total
+
+
+def _iniciar(campos, desde_cero):
+    """Cache de la reconstrucción: el del checkpoint si es de la misma selección, o uno nuevo"""
+    from config import RECONSTRUCCION_DIR
+    from core.cache import cargar_cache, inicializar_cache
+
+    seleccion = {"secciones": sorted(campos)}
+    almacen = _almacen_checkpoint()
+    if almacen.existe() and not desde_cero:
+        cache = cargar_cache(almacen)
+        if cache.get("reconstruccion") == seleccion:
+            return cache
+        print("⚠️  El checkpoint es de otra selección de secciones: se empieza de cero")
+
+    shutil.rmtree(RECONSTRUCCION_DIR, ignore_errors=True)
+    RECONSTRUCCION_DIR.mkdir(parents=True)
+    cache = inicializar_cache()
+    cache["reconstruccion"] = seleccion
+    return cache
+
+
+def _procesar(rutas, cache, workers, campos):
+    """Misma estrategia que procesar_datos_nuevos (DIFF coalescidos / paralelo)"""
+    from config import COALESCER_DIFF
+    from core.procesador import procesar_archivo, procesar_archivos_paralelo, procesar_archivos_coalescidos
+
+    if COALESCER_DIFF and len(rutas) > 1:
+        return procesar_archivos_coalescidos(rutas, cache, workers, campos)
+    if workers > 1 and len(rutas) > 1:
+        return procesar_archivos_paralelo(rutas, cache, workers, campos)
+    return (procesar_archivo(ruta, cache, campos=campos) for ruta in rutas)
+
+
+def _reemplazar(reconstruido, campos, completa):
+    """Pasa las secciones reconstruidas al cache configurado y lo guarda"""
+    from core.cache import cargar_cache, guardar_cache
+    from core.indice import marcar_sucias
+    from core.serie_fc import CLAVE_SERIE_FC, obtener_serie_fc
+
+    cache = cargar_cache()
+    for campo in campos:
+        if campo in CAMPOS_FC:
+            continue
+        cache[campo] = reconstruido.get(campo, [])
+        marcar_sucias(cache, campo)
+    if any(c in CAMPOS_FC for c in campos):
+        cache[CLAVE_SERIE_FC] = obtener_serie_fc(reconstruido)
+        marcar_sucias(cache, CLAVE_SERIE_FC)
+    if completa:
+        # Digests del último FULL: coinciden con los datos reconstruidos
+        cache["snapshot_full"] = reconstruido.get("snapshot_full", {})
+        marcar_sucias(cache, "snapshot_full")
+    guardar_cache(cache)
+
+
+def reconstruir(secciones=None, workers=None, desde_cero=False):
+    from config import PROCESADOS_DIR, RECONSTRUCCION_DIR, RECONSTRUCCION_CHECKPOINT_ARCHIVOS
+    from core.cache import guardar_cache, marcar_archivo_procesado, obtener_archivos_procesados
+    # Los extractores se registran al importar el procesador
+    from core.procesador import REGISTRO
+
+    validos = list(dict.fromkeys(ext.campo for ext in REGISTRO))
+    desconocidas = [s for s in secciones or () if s not in validos]
+    if desconocidas:
+        print(f"❌ Secciones desconocidas: {', '.join(desconocidas)} (opciones: {', '.join(validos)})")
+        return 1
+    completa = not secciones
+    campos = validos if completa else list(dict.fromkeys(secciones))
+    workers = workers or os.cpu_count() or 1
+
+    archivos = _exports()
+    if not archivos:
+        print(f"❌ No hay exports en {PROCESADOS_DIR}")
+        return 1
+
+    cache = _iniciar(campos, desde_cero)
+    procesados = obtener_archivos_procesados(cache)
+    pendientes = [a for a in archivos if a not in procesados]
+    if len(pendientes) < len(archivos):
+        print(f"↩️  Checkpoint: {len(archivos) - len(pendientes)} exports ya aplicados, sigue desde ahí")
+
+    print(f"🔁 Reconstruyendo {', '.join(campos)}")
+    print(f"   {len(pendientes)} exports pendientes de {len(archivos)} en {PROCESADOS_DIR}, {workers} procesos")
+
+    filtro = None if completa else set(campos)
+    inicial = _registros(cache, campos)
+    inicio = time.perf_counter()
+    for i in range(0, len(pendientes), RECONSTRUCCION_CHECKPOINT_ARCHIVOS):
+        tanda = pendientes[i:i + RECONSTRUCCION_CHECKPOINT_ARCHIVOS]
+        rutas = [str(PROCESADOS_DIR / archivo) for archivo in tanda]
+        for archivo, ruta, detectados in zip(tanda, rutas, _procesar(rutas, cache, workers, filtro)):
+            if detectados is None:
+                print(f"   ⚠️  No se pudo leer {archivo}: queda afuera")
+                continue
+            marcar_archivo_procesado(cache, archivo, ruta)
+
+        # Checkpoint: datos y manifest se guardan juntos
+        guardar_cache(cache, _almacen_checkpoint(), columnas=False)
+
+        segundos = time.perf_counter() - inicio
+        registros = _registros(cache, campos)
+        hechos = len(archivos) - len(pendientes) + i + len(tanda)
+        print(f"   💾 {hechos}/{len(archivos)} exports | {registros} registros | "
+              f"{(registros - inicial) / segundos:,.0f} registros/s | {(i + len(tanda)) / segundos:.1f} exports/s")
+
+    segundos = time.perf_counter() - inicio
+    registros = _registros(cache, campos)
+
+    _reemplazar(cache, campos, completa)
+    shutil.rmtree(RECONSTRUCCION_DIR, ignore_errors=True)
+
+    print(f"✅ Reconstrucción terminada en {segundos:.1f}s: {registros} registros "
+          f"({(registros - inicial) / segundos if segundos else 0:,.0f} registros/s)")
+    for campo in campos:
+        if campo not in CAMPOS_FC:
+            print(f"   {campo:25s} {len(cache.get(campo, [])):>8}")
+    if any(c in CAMPOS_FC for c in campos):
+        print(f"   {'serie FC (buckets)':25s} {_registros(cache, CAMPOS_FC[:1]):>8}")
+    return 0
+
+
+def main():
+    logging.getLogger("monitor_salud").setLevel(logging.WARNING)
+
+    args = sys.argv[1:]
+    workers = None
+    desde_cero = "--desde-cero" in args
+    if desde_cero:
+        args.remove("--desde-cero")
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    sys.exit(reconstruir(args or None, workers, desde_cero))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Los módulos del proyecto se importan desde la raíz (igual que los scripts)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
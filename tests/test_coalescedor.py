@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coalescedor de DIFF (core/coalescedor.py): combinar una racha deja el mismo
+cache que procesar los archivos uno por uno.
+"""
+
+import json
+from datetime import date
+
+from core.cache import inicializar_cache
+from core.indice import vivos
+from core.procesador import procesar_archivo, procesar_archivos_coalescidos
+from core.serie_fc import obtener_serie_fc
+
+
+def _diff(tmp_path, n, secciones, borrados=()):
+    ruta = tmp_path / f"health_data_AUTO_DIFF_2025-10-10_{n:02d}-00-00.json"
+    datos = {clave: {"count": len(data), "data": data} for clave, data in secciones.items()}
+    datos["deletions"] = {"count": len(borrados), "record_ids": list(borrados)}
+    ruta.write_text(json.dumps(datos))
+    return str(ruta)
+
+
+def _vo2(record_id, valor):
+    return {"record_id": record_id, "timestamp": "2025-10-10T19:00:00Z", "vo2_max": valor, "source": "reloj"}
+
+
+def _peso(record_id, kg, hora):
+    return {"record_id": record_id, "timestamp": f"2025-10-10T{hora}:00:00Z", "weight_kg": kg, "source": "balanza"}
+
+
+def _hr(inicio, avg, bmin, bmax):
+    return {"start_time": f"2025-10-10T{inicio}Z", "avg_bpm": avg, "min_bpm": bmin, "max_bpm": bmax, "source": "reloj"}
+
+
+def _uno_por_uno_y_combinados(tmp_path, inicial, racha):
+    """(cache procesando la racha archivo por archivo, cache con la racha combinada)"""
+    caches = []
+    for combinar in (False, True):
+        directorio = tmp_path / ("combinados" if combinar else "uno_por_uno")
+        directorio.mkdir()
+        cache = inicializar_cache()
+        procesar_archivo(_diff(directorio, 0, inicial), cache)
+        rutas = [_diff(directorio, n, *archivo) for n, archivo in enumerate(racha, 1)]
+        if combinar:
+            list(procesar_archivos_coalescidos(rutas, cache))
+        else:
+            for ruta in rutas:
+                procesar_archivo(ruta, cache)
+        caches.append(cache)
+    return caches
+
+
+def test_borrado_y_vuelto_a_insertar(tmp_path):
+    racha = [
+        ({"vo2max_changes": [_vo2("a", 39.0)]}, ()),
+        ({}, ["a"]),
+        ({"vo2max_changes": [_vo2("a", 40.0)]}, ()),
+    ]
+    for cache in _uno_por_uno_y_combinados(tmp_path, {"vo2max_changes": [_vo2("a", 38.0)]}, racha):
+        assert [r["vo2max"] for r in vivos(cache, "vo2max")] == [40.0]
+
+
+def test_peso_borrado_despues_de_otro_del_mismo_dia(tmp_path):
+    # El peso del DIFF 1 se descarta (el día ya tiene uno); el DIFF 2 borra el del cache
+    racha = [({"weight_changes": [_peso("p2", 81.0, "12")]}, ()), ({}, ["p1"])]
+    for cache in _uno_por_uno_y_combinados(tmp_path, {"weight_changes": [_peso("p1", 80.0, "08")]}, racha):
+        assert list(vivos(cache, "peso")) == []
+
+
+def test_fc_del_mismo_minuto_en_dos_diff(tmp_path):
+    racha = [
+        ({"heart_rate_changes": [_hr("13:00:00", 60, 55, 70)]}, ()),
+        ({"heart_rate_changes": [_hr("13:00:30", 80, 75, 90)]}, ()),
+    ]
+    uno_por_uno, combinados = _uno_por_uno_y_combinados(tmp_path, {}, racha)
+    d = date(2025, 10, 10).toordinal()
+    intradia = obtener_serie_fc(combinados).intradia(d)
+    assert intradia == obtener_serie_fc(uno_por_uno).intradia(d)
+    assert (intradia["bpm_min"], intradia["bpm_max"], intradia["bpm_promedio"]) == ([55], [90], [70.0])
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ventanas de los gráficos (outputs/prep_graficos_*.py): todas empiezan en
+el mismo día (core.tiempo.dia_limite).
+"""
+
+from datetime import date, timedelta
+
+from outputs.prep_graficos_activity import preparar_datos_pai_completo, preparar_datos_pasos
+
+
+def _fecha(dias_atras):
+    return (date.today() - timedelta(days=dias_atras)).isoformat()
+
+
+def test_pai_diario_con_la_ventana_de_los_otros_graficos():
+    ejercicios = [{"start_time": f"{_fecha(d)}T18:00:00", "pai": 10.0, "fuente": "test"} for d in (31, 30, 0)]
+    pasos = [{"fecha": f"{_fecha(d)}T23:00:00", "pasos": 5000, "fuente": "test"} for d in (31, 30, 0)]
+
+    pai = preparar_datos_pai_completo(ejercicios, dias=30)
+
+    assert pai["fechas"] == [_fecha(30), _fecha(0)]
+    assert pai["fechas"] == preparar_datos_pasos(pasos, dias=30)["fechas"]
+    # La ventana móvil sí mira los 7 días anteriores al primero del gráfico
+    assert pai["pai_ventana_movil"] == [20.0, 10.0]
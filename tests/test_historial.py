@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+historial_reciente (core/cache.py): los registros recientes en orden de
+tiempo, no en el orden en que se ingestaron.
+"""
+
+from datetime import date, timedelta
+
+from core.cache import historial_reciente
+
+
+def _peso(dias_atras, peso):
+    fecha = (date.today() - timedelta(days=dias_atras)).isoformat()
+    return {"fecha": f"{fecha}T08:00:00", "peso": peso, "fuente": "test"}
+
+
+def test_ultimo_registro_es_el_mas_reciente():
+    # Un export con lecturas viejas procesado después (ej: un FULL tras los DIFF)
+    cache = {"peso": [_peso(1, 83.0), _peso(0, 82.5), _peso(3, 82.7), _peso(2, 82.9)]}
+
+    peso = historial_reciente(cache, "peso")
+
+    assert [r["peso"] for r in peso] == [82.7, 82.9, 83.0, 82.5]
+    assert peso[-1]["peso"] == 82.5
+
+
+def test_al_menos_los_ultimos_siete_registros():
+    # Registros anteriores al mes de corte: quedan los últimos 7
+    cache = {"peso": [_peso(400 + i, 80.0 + i) for i in range(10)]}
+
+    peso = historial_reciente(cache, "peso", dias=30)
+
+    assert [r["peso"] for r in peso] == [86.0, 85.0, 84.0, 83.0, 82.0, 81.0, 80.0]
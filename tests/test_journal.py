@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Journal del almacén JSON (core/almacen.py): una escritura cortada al final
+no tiene que esconder los deltas de los ciclos siguientes.
+"""
+
+from core.almacen import AlmacenJSON
+from core.cache import cargar_cache, guardar_cache, inicializar_cache
+
+
+def _almacen(tmp_path):
+    return AlmacenJSON(
+        ruta=tmp_path / "cache_datos.json",
+        ruta_fc=tmp_path / "cache_fc.bin",
+        ruta_journal=tmp_path / "cache_datos.journal",
+        ruta_bin=tmp_path / "cache_datos.bin",
+    )
+
+
+def _base(almacen):
+    ruta = almacen.ruta_bin if almacen.ruta_bin.exists() else almacen.ruta
+    return ruta.read_bytes()
+
+
+def _pasos(dia, pasos):
+    return {"fecha": f"2025-10-{dia:02d}T10:00:00", "pasos": pasos, "fuente": "test"}
+
+
+def test_journal_cortado_y_otra_escritura(tmp_path):
+    almacen = _almacen(tmp_path)
+    guardar_cache(inicializar_cache(), almacen, columnas=False)
+
+    cache = cargar_cache(almacen)
+    cache["pasos"].append(_pasos(1, 1000))
+    guardar_cache(cache, almacen, columnas=False)
+
+    # Corte de luz a mitad de la escritura del próximo delta
+    with open(almacen.ruta_journal, "ab") as f:
+        f.write(b'{"secciones":{"pasos":{"upsert":[["x",')
+
+    cache = cargar_cache(almacen)
+    assert len(cache["pasos"]) == 1
+    cache["pasos"].extend([_pasos(2, 2000), _pasos(3, 3000)])
+    cache["grasa_corporal"].append({"fecha": "2025-10-03T08:00:00", "porcentaje": 20.0, "fuente": "test"})
+    guardar_cache(cache, almacen, columnas=False)
+
+    cache = cargar_cache(almacen)
+    assert sorted(r["pasos"] for r in cache["pasos"]) == [1000, 2000, 3000]
+    assert len(cache["grasa_corporal"]) == 1
+
+
+def test_journal_sin_salto_de_linea_final(tmp_path):
+    almacen = _almacen(tmp_path)
+    guardar_cache(inicializar_cache(), almacen, columnas=False)
+
+    cache = cargar_cache(almacen)
+    cache["pasos"].append(_pasos(1, 1000))
+    guardar_cache(cache, almacen, columnas=False)
+
+    # La entrada quedó completa pero sin el "\n": la siguiente no se le pega
+    contenido = almacen.ruta_journal.read_bytes()
+    almacen.ruta_journal.write_bytes(contenido.rstrip(b"\n"))
+
+    cache = cargar_cache(almacen)
+    cache["pasos"].append(_pasos(2, 2000))
+    guardar_cache(cache, almacen, columnas=False)
+
+    cache = cargar_cache(almacen)
+    assert sorted(r["pasos"] for r in cache["pasos"]) == [1000, 2000]
+
+
+def test_metadato_con_cambios_en_la_cola(tmp_path):
+    almacen = _almacen(tmp_path)
+    cache = inicializar_cache()
+    cache["tabla"] = {"dias": list(range(1000)), "columnas": {"n": [1] * 1000}, "registros": 1000}
+    guardar_cache(cache, almacen, columnas=False)
+
+    cache = cargar_cache(almacen)
+    cache["tabla"]["dias"].append(1000)
+    cache["tabla"]["columnas"]["n"][-1] = 2
+    cache["tabla"]["columnas"]["n"].append(1)
+    cache["tabla"]["registros"] = 1002
+    guardar_cache(cache, almacen, columnas=False)
+
+    # Solo los días que cambiaron, no la tabla entera
+    entrada = almacen.ruta_journal.read_bytes().splitlines()[-1]
+    assert len(entrada) < 300
+
+    cache = cargar_cache(almacen)
+    assert cache["tabla"] == {"dias": list(range(1001)), "columnas": {"n": [1] * 999 + [2, 1]}, "registros": 1002}
+
+
+def test_journal_corrupto_no_pisa_la_base(tmp_path):
+    almacen = _almacen(tmp_path)
+    guardar_cache(inicializar_cache(), almacen, columnas=False)
+
+    cache = cargar_cache(almacen)
+    cache["pasos"].append(_pasos(1, 1000))
+    guardar_cache(cache, almacen, columnas=False)
+
+    # Entrada completa pero que no se puede aplicar (no es un corte al final)
+    with open(almacen.ruta_journal, "a", encoding="utf-8") as f:
+        f.write('{"secciones":{"pasos":{"upsert":7}}}\n')
+    base = _base(almacen)
+    journal = almacen.ruta_journal.read_bytes()
+
+    # El ciclo siguiente arranca con un cache vacío y no lo guarda
+    cache = cargar_cache(almacen)
+    assert cache["pasos"] == []
+    cache["pasos"].append(_pasos(2, 2000))
+    guardar_cache(cache, almacen, columnas=False)
+
+    assert _base(almacen) == base
+    assert almacen.ruta_journal.read_bytes() == journal
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Clave de upsert de nutrición (core/indice.py): alimentos distintos que
+empiezan en el mismo instante no se reemplazan entre sí.
+"""
+
+import json
+
+from core.cache import inicializar_cache
+from core.indice import vivos
+from core.procesador import procesar_archivo
+
+
+def _pan(fin, kcal, proteinas):
+    return {
+        "start_time": "2025-10-05T07:22:43.764-03:00", "end_time": f"2025-10-05T07:22:43.{fin}-03:00",
+        "name": "Pan de trigo integral", "meal_type": "Breakfast", "calories_kcal": kcal,
+        "protein_g": proteinas, "carbs_g": kcal / 5, "fat_g": 1.0, "fiber_g": None, "sugar_g": None,
+        "sodium_mg": None, "source": "com.huami.watch.hmwatchmanager",
+    }
+
+
+def _export(tmp_path, nombre, alimentos):
+    ruta = tmp_path / f"health_data_AUTO_DIFF_{nombre}.json"
+    ruta.write_text(json.dumps({"nutrition_records": {"count": len(alimentos), "data": alimentos}}))
+    return str(ruta)
+
+
+def test_alimentos_a_la_misma_hora(tmp_path):
+    desayuno = [_pan(765, 92.0, 3.6), _pan(766, 115.0, 4.5), _pan(767, 184.0, 7.2)]
+    # Dos porciones idénticas en el mismo export también son dos registros
+    desayuno.append(dict(desayuno[0]))
+    cache = inicializar_cache()
+
+    procesar_archivo(_export(tmp_path, "2025-10-05_08-00-00", desayuno), cache)
+    assert sorted(r["protein_g"] for r in vivos(cache, "nutrition")) == [3.6, 3.6, 4.5, 7.2]
+
+    # El mismo desayuno en el export siguiente reemplaza, no duplica
+    procesar_archivo(_export(tmp_path, "2025-10-05_09-00-00", desayuno), cache)
+    assert sorted(r["protein_g"] for r in vivos(cache, "nutrition")) == [3.6, 3.6, 4.5, 7.2]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serie FC compacta (core/serie_fc.py): un bucket por registro de heart_rate,
+así un registro re-enviado pisa solo el suyo.
+"""
+
+from datetime import datetime
+
+from core.serie_fc import SerieFC, buckets_de_registros
+
+
+def _hr(inicio, avg, bmin, bmax, fuente="reloj"):
+    registro = {"start_time": inicio, "avg_bpm": avg, "min_bpm": bmin, "max_bpm": bmax, "source": fuente}
+    return registro, datetime.fromisoformat(inicio)
+
+
+def _upsert(serie, *registros):
+    serie.upsert(buckets_de_registros([r for r, _ in registros], [f for _, f in registros]))
+
+
+def test_mismo_minuto_en_dos_archivos_se_combina():
+    serie = SerieFC()
+    _upsert(serie, _hr("2025-10-10T10:00:00", 60, 55, 70))
+    _upsert(serie, _hr("2025-10-10T10:00:30", 80, 75, 90))
+
+    datos = serie.intradia(datetime(2025, 10, 10).toordinal())
+    assert datos["minutos"] == [600]
+    assert (datos["bpm_min"], datos["bpm_max"], datos["bpm_promedio"]) == ([55], [90], [70.0])
+
+    # El primer registro vuelve a llegar actualizado: reemplaza solo el suyo
+    _upsert(serie, _hr("2025-10-10T10:00:00", 62, 50, 70))
+    datos = serie.intradia(datetime(2025, 10, 10).toordinal())
+    assert (datos["bpm_min"], datos["bpm_max"], datos["bpm_promedio"]) == ([50], [90], [71.0])
+    assert len(serie) == 2
+
+
+def test_mas_de_256_fuentes():
+    serie = SerieFC()
+    _upsert(serie, *(_hr("2025-10-10T23:00:00", 50 + i % 50, 50, 100, f"fuente-{i}") for i in range(300)))
+
+    copia = SerieFC.desde_bytes(serie.a_bytes())
+    assert copia == serie
+    assert len(copia.fuentes) == 300
+    assert {r["fuente"] for r in copia.fc_reposo()} == {f"fuente-{i}" for i in range(300)}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diff de snapshots FULL (core/snapshot.py): un FULL cortado por los
+registros más nuevos no borra los días que no trae.
+"""
+
+import json
+
+import core.snapshot
+from core.cache import inicializar_cache
+from core.indice import vivos
+from core.procesador import procesar_archivo
+from core.tiempo import dia_iso
+
+FUENTES = ("com.sec.android.app.shealth", "nl.appyhapps.healthsync")
+
+
+def _pasos(dias=5, por_dia=6):
+    return [
+        {"start_time": f"2025-09-{18 + d}T{h:02d}:00:00-03:00", "count": 100 * (h + 1), "source": fuente}
+        for d in range(dias) for h in range(por_dia) for fuente in FUENTES
+    ]
+
+
+def _full(tmp_path, hora, pasos):
+    ruta = tmp_path / f"health_data_AUTO_FULL_2025-10-18_{hora}.json"
+    ruta.write_text(json.dumps({"steps_records": {"count": len(pasos), "data": pasos}}))
+    return ruta
+
+
+def _por_dia(cache):
+    totales = {}
+    for r in vivos(cache, "pasos"):
+        clave = (dia_iso(r["dia_local"]), r["fuente"])
+        totales[clave] = max(totales.get(clave, 0), r["pasos"])
+    return totales
+
+
+def test_full_cortado_por_los_mas_nuevos(tmp_path):
+    cache = inicializar_cache()
+    completo = _pasos()
+    procesar_archivo(str(_full(tmp_path, "10-00-00", completo)), cache)
+    antes = _por_dia(cache)
+    assert len(antes) == 10
+
+    # Mismo FULL con los registros más nuevos cortados: termina a mitad del 20/09
+    procesar_archivo(str(_full(tmp_path, "11-00-00", completo[:30])), cache)
+
+    assert _por_dia(cache) == antes
+
+
+def test_full_en_el_tope_conserva_la_cola_del_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.snapshot, "FULL_MAX_REGISTROS", 30)
+    cache = inicializar_cache()
+    completo = _pasos()
+    procesar_archivo(str(_full(tmp_path, "10-00-00", completo)), cache)
+    antes = _por_dia(cache)
+
+    procesar_archivo(str(_full(tmp_path, "11-00-00", completo[:30])), cache)
+    assert "2025-09-22" in cache["snapshot_full"]["steps_records"]
+
+    # El siguiente FULL completo: el 20/09 se re-procesa entero, el 21 y el 22 no cambiaron
+    procesar_archivo(str(_full(tmp_path, "12-00-00", completo)), cache)
+    assert len(vivos(cache, "pasos")) == len(antes)
+    assert _por_dia(cache) == antes
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingesta streaming (core/procesador.py): mismo resultado que leer el archivo
+entero, y un archivo cortado no toca el cache.
+"""
+
+import json
+
+import pytest
+
+from core.cache import inicializar_cache
+from core.indice import vivos
+from core.procesador import procesar_archivo
+
+
+def _vo2(record_id, valor):
+    return {"record_id": record_id, "timestamp": "2025-10-10T19:00:00Z", "vo2_max": valor, "source": "reloj"}
+
+
+def _diff(tmp_path, hora, registros, borrados=()):
+    ruta = tmp_path / f"health_data_AUTO_DIFF_2025-10-10_{hora}.json"
+    ruta.write_text(json.dumps({
+        "vo2max_changes": {"count": len(registros), "data": registros},
+        "deletions": {"count": len(borrados), "record_ids": list(borrados)},
+    }))
+    return str(ruta)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_deletions_antes_que_las_inserciones(tmp_path, streaming):
+    cache = inicializar_cache()
+    procesar_archivo(_diff(tmp_path, "10-00-00", [_vo2("a", 38.0)]), cache, streaming)
+
+    # Borra "a" y lo vuelve a insertar en el mismo archivo: queda la versión nueva
+    campos = procesar_archivo(_diff(tmp_path, "11-00-00", [_vo2("a", 39.0), _vo2("b", 40.0)], ["a"]), cache, streaming)
+    assert campos == ["vo2max"]
+    assert sorted(r["vo2max"] for r in vivos(cache, "vo2max")) == [39.0, 40.0]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_archivo_cortado_no_toca_el_cache(tmp_path, streaming):
+    cache = inicializar_cache()
+    procesar_archivo(_diff(tmp_path, "10-00-00", [_vo2("a", 38.0)]), cache, streaming)
+
+    # Copia a medio escribir: la sección de VO2max está completa, las deletions no
+    ruta = _diff(tmp_path, "11-00-00", [_vo2("b", 40.0)], ["a"])
+    with open(ruta, "r+b") as f:
+        f.truncate(len(f.read()) - 10)
+
+    assert procesar_archivo(ruta, cache, streaming) is None
+    assert [r["vo2max"] for r in vivos(cache, "vo2max")] == [38.0]
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serie diaria del TSB (metricas/fitness.py): la serie guardada que se pone
+al día con los entrenamientos nuevos o reemplazados tiene que ser la misma
+que una armada desde cero.
+"""
+
+from datetime import date, timedelta
+
+from core.indice import vivos
+from metricas.fitness import CLAVE_TSB, serie_tsb, tsb_diario
+
+SAMSUNG = "com.sec.android.app.shealth"
+
+
+def _ejercicio(dias_atras, hrtss, sesion):
+    fecha = (date.today() - timedelta(days=dias_atras)).isoformat()
+    return {"start_time": f"{fecha}T18:00:00", "session_id": sesion, "hrtss": hrtss, "fuente": SAMSUNG}
+
+
+def _columnas(serie):
+    return {k: serie[k] for k in ("inicio", "desde", "base", "hrtss", "ctl", "atl")}
+
+
+def test_serie_al_dia_igual_a_la_armada_desde_cero():
+    cache = {"ejercicio": [_ejercicio(60, 80.0, "a"), _ejercicio(30, 50.0, "b"), _ejercicio(2, 40.0, "c")]}
+    _, _, previa = tsb_diario(cache)
+    assert previa["registros"] == 3
+
+    # Entrenamiento nuevo en el medio, otro reemplazado y uno de otra fuente
+    cache["ejercicio"] += [
+        _ejercicio(10, 65.0, "d"),
+        _ejercicio(30, 55.5, "b"),
+        {**_ejercicio(5, 90.0, "e"), "fuente": "otra"},
+    ]
+    _, _, diario = tsb_diario(cache)
+
+    # Puesta al día en el lugar, sin rearmarla
+    assert diario is previa is cache[CLAVE_TSB]
+    assert _columnas(diario) == _columnas(serie_tsb(vivos(cache, "ejercicio")))
+    reemplazado = (date.today() - timedelta(days=30)).toordinal()
+    assert diario["hrtss"][reemplazado - diario["desde"]] == 55.5
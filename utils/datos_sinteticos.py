@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador de cache sintético para benchmarks
+Produce N años de registros con la misma forma que generan los extractores,
+terminando hoy, para medir el dashboard y el cache con historia larga.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+FUENTE_SAMSUNG = "com.sec.android.app.shealth"
+FUENTE_WITHINGS = "com.withings.wiscale2"
+FUENTE_HEALTHSYNC = "nl.appyhapps.healthsync"
+
+
+def _iso(dt, utc=False):
+    """ISO como los exports: UTC con Z o local con offset -03:00"""
+    if utc:
+        return (dt + timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+    return dt.strftime("%Y-%m-%dT%H:%M") + "-03:00"
+
+
+def generar_cache_sintetico(anios=3, semilla=42):
+    """
+    Genera un cache completo con `anios` años de historia.
+
+    Args:
+        anios (int): Años de historia hasta hoy
+        semilla (int): Semilla del generador (resultados reproducibles)
+
+    Returns:
+        dict: Cache con la estructura de inicializar_cache()
+    """
+    from core.cache import inicializar_cache
+    from core.serie_fc import obtener_serie_fc
+    from core.fases_sueno import codificar_fases
+
+    rnd = random.Random(semilla)
+    cache = inicializar_cache()
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    dias = int(anios * 365)
+    n = 0
+
+    def rid():
+        nonlocal n
+        n += 1
+        return f"{n:08x}-0000-4000-8000-{rnd.getrandbits(48):012x}"
+
+    buckets_fc = {}  # Serie FC compacta: (dia, minuto, fuente, inicio) -> (min, max, suma, conteo)
+    peso_base = 84.0
+    for d in range(dias, -1, -1):
+        dia = hoy - timedelta(days=d)
+        peso_base += rnd.uniform(-0.15, 0.14)
+
+        # Ejercicio (5 de 7 días)
+        if rnd.random() < 0.7:
+            inicio = dia + timedelta(hours=rnd.choice([7, 8, 18, 19]), minutes=rnd.randint(0, 59))
+            duracion = rnd.randint(20, 90)
+            fc = rnd.randint(95, 150)
+            sid = rid()
+            cache["ejercicio"].append({
+                "session_id": sid, "record_id": sid,
+                "start_time": _iso(inicio, utc=True),
+                "end_time": _iso(inicio + timedelta(minutes=duracion), utc=True),
+                "fecha": _iso(inicio, utc=True),
+                "tipo": rnd.choice(["Walking", "Running", "Strength Training", "HIIT"]),
+                "duracion": duracion, "calorias": duracion * 7, "distancia": duracion * 90,
+                "fc_promedio": fc, "fc_max": fc + 25, "pasos": duracion * 100,
+                "fuente": FUENTE_SAMSUNG,
+                "pai": round(((fc - 55) / 104) ** 2 * duracion * 1.16, 1),
+                "hrtss": round(duracion / 60 * ((fc - 55) / 104) ** 2 * 100, 1),
+                "zona": "Aeróbico"
+            })
+
+        # Composición corporal (báscula Withings, 1 por día)
+        ts = _iso(dia + timedelta(hours=7, minutes=rnd.randint(0, 30)), utc=True)
+        cache["peso"].append({"record_id": rid(), "timestamp": ts, "fecha": ts, "peso": round(peso_base, 2)})
+        for campo, clave, valor in (
+            ("grasa_corporal", "porcentaje", rnd.uniform(18, 22)),
+            ("masa_muscular", "masa_kg", rnd.uniform(60, 63)),
+            ("masa_agua", "masa_kg", rnd.uniform(44, 47)),
+            ("masa_osea", "masa_kg", rnd.uniform(3.1, 3.4)),
+        ):
+            cache[campo].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                 clave: round(valor, 2), "fuente": FUENTE_WITHINGS})
+        cache["tasa_metabolica"].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                         "kcal_dia": round(rnd.uniform(1650, 1750), 1), "fuente": FUENTE_SAMSUNG})
+
+        # Sueño
+        inicio = dia - timedelta(hours=rnd.randint(1, 3))
+        fases = []
+        cursor = inicio
+        tot = {"awake": 0, "light": 0, "deep": 0, "rem": 0}
+        for _ in range(rnd.randint(8, 16)):
+            tipo, nombre = rnd.choice([(1, "awake"), (4, "light"), (4, "light"), (5, "deep"), (6, "rem")])
+            minutos = rnd.randint(5, 45)
+            fin = cursor + timedelta(minutes=minutos)
+            fases.append({"stage": nombre, "stage_type": tipo, "start_time": _iso(cursor, utc=True),
+                          "end_time": _iso(fin, utc=True), "duration_minutes": float(minutos)})
+            tot[nombre] += minutos
+            cursor = fin
+        sid = rid()
+        duracion = sum(tot.values())
+        fases_inicio, fases_rle, _ = codificar_fases(fases)
+        cache["sueno"].append({
+            "session_id": sid, "record_id": sid,
+            "start_time": _iso(inicio, utc=True), "end_time": _iso(cursor, utc=True),
+            "start_zone_offset": -10800, "end_zone_offset": -10800,
+            "fases_inicio": fases_inicio, "fases_rle": fases_rle, "stages_count": len(fases),
+            "fecha": _iso(inicio, utc=True), "duracion": duracion,
+            "awake": tot["awake"], "light": tot["light"], "deep": tot["deep"], "rem": tot["rem"],
+            "porcentaje_profundo": round(tot["deep"] / duracion * 100, 1),
+            "fuente": FUENTE_SAMSUNG
+        })
+
+        # FC: muestras nocturnas horarias (FC reposo) + resumen horario de la tarde
+        for h in (22, 23, 0, 1, 2, 3, 4, 5):
+            rid()
+            bpm = rnd.randint(50, 62)
+            buckets_fc[(dia.toordinal(), h * 60, FUENTE_SAMSUNG, 0)] = (bpm, bpm, float(bpm), 1)
+
+        rid()
+        bpm_min, bpm_max = rnd.randint(48, 55), rnd.randint(120, 160)
+        buckets_fc[(dia.toordinal(), 13 * 60, FUENTE_SAMSUNG, 0)] = (bpm_min, bpm_max, rnd.uniform(65, 75), 1)
+
+        cache["spo2"].append({"fecha": _iso(dia + timedelta(hours=3), utc=True),
+                              "porcentaje": rnd.randint(94, 99), "fuente": FUENTE_SAMSUNG})
+
+        # Pasos acumulados varias veces por día (Samsung) + HealthSync
+        acumulado = 0
+        for h in (10, 15, 21):
+            acumulado += rnd.randint(1500, 4500)
+            cache["pasos"].append({"fecha": _iso(dia + timedelta(hours=h)), "pasos": acumulado, "fuente": FUENTE_SAMSUNG})
+        cache["pasos"].append({"fecha": _iso(dia + timedelta(hours=9)), "pasos": acumulado // 2, "fuente": FUENTE_HEALTHSYNC})
+
+        ts = _iso(dia + timedelta(hours=9))
+        cache["distancia"].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                   "distancia_km": round(acumulado * 0.00075, 2), "fuente": FUENTE_SAMSUNG})
+        cache["calorias_totales"].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                          "energia_kcal": float(rnd.randint(2100, 2900)), "fuente": FUENTE_SAMSUNG})
+
+        ts = _iso(dia + timedelta(hours=20, minutes=rnd.randint(0, 59)), utc=True)
+        cache["presion_arterial"].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                          "sistolica": float(rnd.randint(105, 130)),
+                                          "diastolica": float(rnd.randint(65, 85)), "fuente": FUENTE_SAMSUNG})
+
+        for h, relacion in ((6, 1), (14, 4)):
+            ts = _iso(dia + timedelta(hours=h, minutes=rnd.randint(0, 59)), utc=True)
+            cache["glucosa"].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                     "nivel_mg_dl": round(rnd.uniform(80, 140), 1), "tipo_muestra": 0,
+                                     "meal_type": 0, "relacion_comida": relacion, "fuente": FUENTE_SAMSUNG})
+
+        for meal_type, h in ((1, 8), (2, 13), (3, 21), (4, 17)):
+            ts = _iso(dia + timedelta(hours=h), utc=True)
+            cache["nutrition"].append({"record_id": rid(), "timestamp": ts, "meal_type": meal_type,
+                                       "name": "Comida", "energy_kcal": float(rnd.randint(150, 800)),
+                                       "protein_g": rnd.uniform(5, 45), "carbs_g": rnd.uniform(10, 90),
+                                       "fat_total_g": rnd.uniform(3, 35), "fiber_g": None, "sugar_g": None,
+                                       "fuente": FUENTE_SAMSUNG})
+
+        if d % 7 == 0:
+            ts = _iso(dia + timedelta(hours=19), utc=True)
+            cache["vo2max"].append({"record_id": rid(), "timestamp": ts, "fecha": ts,
+                                    "vo2max": round(rnd.uniform(36, 40), 1), "metodo": 0, "fuente": FUENTE_SAMSUNG})
+
+    obtener_serie_fc(cache).upsert(buckets_fc)
+    return cache
@@ -48,15 +48,16 @@ def generar_resumen_ejecucion(cache):
         
         # Debug: verificar ruta del log
         import os
+        from core.cache import cantidad_registros
         log_existe = os.path.exists(LOG_PATH)
         log_size = os.path.getsize(LOG_PATH) if log_existe else 0
         
         return {
             "fecha": _obtener_hora_argentina().strftime("%Y-%m-%d %H:%M:%S (ARG)"),
             "archivos_procesados": len(archivos_procesados),
-            "total_ejercicios": len(cache.get("ejercicio", [])),
-            "total_peso": len(cache.get("peso", [])),
-            "total_pasos": len(cache.get("pasos", [])),
+            "total_ejercicios": cantidad_registros(cache, "ejercicio"),
+            "total_peso": cantidad_registros(cache, "peso"),
+            "total_pasos": cantidad_registros(cache, "pasos"),
             "log_existe": log_existe,
             "log_size": log_size
         }